@@ -3,8 +3,9 @@ from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 import os
+from app.db_routing import RoutingSession, build_engine_options, replica_binds, install_statement_timeout
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 
 def create_app(config_name='default'):
@@ -17,10 +18,19 @@ def create_app(config_name='default'):
     from app.config import config
     app.config.from_object(config[config_name])
 
+    # Engine pool settings and read replica binds
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', build_engine_options(app.config))
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    binds.update(replica_binds(app.config))
+
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
 
+    with app.app_context():
+        for engine in db.engines.values():
+            install_statement_timeout(engine, app.config['DB_STATEMENT_TIMEOUT_MS'])
+
     # CORS
     CORS(app, resources={
         r"/api/*": {
@@ -54,6 +64,28 @@ def create_app(config_name='default'):
     app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
     app.register_blueprint(settings_bp, url_prefix='/api/settings')
 
+    # Keep denormalized dashboard counters and rollups in step with every flush
+    from app.services.metrics_service import MetricsService
+    from app.services.rollup_service import RollupService
+    MetricsService.register_session_hooks()
+    RollupService.register_session_hooks()
+
+    # Drop cached identities when users, memberships or team ownership change
+    from app.services.identity_service import IdentityService
+    IdentityService.register_session_hooks()
+
+    # Drop cached template listings when templates change
+    from app.services.template_cache_service import TemplateCacheService
+    TemplateCacheService.register_session_hooks()
+
+    # Deliver queued email from background senders in each web process
+    from app.services.email_outbox_service import EmailOutboxService
+    EmailOutboxService.register_request_hook(app)
+
+    # CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
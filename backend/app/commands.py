@@ -0,0 +1,344 @@
+"""
+Flask CLI commands for maintenance jobs
+
+Usage:
+    flask search reindex [--team-id ID]
+    flask metrics reconcile [--team-id ID]
+    flask rollups backfill [--team-id ID] [--days N]
+    flask rollups clear-field-stats [--team-id ID]
+    flask activity backfill [--team-id ID]
+    flask reports rebuild-snapshots [--team-id ID]
+    flask reports reindex-fields [--team-id ID]
+    flask reports export --team-id ID [--format csv|ndjson|xlsx] [--output FILE]
+    flask retention run [--team-id ID] [--dry-run] [--step STEP ...]
+    flask retention restore (--analysis-id ID | --report-id ID)
+    flask imports run FILE --user-id ID --template-id ID
+    flask imports resume [--job-id ID]
+    flask imports status JOB_ID
+    flask outbox run [--once]
+    flask outbox status
+    flask outbox retry [--email-id ID]
+    flask outbox purge [--days N]
+    flask outbox sink [--host HOST] [--port PORT] [--folder DIR]
+"""
+import click
+from flask.cli import AppGroup
+
+
+search_cli = AppGroup('search', help='Full-text search index maintenance')
+metrics_cli = AppGroup('metrics', help='Dashboard counters maintenance')
+rollups_cli = AppGroup('rollups', help='Daily analytics rollups maintenance')
+activity_cli = AppGroup('activity', help='Activity feed maintenance')
+reports_cli = AppGroup('reports', help='Report data maintenance')
+retention_cli = AppGroup('retention', help='File retention and archival')
+imports_cli = AppGroup('imports', help='Bulk transcript imports')
+outbox_cli = AppGroup('outbox', help='Email outbox delivery')
+
+
+@search_cli.command('reindex')
+@click.option('--team-id', type=int, default=None, help='Only reindex reports for this team')
+@click.option('--batch-size', type=int, default=500, show_default=True)
+def reindex_search(team_id, batch_size):
+    """Rebuild search documents from reports, fields and transcriptions"""
+    from app.services.search_service import SearchService
+
+    indexed = SearchService.reindex_all(team_id=team_id, batch_size=batch_size)
+    click.echo(f"Indexed {indexed} report(s)")
+
+
+@metrics_cli.command('reconcile')
+@click.option('--team-id', type=int, default=None, help='Only reconcile this team')
+def reconcile_metrics(team_id):
+    """Recompute team_metrics counters from the source tables"""
+    from app.services.metrics_service import MetricsService
+
+    reconciled = MetricsService.reconcile_all(team_id=team_id)
+    click.echo(f"Reconciled metrics for {reconciled} team(s)")
+
+
+@rollups_cli.command('backfill')
+@click.option('--team-id', type=int, default=None, help='Only backfill this team')
+@click.option('--days', type=int, default=None, help='Only rebuild the last N days (default: all history)')
+def backfill_rollups(team_id, days):
+    """Rebuild daily analytics rollups from analyses and reports"""
+    from app.services.rollup_service import RollupService
+
+    written = RollupService.backfill(team_id=team_id, days=days)
+    click.echo(f"Wrote {written} team-day rollup row(s)")
+
+
+@rollups_cli.command('clear-field-stats')
+@click.option('--team-id', type=int, default=None, help='Only clear this team')
+def clear_field_stats(team_id):
+    """Drop stored per-field daily stats; they are recomputed on the next read"""
+    from app.services.field_analytics_service import FieldAnalyticsService
+
+    deleted = FieldAnalyticsService.clear(team_id=team_id)
+    click.echo(f"Deleted {deleted} field stats row(s)")
+
+
+@activity_cli.command('backfill')
+@click.option('--team-id', type=int, default=None, help='Only backfill this team')
+def backfill_activity(team_id):
+    """Seed the activity log from existing reports and templates"""
+    from app.services.activity_service import ActivityService
+
+    written = ActivityService.backfill(team_id=team_id)
+    click.echo(f"Wrote {written} activity event(s)")
+
+
+@reports_cli.command('rebuild-snapshots')
+@click.option('--team-id', type=int, default=None, help='Only rebuild reports for this team')
+@click.option('--batch-size', type=int, default=500, show_default=True)
+def rebuild_snapshots(team_id, batch_size):
+    """Rebuild the denormalized field value snapshot of each report"""
+    from app.services.field_value_service import FieldValueService
+
+    rebuilt = FieldValueService.rebuild_all(team_id=team_id, batch_size=batch_size)
+    click.echo(f"Rebuilt snapshots for {rebuilt} report(s)")
+
+
+@reports_cli.command('reindex-fields')
+@click.option('--team-id', type=int, default=None, help='Only reindex reports for this team')
+@click.option('--batch-size', type=int, default=500, show_default=True)
+def reindex_fields(team_id, batch_size):
+    """Rebuild the typed field-value index used by report queries"""
+    from app.services.field_index_service import FieldIndexService
+
+    indexed = FieldIndexService.rebuild_all(team_id=team_id, batch_size=batch_size)
+    click.echo(f"Indexed field values of {indexed} report(s)")
+
+
+@reports_cli.command('export')
+@click.option('--team-id', type=int, required=True, help='Team whose reports to export')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson', 'xlsx']), default='csv', show_default=True)
+@click.option('--template-id', type=int, default=None, help='Only reports of this template')
+@click.option('--status', type=click.Choice(['draft', 'finalized']), default=None, help='Only reports with this status')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='File to write (default: stdout)')
+def export_reports(team_id, fmt, template_id, status, output):
+    """Stream every report of a team to a file or stdout"""
+    import sys
+    from app.services.export_service import ExportService
+
+    try:
+        plan = ExportService.prepare(fmt, team_id, template_id=template_id, status=status)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    target = open(output, 'wb') if output else sys.stdout.buffer
+    written = 0
+    try:
+        for chunk in ExportService.stream(plan):
+            target.write(chunk)
+            written += len(chunk)
+    finally:
+        if output:
+            target.close()
+
+    if output:
+        click.echo(f"Wrote {written} bytes to {output}")
+
+
+@retention_cli.command('run')
+@click.option('--team-id', type=int, default=None, help='Only apply this team\'s policy (skips PDF and orphan cleanup)')
+@click.option('--dry-run', is_flag=True, help='Only report what would be done')
+@click.option('--step', 'steps', multiple=True, type=click.Choice(['pdfs', 'orphans', 'audio', 'images', 'archive']),
+              help='Run only these steps (repeatable; default: all)')
+def run_retention(team_id, dry_run, steps):
+    """Delete expired and orphaned files, move old audio to cold storage and archive old analyses"""
+    from app.services.retention_service import RetentionService
+
+    stats = RetentionService.run(team_id=team_id, dry_run=dry_run, steps=steps or None)
+
+    def size(count):
+        return f"{count / (1024 * 1024):.1f} MB"
+
+    prefix = 'Would' if dry_run else 'Did'
+    click.echo(f"{prefix} apply retention to {stats['teams']} team(s):")
+    click.echo(f"  generated PDFs deleted: {stats['pdfs_deleted']} ({size(stats['pdf_bytes'])})")
+    click.echo(f"  orphaned uploads deleted: {stats['orphans_deleted']} ({size(stats['orphan_bytes'])})")
+    click.echo(f"  expired audio deleted: {stats['audio_deleted']} ({size(stats['audio_deleted_bytes'])})")
+    click.echo(f"  expired images deleted: {stats['images_deleted']} ({size(stats['image_bytes'])})")
+    cold = f"  audio moved to cold storage: {stats['audio_cold']} ({size(stats['audio_cold_bytes'])}"
+    click.echo(cold + (")" if dry_run else f", saved {size(stats['audio_cold_saved_bytes'])})"))
+    click.echo(f"  analyses archived: {stats['analyses_archived']} (with {stats['reports_archived']} report(s))")
+
+
+@retention_cli.command('restore')
+@click.option('--analysis-id', type=int, default=None, help='Archived analysis to restore')
+@click.option('--report-id', type=int, default=None, help='Restore the archived analysis this report belongs to')
+def restore_archived(analysis_id, report_id):
+    """Move an archived analysis and its reports back into the live tables"""
+    from app.models.retention import ArchivedReport
+    from app.services.retention_service import RetentionService
+
+    if report_id:
+        archived_report = ArchivedReport.query.get(report_id)
+        if not archived_report:
+            raise click.ClickException(f"Report {report_id} is not archived")
+        analysis_id = archived_report.analysis_id
+    if not analysis_id:
+        raise click.UsageError('Pass --analysis-id or --report-id')
+
+    try:
+        restored = RetentionService.restore_analysis(analysis_id)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Restored analysis {restored['analysis_id']} with {len(restored['report_ids'])} report(s)")
+
+
+def _echo_import(job):
+    click.echo(
+        f"Import {job.id}: {job.status}, {job.succeeded_items + job.failed_items}/{job.total_items} done, "
+        f"{job.failed_items} failed" + (f" ({job.error})" if job.error else "")
+    )
+
+
+def _wait_for_imports(job_ids, interval):
+    """Print progress until this process has no import work left"""
+    import time
+    from app import db
+    from app.models.import_job import ImportJob
+    from app.services.import_service import ImportService
+
+    while True:
+        idle = ImportService.idle()
+        db.session.expire_all()
+        for job in ImportJob.query.filter(ImportJob.id.in_(job_ids)).order_by(ImportJob.id):
+            _echo_import(job)
+        if idle:
+            return
+        time.sleep(interval)
+
+
+@imports_cli.command('run')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user-id', type=int, required=True, help='User the analyses and drafts belong to')
+@click.option('--template-id', type=int, required=True, help='Template to analyze against')
+@click.option('--interval', type=float, default=5, show_default=True, help='Seconds between progress lines')
+def run_import(path, user_id, template_id, interval):
+    """Import an NDJSON or zip file of transcripts and audio and analyze every item"""
+    import zipfile
+    from app.services.import_service import ImportService
+
+    source_type = 'zip' if zipfile.is_zipfile(path) else 'ndjson'
+    try:
+        job = ImportService.create_job(user_id, template_id, source_type)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    with open(path, 'rb') as stream:
+        job = ImportService.ingest(job, stream)
+    _echo_import(job)
+    _wait_for_imports([job.id], interval)
+
+
+@imports_cli.command('resume')
+@click.option('--job-id', type=int, default=None, help='Only resume this import')
+@click.option('--interval', type=float, default=5, show_default=True, help='Seconds between progress lines')
+def resume_imports(job_id, interval):
+    """Run the unfinished items of imports whose process stopped"""
+    from app.models.import_job import ImportJob
+    from app.services.import_service import ImportService
+
+    job_ids = [row[0] for row in ImportJob.query.with_entities(ImportJob.id).filter(
+        ImportJob.status.in_(('receiving', 'running'))
+    )]
+    if job_id:
+        job_ids = [job_id] if job_id in job_ids else []
+
+    queued = ImportService.resume(job_id=job_id)
+    click.echo(f"Queued {queued} item(s) from {len(job_ids)} import(s)")
+    if job_ids:
+        _wait_for_imports(job_ids, interval)
+
+
+@imports_cli.command('status')
+@click.argument('job_id', type=int)
+def import_status(job_id):
+    """Show progress and failed items of an import"""
+    from app.models.import_job import ImportJob, ImportItem
+
+    job = ImportJob.query.get(job_id)
+    if not job:
+        raise click.ClickException(f"Import {job_id} not found")
+    _echo_import(job)
+    for item in ImportItem.query.filter_by(job_id=job_id, status='failed').order_by(ImportItem.position):
+        click.echo(f"  #{item.position} {item.source_name or ''}: {item.error}")
+
+
+@outbox_cli.command('run')
+@click.option('--once', is_flag=True, help='Exit once nothing is due instead of polling')
+def run_outbox(once):
+    """Deliver queued email in the foreground (use with MAIL_OUTBOX_WORKERS=0 on web processes)"""
+    from flask import current_app
+    from app.services.email_outbox_service import EmailOutboxService
+
+    handled = EmailOutboxService.run(current_app._get_current_object(), once=once)
+    click.echo(f"Handled {handled} email(s)")
+
+
+@outbox_cli.command('status')
+@click.option('--limit', type=int, default=20, show_default=True, help='Failed emails to list')
+def outbox_status(limit):
+    """Show outbox counts per status and the latest failures"""
+    from app.models.email_outbox import OutboxEmail
+    from app.services.email_outbox_service import EmailOutboxService
+
+    counts = EmailOutboxService.counts()
+    click.echo(', '.join(f"{status}: {counts.get(status, 0)}" for status in ('pending', 'sending', 'sent', 'failed')))
+    for email in OutboxEmail.query.filter_by(status='failed').order_by(OutboxEmail.id.desc()).limit(limit):
+        click.echo(f"  #{email.id} {email.kind} to {', '.join(email.recipients)}: {email.last_error}")
+
+
+@outbox_cli.command('retry')
+@click.option('--email-id', type=int, default=None, help='Only retry this email')
+def retry_outbox(email_id):
+    """Queue failed email for delivery again"""
+    from app.services.email_outbox_service import EmailOutboxService
+
+    requeued = EmailOutboxService.retry_failed(email_id=email_id)
+    click.echo(f"Requeued {requeued} email(s)")
+
+
+@outbox_cli.command('purge')
+@click.option('--days', type=int, default=14, show_default=True, help='Keep sent and failed email this long')
+def purge_outbox(days):
+    """Delete old sent and failed email and their attachments"""
+    from app.services.email_outbox_service import EmailOutboxService
+
+    deleted = EmailOutboxService.purge(days)
+    click.echo(f"Deleted {deleted} email(s)")
+
+
+@outbox_cli.command('sink')
+@click.option('--host', default='localhost', show_default=True)
+@click.option('--port', type=int, default=1025, show_default=True)
+@click.option('--folder', type=click.Path(file_okay=False), default=None,
+              help='Where to save received messages (default: generated/mail_sink)')
+def run_sink(host, port, folder):
+    """Run a local SMTP server that saves mail to files instead of delivering it"""
+    import os
+    from flask import current_app
+    from app.smtp_sink import SMTPSink
+
+    folder = folder or os.path.join(os.path.dirname(current_app.config['MAIL_OUTBOX_FOLDER']), 'mail_sink')
+    with SMTPSink(host, port, folder) as sink:
+        click.echo(f"SMTP sink listening on {host}:{port}, saving to {folder}")
+        try:
+            sink.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def register_commands(app):
+    """Attach CLI command groups to the app"""
+    app.cli.add_command(search_cli)
+    app.cli.add_command(metrics_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(activity_cli)
+    app.cli.add_command(reports_cli)
+    app.cli.add_command(retention_cli)
+    app.cli.add_command(imports_cli)
+    app.cli.add_command(outbox_cli)
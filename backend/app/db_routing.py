@@ -0,0 +1,134 @@
+"""
+Engine options and primary/replica routing for the SQLAlchemy session
+
+Reads in endpoints marked with @read_replica go to one of the replica binds
+(configured via DATABASE_REPLICA_URLS). Everything else - flushes, bulk
+INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE, raw text statements - goes to
+the primary. Once a session has written, it stays on the primary so the
+rest of the request reads its own writes.
+"""
+import random
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select, CompoundSelect
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+
+def build_engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings"""
+    uri = config.get('SQLALCHEMY_DATABASE_URI') or ''
+    options = {
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800)
+    }
+
+    # SQLite uses a file or singleton pool that doesn't take sizing arguments
+    if not uri.startswith('sqlite'):
+        options.update({
+            'pool_size': config.get('DB_POOL_SIZE', 10),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 30)
+        })
+
+    return options
+
+
+def replica_binds(config):
+    """SQLALCHEMY_BINDS entries for each configured replica URL"""
+    urls = [url.strip() for url in (config.get('DATABASE_REPLICA_URLS') or '').split(',') if url.strip()]
+    return {f"{REPLICA_BIND_PREFIX}{index}": url for index, url in enumerate(urls)}
+
+
+def install_statement_timeout(engine, timeout_ms):
+    """Cap statement run time on every new connection of an engine"""
+    if not timeout_ms:
+        return
+
+    dialect = engine.dialect.name
+    if dialect == 'mysql':
+        # Applies to read-only SELECTs, which is where runaway queries come from
+        statement = f"SET SESSION max_execution_time = {int(timeout_ms)}"
+    elif dialect == 'postgresql':
+        statement = f"SET statement_timeout = {int(timeout_ms)}"
+    else:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_timeout(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def read_replica(f):
+    """Route this endpoint's reads to a replica when one is configured"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.read_replica = True
+        return f(*args, **kwargs)
+
+    return decorated
+
+
+@contextmanager
+def use_primary():
+    """Temporarily send every statement of the current session to the primary"""
+    from app import db
+
+    session = db.session()
+    depth = session.info.get('primary_depth', 0)
+    session.info['primary_depth'] = depth + 1
+    try:
+        yield session
+    finally:
+        session.info['primary_depth'] = depth
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that can serve plain SELECTs from a replica"""
+
+    def _replica_engine(self):
+        engines = self._db.engines
+        keys = [key for key in engines if isinstance(key, str) and key.startswith(REPLICA_BIND_PREFIX)]
+        if not keys:
+            return None
+
+        # One replica per session keeps a request's reads consistent with each other
+        key = self.info.get('replica_key')
+        if key not in keys:
+            key = random.choice(keys)
+            self.info['replica_key'] = key
+        return engines[key]
+
+    def _wants_replica(self):
+        if self.info.get('wrote') or self.info.get('primary_depth'):
+            return False
+        return has_app_context() and bool(g.get('read_replica'))
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+
+        is_read = (
+            isinstance(clause, (Select, CompoundSelect))
+            and clause._for_update_arg is None
+            and not self._flushing
+        )
+
+        if not is_read:
+            # Stick to the primary for the rest of the session (read-your-writes)
+            if clause is not None or self._flushing:
+                self.info['wrote'] = True
+        elif self._wants_replica():
+            engine = self._replica_engine()
+            if engine is not None:
+                return engine
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -1,8 +1,42 @@
 from functools import wraps
 from flask import request, jsonify
+from app import db
 from app.services.auth_service import AuthService
+from app.services.identity_service import IdentityService
 from app.models.user import User
 
+
+class CurrentUser:
+    """Authenticated user backed by the identity cache
+
+    id, email, names and the active flag come from the cache; any other
+    attribute (to_dict, phone, set_password, ...) or assignment loads the
+    User row on first use, so routes can treat it like a User instance.
+    """
+    CACHED_FIELDS = ('id', 'email', 'first_name', 'last_name', 'is_active')
+
+    def __init__(self, identity):
+        object.__setattr__(self, '_identity', identity)
+        object.__setattr__(self, '_user', None)
+
+    def _get_user(self):
+        user = object.__getattribute__(self, '_user')
+        if user is None:
+            user = db.session.get(User, self._identity['id'])
+            object.__setattr__(self, '_user', user)
+        return user
+
+    def __getattr__(self, name):
+        if name in CurrentUser.CACHED_FIELDS and object.__getattribute__(self, '_user') is None:
+            return self._identity[name]
+        return getattr(self._get_user(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get_user(), name, value)
+
+    def __repr__(self):
+        return f"<CurrentUser {self._identity['id']}>"
+
 def token_required(f):
     """Decorator to require valid JWT token"""
     @wraps(f)
@@ -29,20 +63,22 @@ def token_required(f):
         try:
             # Verify token and get user_id
             user_id = AuthService.verify_access_token(token)
-            current_user = User.query.get(user_id)
+            identity = IdentityService.get_identity(user_id)
 
-            if not current_user:
+            if not identity:
                 return jsonify({
                     'success': False,
                     'message': 'User not found'
                 }), 401
 
-            if not current_user.is_active:
+            if not identity['is_active']:
                 return jsonify({
                     'success': False,
                     'message': 'Account is deactivated'
                 }), 401
 
+            current_user = CurrentUser(identity)
+
         except ValueError as e:
             return jsonify({
                 'success': False,
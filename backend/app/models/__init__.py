@@ -1,8 +1,16 @@
 from app.models.user import User, RefreshToken
 from app.models.team import Team, TeamMember, TeamInvitation
-from app.models.template import ReportTemplate, TemplateField
-from app.models.analysis import CallAnalysis
+from app.models.template import ReportTemplate, TemplateRevision, TemplateField
+from app.models.analysis import CallAnalysis, CallAnalysisText
 from app.models.report import Report, ReportFieldValue
+from app.models.search import ReportSearchDocument
+from app.models.field_index import ReportFieldIndex
+from app.models.metrics import TeamMetrics
+from app.models.rollup import TeamDailyStats, TemplateDailyStats, TemplateFieldDailyStats
+from app.models.activity import ActivityEvent
+from app.models.retention import RetentionPolicy, ArchivedCallAnalysis, ArchivedReport
+from app.models.import_job import ImportJob, ImportItem
+from app.models.email_outbox import OutboxEmail
 
 __all__ = [
     'User',
@@ -11,8 +19,23 @@ __all__ = [
     'TeamMember',
     'TeamInvitation',
     'ReportTemplate',
+    'TemplateRevision',
     'TemplateField',
     'CallAnalysis',
+    'CallAnalysisText',
     'Report',
-    'ReportFieldValue'
+    'ReportFieldValue',
+    'ReportSearchDocument',
+    'ReportFieldIndex',
+    'TeamMetrics',
+    'TeamDailyStats',
+    'TemplateDailyStats',
+    'TemplateFieldDailyStats',
+    'ActivityEvent',
+    'RetentionPolicy',
+    'ArchivedCallAnalysis',
+    'ArchivedReport',
+    'ImportJob',
+    'ImportItem',
+    'OutboxEmail'
 ]
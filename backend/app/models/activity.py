@@ -0,0 +1,47 @@
+from app import db
+from datetime import datetime
+
+
+class ActivityEvent(db.Model):
+    """Append-only team activity log backing the dashboard feed
+
+    Rows are written by ActivityService at the point of change and never
+    updated, so actor and subject names are stored as they were at the time.
+    """
+    __tablename__ = 'activity_events'
+    __table_args__ = (
+        db.Index('ix_activity_events_team_created', 'team_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False)
+    event_type = db.Column(db.String(50), nullable=False)
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    actor_name = db.Column(db.String(255), nullable=False, default='Unknown')
+    subject_type = db.Column(db.String(50), nullable=True)
+    subject_id = db.Column(db.Integer, nullable=True)
+    subject_title = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Feed key for the subject title, kept compatible with the old dashboard format
+    TITLE_KEYS = {
+        'report': 'report_title',
+        'template': 'template_name',
+        'team': 'team_name'
+    }
+
+    def to_dict(self):
+        """Convert event to the dashboard activity format"""
+        data = {
+            'id': self.subject_id,
+            'event_id': self.id,
+            'type': self.event_type,
+            'user_name': self.actor_name,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+        title_key = self.TITLE_KEYS.get(self.subject_type)
+        if title_key:
+            data[title_key] = self.subject_title
+
+        return data
@@ -1,27 +1,69 @@
 from app import db
+from app.models.types import CompressedText
 from datetime import datetime
 
 
 class CallAnalysis(db.Model):
     __tablename__ = 'call_analyses'
+    __table_args__ = (
+        # Analysis history: a user's most recent analyses
+        db.Index('ix_call_analyses_user_created', 'user_id', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False, index=True)
     template_id = db.Column(db.Integer, db.ForeignKey('report_templates.id'), nullable=False, index=True)
+    # Field set the template had when this was created
+    template_revision_id = db.Column(
+        db.Integer,
+        db.ForeignKey('template_revisions.id', name='fk_call_analyses_template_revision'),
+        nullable=True,
+        index=True
+    )
 
     # Input type and sources
     input_type = db.Column(db.Enum('audio', 'text', 'image', name='input_type_enum'), default='audio', nullable=False)
     audio_file_path = db.Column(db.String(500))
     audio_duration = db.Column(db.Integer)  # Duration in seconds
-    input_text = db.Column(db.Text)  # For direct text input
     image_file_path = db.Column(db.String(500))  # For image input
 
-    transcription = db.Column(db.Text)
+    # Character count of the transcription, so listings don't need the text itself
+    transcription_length = db.Column(db.Integer, nullable=False, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     # Relationships
     reports = db.relationship('Report', backref='analysis', lazy=True, cascade='all, delete-orphan')
+    # Large text lives in call_analysis_texts and is only loaded when accessed
+    text_content = db.relationship('CallAnalysisText', uselist=False, lazy='select', cascade='all, delete-orphan')
+
+    def _text_row(self):
+        if self.text_content is None:
+            self.text_content = CallAnalysisText()
+        return self.text_content
+
+    @property
+    def input_text(self):
+        """Direct text input (loaded and decompressed on first access)"""
+        return self.text_content.input_text if self.text_content is not None else None
+
+    @input_text.setter
+    def input_text(self, value):
+        self._text_row().input_text = value
+
+    @property
+    def transcription(self):
+        """Transcription (loaded and decompressed on first access)"""
+        return self.text_content.transcription if self.text_content is not None else None
+
+    @transcription.setter
+    def transcription(self, value):
+        self._text_row().transcription = value
+        self.transcription_length = len(value or '')
+
+    def has_transcription(self):
+        """Check for a transcription without loading it"""
+        return bool(self.transcription_length)
 
     def get_audio_duration_formatted(self):
         """Get audio duration in HH:MM:SS format"""
@@ -40,24 +82,43 @@ class CallAnalysis(db.Model):
             return 0.0
         return round(self.audio_duration / 3600, 2)
 
-    def to_dict(self, include_transcription=False):
-        """Convert call analysis to dictionary"""
+    def to_dict(self, include_text=False, include_transcription=False):
+        """Convert call analysis to dictionary
+
+        The input text and transcription live in call_analysis_texts, so
+        they are only included (and loaded) for detail responses.
+        """
         result = {
             'id': self.id,
             'user_id': self.user_id,
             'team_id': self.team_id,
             'template_id': self.template_id,
+            'template_revision_id': self.template_revision_id,
             'input_type': self.input_type,
             'audio_file_path': self.audio_file_path,
             'audio_duration': self.audio_duration,
             'audio_duration_formatted': self.get_audio_duration_formatted(),
             'audio_duration_hours': self.get_audio_duration_in_hours(),
-            'input_text': self.input_text if self.input_type == 'text' else None,
             'image_file_path': self.image_file_path if self.input_type == 'image' else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+        if include_text:
+            result['input_text'] = self.input_text if self.input_type == 'text' else None
+
         if include_transcription:
             result['transcription'] = self.transcription
 
         return result
+
+
+class CallAnalysisText(db.Model):
+    """Compressed input text and transcription for an analysis
+
+    Kept out of call_analyses so listings and aggregates never read the blobs.
+    """
+    __tablename__ = 'call_analysis_texts'
+
+    analysis_id = db.Column(db.Integer, db.ForeignKey('call_analyses.id'), primary_key=True)
+    input_text = db.Column(CompressedText)
+    transcription = db.Column(CompressedText)
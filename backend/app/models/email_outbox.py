@@ -0,0 +1,58 @@
+from app import db
+from app.models.types import CompressedText
+from datetime import datetime
+import json
+
+
+class OutboxEmail(db.Model):
+    """An email waiting in (or delivered from) the outbox
+
+    Requests only insert rows; the outbox senders claim due rows by
+    setting status 'sending' and pushing next_attempt_at out by a lease,
+    so a row claimed by a sender that died is picked up again once the
+    lease runs out.
+    """
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_due', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)  # report_share, team_invitation
+    recipients_json = db.Column(db.Text, nullable=False)
+    # Recipients already accepted by the server, so a retry doesn't mail them twice
+    recipients_sent = db.Column(db.Integer, nullable=False, default=0)
+    subject = db.Column(db.String(255), nullable=False)
+    html_content = db.Column(CompressedText, nullable=False)
+    attachment_path = db.Column(db.String(500), nullable=True)  # Copy owned by the outbox
+    attachment_name = db.Column(db.String(255), nullable=True)
+    # pending -> sending -> sent | failed
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def recipients(self):
+        return json.loads(self.recipients_json)
+
+    @recipients.setter
+    def recipients(self, value):
+        self.recipients_json = json.dumps(list(value))
+
+    def to_dict(self):
+        """Convert outbox email to dictionary"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'recipients': self.recipients,
+            'subject': self.subject,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
@@ -0,0 +1,36 @@
+from app import db
+
+
+class ReportFieldIndex(db.Model):
+    """Typed, queryable copy of a report's template field values
+
+    One row per value (one per selected option for multi_select fields),
+    with the value in value_text or value_number depending on the field
+    type. Rows are keyed by (team, template, field name) rather than field
+    id so a filter matches reports from every revision of the template.
+    """
+    __tablename__ = 'report_field_index'
+    __table_args__ = (
+        db.Index('ix_report_field_index_text', 'team_id', 'template_id', 'field_name', 'value_text', 'report_id'),
+        db.Index('ix_report_field_index_number', 'team_id', 'template_id', 'field_name', 'value_number', 'report_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), nullable=False, index=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False)
+    template_id = db.Column(db.Integer, db.ForeignKey('report_templates.id'), nullable=False)
+    field_id = db.Column(db.Integer, db.ForeignKey('template_fields.id'), nullable=False)
+    field_name = db.Column(db.String(255), nullable=False)
+    value_text = db.Column(db.String(255), nullable=True)
+    value_number = db.Column(db.Float, nullable=True)
+
+    def to_dict(self):
+        """Convert index row to dictionary"""
+        return {
+            'report_id': self.report_id,
+            'template_id': self.template_id,
+            'field_id': self.field_id,
+            'field_name': self.field_name,
+            'value_text': self.value_text,
+            'value_number': self.value_number
+        }
@@ -0,0 +1,86 @@
+from app import db
+from datetime import datetime
+
+
+class ImportJob(db.Model):
+    """A bulk transcript import and its progress counters
+
+    Counters are bumped with single UPDATE statements by the import
+    workers, so they stay correct with several items finishing at once.
+    """
+    __tablename__ = 'import_jobs'
+    __table_args__ = (
+        db.Index('ix_import_jobs_user_created', 'user_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    template_id = db.Column(db.Integer, db.ForeignKey('report_templates.id'), nullable=False)
+    template_revision_id = db.Column(db.Integer, db.ForeignKey('template_revisions.id'), nullable=True)
+    source_type = db.Column(db.String(20), nullable=False)  # ndjson or zip
+    # receiving -> running -> completed, or failed if the upload itself was unusable
+    status = db.Column(db.String(20), nullable=False, default='receiving')
+    total_items = db.Column(db.Integer, nullable=False, default=0)
+    succeeded_items = db.Column(db.Integer, nullable=False, default=0)
+    failed_items = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        """Convert import job to dictionary"""
+        done = self.succeeded_items + self.failed_items
+        return {
+            'id': self.id,
+            'team_id': self.team_id,
+            'user_id': self.user_id,
+            'template_id': self.template_id,
+            'source_type': self.source_type,
+            'status': self.status,
+            'total_items': self.total_items,
+            'succeeded_items': self.succeeded_items,
+            'failed_items': self.failed_items,
+            'pending_items': max(self.total_items - done, 0),
+            'progress': round(done / self.total_items, 4) if self.total_items else 0.0,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class ImportItem(db.Model):
+    """One transcript or audio file of an import job"""
+    __tablename__ = 'import_items'
+    __table_args__ = (
+        db.Index('ix_import_items_job_status', 'job_id', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('import_jobs.id'), nullable=False)
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)  # Line or entry number in the upload
+    source_name = db.Column(db.String(255), nullable=True)
+    title = db.Column(db.String(255), nullable=True)
+    # Plain IDs so deleting or archiving reports isn't held up by import history
+    analysis_id = db.Column(db.Integer, nullable=True)
+    report_id = db.Column(db.Integer, nullable=True)
+    # pending -> running -> succeeded | failed
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    error = db.Column(db.String(500), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert import item to dictionary"""
+        return {
+            'id': self.id,
+            'position': self.position,
+            'source_name': self.source_name,
+            'title': self.title,
+            'analysis_id': self.analysis_id,
+            'report_id': self.report_id,
+            'status': self.status,
+            'error': self.error,
+            'attempts': self.attempts
+        }
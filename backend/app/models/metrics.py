@@ -0,0 +1,34 @@
+from app import db
+from datetime import datetime
+
+
+class TeamMetrics(db.Model):
+    """Running per-team counters backing the dashboard metrics
+
+    Kept in step with the source tables by MetricsService inside the same
+    transaction as each change, and recomputable from source with
+    `flask metrics reconcile`.
+    """
+    __tablename__ = 'team_metrics'
+
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), primary_key=True)
+    audio_seconds = db.Column(db.BigInteger, nullable=False, default=0)
+    analysis_count = db.Column(db.Integer, nullable=False, default=0)
+    template_count = db.Column(db.Integer, nullable=False, default=0)
+    member_count = db.Column(db.Integer, nullable=False, default=0)
+    draft_count = db.Column(db.Integer, nullable=False, default=0)
+    report_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    reconciled_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        """Convert counters to the dashboard metrics format"""
+        audio_seconds = self.audio_seconds or 0
+        return {
+            'hours_analyzed': round(audio_seconds / 3600, 2) if audio_seconds else 0,
+            'analysis_count': self.analysis_count or 0,
+            'template_count': self.template_count or 0,
+            'team_member_count': self.member_count or 0,
+            'drafts_count': self.draft_count or 0,
+            'reports_count': self.report_count or 0
+        }
@@ -4,12 +4,27 @@ from datetime import datetime
 
 class Report(db.Model):
     __tablename__ = 'reports'
+    __table_args__ = (
+        # Report lists and drafts: team + status, newest first
+        db.Index('ix_reports_team_status_created', 'team_id', 'status', 'created_at'),
+        # Same lists for team members, who only see their own reports
+        db.Index('ix_reports_team_user_status_created', 'team_id', 'user_id', 'status', 'created_at'),
+        # Existing-draft lookup when a draft is created from an analysis
+        db.Index('ix_reports_analysis_status', 'analysis_id', 'status'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     analysis_id = db.Column(db.Integer, db.ForeignKey('call_analyses.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False, index=True)
     template_id = db.Column(db.Integer, db.ForeignKey('report_templates.id'), nullable=False, index=True)
+    # Field set the template had when this was created
+    template_revision_id = db.Column(
+        db.Integer,
+        db.ForeignKey('template_revisions.id', name='fk_reports_template_revision'),
+        nullable=True,
+        index=True
+    )
     title = db.Column(db.String(255), nullable=False)
     summary = db.Column(db.Text)
     status = db.Column(
@@ -19,7 +34,21 @@ class Report(db.Model):
     )
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped by every UPDATE of the row, bulk ones included; names the PDF revision
+    revision = db.Column(
+        db.Integer,
+        nullable=False,
+        default=1,
+        server_default='1',
+        onupdate=db.literal_column('revision + 1')
+    )
     finalized_at = db.Column(db.DateTime, nullable=True)
+    # Denormalized copy of the field values for list views, maintained by
+    # FieldValueService: one [field_id, field_name, field_label, field_type, value]
+    # entry per value in entry order (field_id is None for custom fields)
+    field_snapshot = db.Column(db.JSON, nullable=True)
+
+    SNAPSHOT_KEYS = ('field_id', 'field_name', 'field_label', 'field_type', 'value')
 
     # Relationships
     field_values = db.relationship('ReportFieldValue', backref='report', lazy=True, cascade='all, delete-orphan')
@@ -33,6 +62,12 @@ class Report(db.Model):
         """Check if report is finalized"""
         return self.status == 'finalized'
 
+    def snapshot_field_values(self):
+        """Field values from the snapshot, or None if it hasn't been built yet"""
+        if self.field_snapshot is None:
+            return None
+        return [dict(zip(Report.SNAPSHOT_KEYS, entry)) for entry in self.field_snapshot]
+
     def to_dict(self, include_field_values=False):
         """Convert report to dictionary"""
         result = {
@@ -41,6 +76,7 @@ class Report(db.Model):
             'user_id': self.user_id,
             'team_id': self.team_id,
             'template_id': self.template_id,
+            'template_revision_id': self.template_revision_id,
             'title': self.title,
             'summary': self.summary,
             'status': self.status,
@@ -57,6 +93,10 @@ class Report(db.Model):
 
 class ReportFieldValue(db.Model):
     __tablename__ = 'report_field_values'
+    __table_args__ = (
+        # One value per template field; custom fields have a NULL field_id and are not constrained
+        db.UniqueConstraint('report_id', 'field_id', name='uq_report_field_values_report_field'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), nullable=False, index=True)
@@ -0,0 +1,102 @@
+from app import db
+from app.models.types import CompressedText
+from datetime import datetime
+
+
+class RetentionPolicy(db.Model):
+    """Per-team retention settings used by RetentionService
+
+    A NULL column falls back to the RETENTION_* config default; 0 disables
+    that step for the team.
+    """
+    __tablename__ = 'retention_policies'
+
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), primary_key=True)
+    # Move audio into compressed cold storage after this many days
+    audio_cold_after_days = db.Column(db.Integer, nullable=True)
+    # Delete audio files (the analysis row stays) after this many days
+    audio_delete_after_days = db.Column(db.Integer, nullable=True)
+    # Delete uploaded images after this many days
+    image_delete_after_days = db.Column(db.Integer, nullable=True)
+    # Move analyses and their reports to the archive tables after this many days
+    archive_after_days = db.Column(db.Integer, nullable=True)
+    updated_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    SETTINGS = ('audio_cold_after_days', 'audio_delete_after_days', 'image_delete_after_days', 'archive_after_days')
+
+    def to_dict(self):
+        """Convert retention policy to dictionary"""
+        result = {'team_id': self.team_id}
+        for name in self.SETTINGS:
+            result[name] = getattr(self, name)
+        result['updated_at'] = self.updated_at.isoformat() if self.updated_at else None
+        return result
+
+
+class ArchivedCallAnalysis(db.Model):
+    """An analysis moved out of call_analyses, with its text row
+
+    The ID is the original analysis ID so a restore puts it back unchanged.
+    File paths are kept as columns so file retention still sees them.
+    """
+    __tablename__ = 'archived_call_analyses'
+    __table_args__ = (
+        db.Index('ix_archived_call_analyses_team_created', 'team_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('report_templates.id'), nullable=False)
+    audio_file_path = db.Column(db.String(500))
+    image_file_path = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # JSON of the call_analyses and call_analysis_texts rows
+    payload = db.Column(CompressedText, nullable=False)
+
+    def to_dict(self):
+        """Convert archived analysis to dictionary"""
+        return {
+            'id': self.id,
+            'team_id': self.team_id,
+            'user_id': self.user_id,
+            'template_id': self.template_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None
+        }
+
+
+class ArchivedReport(db.Model):
+    """A report moved out of reports, with its field values"""
+    __tablename__ = 'archived_reports'
+    __table_args__ = (
+        db.Index('ix_archived_reports_team_created', 'team_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    analysis_id = db.Column(db.Integer, db.ForeignKey('archived_call_analyses.id'), nullable=False, index=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    template_id = db.Column(db.Integer, db.ForeignKey('report_templates.id'), nullable=False)
+    title = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # JSON of the reports row and its report_field_values rows
+    payload = db.Column(CompressedText, nullable=False)
+
+    def to_dict(self):
+        """Convert archived report to dictionary"""
+        return {
+            'id': self.id,
+            'analysis_id': self.analysis_id,
+            'team_id': self.team_id,
+            'user_id': self.user_id,
+            'template_id': self.template_id,
+            'title': self.title,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None
+        }
@@ -0,0 +1,65 @@
+from app import db
+
+
+class TeamDailyStats(db.Model):
+    """Per-team daily totals backing the dashboard analytics charts
+
+    Maintained incrementally by RollupService and rebuildable with
+    `flask rollups backfill`.
+    """
+    __tablename__ = 'team_daily_stats'
+
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    analysis_count = db.Column(db.Integer, nullable=False, default=0)
+    report_count = db.Column(db.Integer, nullable=False, default=0)
+    audio_seconds = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        """Convert daily stats to dictionary"""
+        return {
+            'team_id': self.team_id,
+            'date': self.day.isoformat() if self.day else None,
+            'analysis_count': self.analysis_count or 0,
+            'report_count': self.report_count or 0,
+            'audio_seconds': self.audio_seconds or 0
+        }
+
+
+class TemplateDailyStats(db.Model):
+    """Per-template daily totals within a team"""
+    __tablename__ = 'template_daily_stats'
+
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('report_templates.id'), primary_key=True)
+    analysis_count = db.Column(db.Integer, nullable=False, default=0)
+    report_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        """Convert template daily stats to dictionary"""
+        return {
+            'team_id': self.team_id,
+            'template_id': self.template_id,
+            'date': self.day.isoformat() if self.day else None,
+            'analysis_count': self.analysis_count or 0,
+            'report_count': self.report_count or 0
+        }
+
+
+class TemplateFieldDailyStats(db.Model):
+    """Per-field aggregates of one template revision's finalized reports on one day
+
+    A cache filled on demand by FieldAnalyticsService. Only closed days are
+    stored; rows are deleted when a report of that day is edited, finalized
+    or deleted, and recomputed on the next read.
+    """
+    __tablename__ = 'template_field_daily_stats'
+
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), primary_key=True)
+    template_revision_id = db.Column(db.Integer, db.ForeignKey('template_revisions.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    report_count = db.Column(db.Integer, nullable=False, default=0)
+    # {field_id: {'filled', 'not_mentioned', 'numbers' (sorted), 'options' ({option: count})}}
+    stats = db.Column(db.JSON, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,62 @@
+from app import db
+from datetime import datetime
+from sqlalchemy import event, DDL
+
+
+class ReportSearchDocument(db.Model):
+    """Flattened, searchable text for a report
+
+    One row per report holding the title, summary, field values and
+    transcription as plain text. The visibility columns (team, author,
+    status) are copied from the report so search results can be scoped
+    without joining back to `reports`.
+
+    MySQL searches this table through a FULLTEXT index on (title, body).
+    SQLite mirrors it into the `report_search_fts` FTS5 table.
+    """
+    __tablename__ = 'report_search_documents'
+
+    report_id = db.Column(db.Integer, db.ForeignKey('reports.id'), primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='draft')
+    title = db.Column(db.String(255), nullable=False, default='')
+    body = db.Column(db.Text)
+    report_created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert search document to dictionary"""
+        return {
+            'report_id': self.report_id,
+            'team_id': self.team_id,
+            'user_id': self.user_id,
+            'status': self.status,
+            'title': self.title,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+# Full-text structures are dialect specific, so they are created alongside the
+# table instead of being declared as regular indexes
+event.listen(
+    ReportSearchDocument.__table__,
+    'after_create',
+    DDL(
+        'ALTER TABLE report_search_documents '
+        'ADD FULLTEXT INDEX ft_report_search_documents (title, body)'
+    ).execute_if(dialect='mysql')
+)
+event.listen(
+    ReportSearchDocument.__table__,
+    'after_create',
+    DDL(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS report_search_fts '
+        'USING fts5(title, body)'
+    ).execute_if(dialect='sqlite')
+)
+event.listen(
+    ReportSearchDocument.__table__,
+    'before_drop',
+    DDL('DROP TABLE IF EXISTS report_search_fts').execute_if(dialect='sqlite')
+)
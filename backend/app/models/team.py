@@ -10,6 +10,8 @@ class Team(db.Model):
     owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Bumped whenever the team's templates (or their creators' names) change; keys cached template listings
+    template_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relationships
     members = db.relationship('TeamMember', backref='team', lazy=True, cascade='all, delete-orphan')
@@ -15,9 +15,25 @@ class ReportTemplate(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True, index=True)
     shared_with_team = db.Column(db.Boolean, default=False, index=True)
+    # Revision holding the template's current field set
+    current_revision_id = db.Column(
+        db.Integer,
+        db.ForeignKey('template_revisions.id', use_alter=True, name='fk_report_templates_current_revision'),
+        nullable=True
+    )
 
     # Relationships
-    fields = db.relationship('TemplateField', backref='template', lazy=True, cascade='all, delete-orphan', order_by='TemplateField.display_order')
+    revisions = db.relationship('TemplateRevision', backref='template', lazy=True,
+                                foreign_keys='TemplateRevision.template_id', order_by='TemplateRevision.revision_number')
+    current_revision = db.relationship('TemplateRevision', foreign_keys=[current_revision_id], post_update=True)
+    # Fields of the current revision
+    fields = db.relationship(
+        'TemplateField',
+        primaryjoin='ReportTemplate.current_revision_id == foreign(TemplateField.revision_id)',
+        viewonly=True,
+        lazy=True,
+        order_by='TemplateField.display_order'
+    )
     reports = db.relationship('Report', backref='template', lazy=True)
     analyses = db.relationship('CallAnalysis', backref='template', lazy=True)
 
@@ -33,6 +49,7 @@ class ReportTemplate(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'is_active': self.is_active,
             'shared_with_team': self.shared_with_team,
+            'revision_id': self.current_revision_id,
             'field_count': len(self.fields) if self.fields else 0
         }
 
@@ -42,11 +59,54 @@ class ReportTemplate(db.Model):
         return result
 
 
+class TemplateRevision(db.Model):
+    """Immutable snapshot of a template's field set
+
+    Editing a template's fields adds a revision instead of rewriting the
+    field rows, so field ids referenced by reports stay valid and anything
+    derived from a revision can be cached indefinitely.
+    """
+    __tablename__ = 'template_revisions'
+    __table_args__ = (
+        db.UniqueConstraint('template_id', 'revision_number', name='uq_template_revisions_template_number'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('report_templates.id'), nullable=False, index=True)
+    revision_number = db.Column(db.Integer, nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationships
+    fields = db.relationship('TemplateField', backref='revision', lazy=True, order_by='TemplateField.display_order')
+
+    def to_dict(self, include_fields=False):
+        """Convert revision to dictionary"""
+        result = {
+            'id': self.id,
+            'template_id': self.template_id,
+            'revision_number': self.revision_number,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+        if include_fields:
+            result['fields'] = [field.to_dict() for field in self.fields]
+
+        return result
+
+
 class TemplateField(db.Model):
     __tablename__ = 'template_fields'
 
     id = db.Column(db.Integer, primary_key=True)
     template_id = db.Column(db.Integer, db.ForeignKey('report_templates.id'), nullable=False, index=True)
+    revision_id = db.Column(
+        db.Integer,
+        db.ForeignKey('template_revisions.id', name='fk_template_fields_revision'),
+        nullable=False,
+        index=True
+    )
     field_name = db.Column(db.String(255), nullable=False)
     field_label = db.Column(db.String(255), nullable=False)
     field_type = db.Column(
@@ -87,6 +147,7 @@ class TemplateField(db.Model):
         return {
             'id': self.id,
             'template_id': self.template_id,
+            'revision_id': self.revision_id,
             'field_name': self.field_name,
             'field_label': self.field_label,
             'field_type': self.field_type,
@@ -0,0 +1,53 @@
+import zlib
+from app import db
+from sqlalchemy.dialects import mysql
+
+
+class CompressedText(db.TypeDecorator):
+    """Text stored zlib-compressed in a binary column
+
+    Values are prefixed with a one-byte codec marker so short strings that
+    don't benefit from compression can be stored as-is:
+        b'z' + zlib data, or b'r' + raw UTF-8
+    """
+    impl = db.LargeBinary
+    cache_ok = True
+
+    # Below this size compression rarely pays for the zlib header
+    MIN_COMPRESS_BYTES = 256
+    LEVEL = 6
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'mysql':
+            return dialect.type_descriptor(mysql.LONGBLOB())
+        return dialect.type_descriptor(db.LargeBinary())
+
+    @staticmethod
+    def compress(value):
+        if value is None:
+            return None
+        raw = value.encode('utf-8')
+        if len(raw) >= CompressedText.MIN_COMPRESS_BYTES:
+            packed = zlib.compress(raw, CompressedText.LEVEL)
+            if len(packed) < len(raw):
+                return b'z' + packed
+        return b'r' + raw
+
+    @staticmethod
+    def decompress(value):
+        if value is None:
+            return None
+        value = bytes(value)
+        codec, payload = value[:1], value[1:]
+        if codec == b'z':
+            return zlib.decompress(payload).decode('utf-8')
+        if codec == b'r':
+            return payload.decode('utf-8')
+        # Unprefixed legacy value
+        return value.decode('utf-8')
+
+    def process_bind_param(self, value, dialect):
+        return CompressedText.compress(value)
+
+    def process_result_value(self, value, dialect):
+        return CompressedText.decompress(value)
@@ -17,6 +17,11 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
+    # Bumped whenever the user, their memberships or teams they own change; every
+    # worker checks it before serving a cached identity
+    identity_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped whenever templates the user created change; keys their cached template listing
+    template_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relationships
     refresh_tokens = db.relationship('RefreshToken', backref='user', lazy=True, cascade='all, delete-orphan')
@@ -1,9 +1,13 @@
 from flask import Blueprint, request, jsonify
 from app.middleware.auth_middleware import token_required
+from app.db_routing import read_replica
 from app.services.audio_service import AudioService
 from app.services.transcription_service import TranscriptionService
 from app.services.analysis_service import AnalysisService
 from app.services.template_service import TemplateService
+from app.services.template_revision_service import TemplateRevisionService
+from app.services.retention_service import RetentionService
+from app.services.import_service import ImportService
 from app.models.analysis import CallAnalysis
 from app.models.template import ReportTemplate
 from app import db
@@ -58,13 +62,14 @@ def upload_audio(current_user):
         file_path, duration = AudioService.save_audio_file(file, current_user.id)
 
         # Get user's team
-        team = TemplateService.get_or_create_team(current_user.id)
+        team_id = TemplateService.get_or_create_team_id(current_user.id)
 
         # Create analysis record
         analysis = CallAnalysis(
             user_id=current_user.id,
-            team_id=team.id,
+            team_id=team_id,
             template_id=template_id,
+            template_revision_id=template.current_revision_id,
             audio_file_path=file_path,
             audio_duration=duration
         )
@@ -128,14 +133,14 @@ def create_text_analysis(current_user):
             }), 404
 
         # Get user's team
-        team = TemplateService.get_or_create_team(current_user.id)
+        team_id = TemplateService.get_or_create_team_id(current_user.id)
 
         # Create text analysis
         analysis = AnalysisService.create_text_analysis(
             text=text,
             template_id=template_id,
             user_id=current_user.id,
-            team_id=team.id
+            team_id=team_id
         )
 
         return jsonify({
@@ -240,14 +245,14 @@ def upload_image(current_user):
         relative_path = os.path.join('images', f'user_{current_user.id}', unique_filename)
 
         # Get user's team
-        team = TemplateService.get_or_create_team(current_user.id)
+        team_id = TemplateService.get_or_create_team_id(current_user.id)
 
         # Create image analysis record
         analysis = AnalysisService.create_image_analysis(
             image_path=relative_path,
             template_id=template_id,
             user_id=current_user.id,
-            team_id=team.id
+            team_id=team_id
         )
 
         return jsonify({
@@ -318,6 +323,13 @@ def analyze_call(current_user):
             transcription = analysis.transcription
         elif analysis.input_type == 'audio':
             # Audio input: need to transcribe
+            if not analysis.audio_file_path:
+                return jsonify({
+                    'success': False,
+                    'message': 'The audio for this analysis is no longer retained'
+                }), 410
+            if RetentionService.is_cold(analysis.audio_file_path):
+                RetentionService.thaw_audio(analysis)
             absolute_path = AudioService.get_absolute_path(analysis.audio_file_path)
             transcription = TranscriptionService.transcribe_audio(absolute_path)
 
@@ -326,6 +338,11 @@ def analyze_call(current_user):
             db.session.commit()
         elif analysis.input_type == 'image':
             # Image input: extract text using GPT-4 Vision
+            if not analysis.image_file_path:
+                return jsonify({
+                    'success': False,
+                    'message': 'The image for this analysis is no longer retained'
+                }), 410
             absolute_path = AudioService.get_absolute_path(analysis.image_file_path)
             transcription = AnalysisService.extract_text_from_image(absolute_path, template)
 
@@ -339,22 +356,24 @@ def analyze_call(current_user):
             }), 400
 
         # Analyze transcription with GPT-4
-        analysis_result = AnalysisService.analyze_transcription(transcription, template)
+        # Use the field set the analysis was started with, even if the template changed since
+        revision_id = analysis.template_revision_id or template.current_revision_id
+        analysis_result = AnalysisService.analyze_transcription(transcription, template, revision_id)
 
         # Build field values response
         field_values = []
-        for field in template.fields:
+        for field in TemplateRevisionService.get_fields(revision_id):
             # Find matching field in analysis result
             field_result = next(
-                (f for f in analysis_result.get('fields', []) if f['field_name'] == field.field_name),
+                (f for f in analysis_result.get('fields', []) if f['field_name'] == field['field_name']),
                 None
             )
 
             field_values.append({
-                'field_id': field.id,
-                'field_name': field.field_name,
-                'field_label': field.field_label,
-                'field_type': field.field_type,
+                'field_id': field['id'],
+                'field_name': field['field_name'],
+                'field_label': field['field_label'],
+                'field_type': field['field_type'],
                 'generated_value': field_result['value'] if field_result else None
             })
 
@@ -445,7 +464,86 @@ def finalize_analysis(current_user):
         }), 500
 
 
+@analysis_bp.route('/bulk-import', methods=['POST'])
+@token_required
+def bulk_import(current_user):
+    """Import an NDJSON or zip upload of transcripts and audio as draft reports
+
+    Accepts a multipart form with 'file' and 'template_id', or a raw
+    application/x-ndjson or application/zip body with ?template_id=.
+    The upload is read here; analysis runs in the background.
+    """
+    try:
+        if request.content_type and 'multipart/form-data' in request.content_type:
+            file = request.files.get('file')
+            template_id = request.form.get('template_id', type=int)
+            if not file or file.filename == '':
+                return jsonify({
+                    'success': False,
+                    'message': 'No file provided'
+                }), 400
+            source_type = 'zip' if file.filename.lower().endswith('.zip') else 'ndjson'
+            stream = file.stream
+        else:
+            template_id = request.args.get('template_id', type=int)
+            source_type = 'zip' if request.mimetype in ('application/zip', 'application/x-zip-compressed') else 'ndjson'
+            stream = request.stream
+
+        if not template_id:
+            return jsonify({
+                'success': False,
+                'message': 'Template ID is required'
+            }), 400
+
+        job = ImportService.create_job(current_user.id, template_id, source_type)
+        job = ImportService.ingest(job, stream)
+
+        return jsonify({
+            'success': True,
+            'data': job.to_dict()
+        }), 202
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        print(f"Bulk import error: {e}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to import transcripts'
+        }), 500
+
+
+@analysis_bp.route('/bulk-import/<int:job_id>', methods=['GET'])
+@token_required
+def get_bulk_import(current_user, job_id):
+    """Get progress and per-item failures of a bulk import"""
+    try:
+        failures_limit = request.args.get('failures_limit', None, type=int)
+        job = ImportService.get_job(job_id, current_user.id, failures_limit=failures_limit)
+
+        return jsonify({
+            'success': True,
+            'data': job
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        print(f"Bulk import status error: {e}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to get import status'
+        }), 500
+
+
 @analysis_bp.route('/history', methods=['GET'])
+@read_replica
 @token_required
 def get_analysis_history(current_user):
     """Get user's analysis history"""
@@ -455,16 +553,22 @@ def get_analysis_history(current_user):
             user_id=current_user.id
         ).order_by(CallAnalysis.created_at.desc()).limit(50).all()
 
+        # Template names in one query; transcripts themselves are never loaded here
+        template_ids = {analysis.template_id for analysis in analyses}
+        template_names = dict(
+            db.session.query(ReportTemplate.id, ReportTemplate.name).filter(
+                ReportTemplate.id.in_(template_ids)
+            ).all()
+        ) if template_ids else {}
+
         analyses_data = []
         for analysis in analyses:
-            template = ReportTemplate.query.get(analysis.template_id)
-
             analyses_data.append({
                 'id': analysis.id,
-                'template_name': template.name if template else 'Unknown',
+                'template_name': template_names.get(analysis.template_id, 'Unknown'),
                 'audio_duration': analysis.audio_duration,
                 'audio_duration_formatted': analysis.get_audio_duration_formatted(),
-                'has_transcription': bool(analysis.transcription),
+                'has_transcription': analysis.has_transcription(),
                 'created_at': analysis.created_at.isoformat() if analysis.created_at else None
             })
 
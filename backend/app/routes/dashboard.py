@@ -1,17 +1,21 @@
 from flask import Blueprint, request, jsonify
 from app.middleware.auth_middleware import token_required
+from app.db_routing import read_replica
 from app.services.dashboard_service import DashboardService
+from app.services.field_analytics_service import FieldAnalyticsService
+from app.services.identity_service import IdentityService
 from app.models.team import TeamMember, Team
 from app import db
+from datetime import datetime, date, timedelta
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
 
 def get_user_team_id(user_id):
     """Get the team ID for a user, create team if doesn't exist"""
-    team_member = TeamMember.query.filter_by(user_id=user_id).first()
+    team_id = IdentityService.primary_team_id(user_id)
 
-    if not team_member:
+    if not team_id:
         # Create a default team for the user
         from app.models.user import User
         user = User.query.get(user_id)
@@ -33,10 +37,11 @@ def get_user_team_id(user_id):
 
         return team.id
 
-    return team_member.team_id
+    return team_id
 
 
 @dashboard_bp.route('/metrics', methods=['GET'])
+@read_replica
 @token_required
 def get_metrics(current_user):
     """Get dashboard metrics"""
@@ -63,14 +68,17 @@ def get_metrics(current_user):
 
 
 @dashboard_bp.route('/recent-activity', methods=['GET'])
+@read_replica
 @token_required
 def get_recent_activity(current_user):
     """Get recent activity"""
     try:
         team_id = get_user_team_id(current_user.id)
         limit = request.args.get('limit', 10, type=int)
+        types = request.args.get('types')
+        event_types = [t.strip() for t in types.split(',') if t.strip()] if types else None
 
-        activities = DashboardService.get_recent_activity(team_id, limit)
+        activities = DashboardService.get_recent_activity(team_id, limit, event_types=event_types)
 
         return jsonify({
             'success': True,
@@ -91,14 +99,16 @@ def get_recent_activity(current_user):
 
 
 @dashboard_bp.route('/analytics', methods=['GET'])
+@read_replica
 @token_required
 def get_analytics(current_user):
     """Get analytics data for charts"""
     try:
         team_id = get_user_team_id(current_user.id)
         days = request.args.get('days', 30, type=int)
+        by_template = request.args.get('by_template', 'false').lower() == 'true'
 
-        analytics = DashboardService.get_analytics_data(team_id, days)
+        analytics = DashboardService.get_analytics_data(team_id, days, by_template=by_template)
 
         return jsonify({
             'success': True,
@@ -116,3 +126,38 @@ def get_analytics(current_user):
             'success': False,
             'message': 'Failed to get analytics'
         }), 500
+
+
+@dashboard_bp.route('/field-stats', methods=['GET'])
+@read_replica
+@token_required
+def get_field_stats(current_user):
+    """Get per-field statistics of a template's reports for charts"""
+    try:
+        team_id = get_user_team_id(current_user.id)
+        template_id = request.args.get('template_id', type=int)
+        days = request.args.get('days', 30, type=int)
+
+        end = request.args.get('end')
+        start = request.args.get('start')
+        end_day = date.fromisoformat(end) if end else datetime.utcnow().date()
+        start_day = date.fromisoformat(start) if start else end_day - timedelta(days=max(days, 1) - 1)
+
+        stats = FieldAnalyticsService.get_field_stats(team_id, template_id, start_day, end_day)
+
+        return jsonify({
+            'success': True,
+            'data': stats
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        print(f"Error getting field stats: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to get field stats'
+        }), 500
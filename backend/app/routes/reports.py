@@ -1,12 +1,18 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context, current_app
 from app.middleware.auth_middleware import token_required
+from app.db_routing import read_replica
 from app.services.report_service import ReportService
 from app.services.pdf_service import PDFService
+from app.services.pdf_render_service import PDFRenderService
+from app.services.pdf_archive_service import PDFArchiveService
 from app.services.email_service import EmailService
-from app.models.team import TeamMember
+from app.services.search_service import SearchService
+from app.services.field_index_service import FieldIndexService
+from app.services.identity_service import IdentityService
+from app.services.export_service import ExportService
 from app.models.report import Report
-from app import db
-from datetime import datetime
+from datetime import date
+import io
 import os
 
 reports_bp = Blueprint('reports', __name__)
@@ -14,13 +20,91 @@ reports_bp = Blueprint('reports', __name__)
 
 def get_user_team_id(user_id):
     """Get the team ID for a user"""
-    team_member = TeamMember.query.filter_by(user_id=user_id).first()
-    if not team_member:
+    team_id = IdentityService.primary_team_id(user_id)
+    if not team_id:
         raise ValueError("User is not part of any team")
-    return team_member.team_id
+    return team_id
+
+
+# Seconds a client should wait before asking again for a PDF still being rendered
+PDF_RETRY_AFTER = 2
+# Signed links are opened in a browser, which won't retry, so they wait longer for a render
+SHARED_PDF_WAIT_SECONDS = 60
+
+
+def pdf_pending_response():
+    """202 telling the client the PDF is being rendered and to retry"""
+    response = jsonify({
+        'success': True,
+        'data': {
+            'status': 'pending',
+            'retry_after': PDF_RETRY_AFTER
+        }
+    })
+    response.status_code = 202
+    response.headers['Retry-After'] = str(PDF_RETRY_AFTER)
+    return response
+
+
+def pdf_download_name(report):
+    """Filename for a report's PDF, from its sanitized title"""
+    report_title = report.title or f'report_{report.id}'
+    safe_title = "".join(c for c in report_title if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    return f"{safe_title}.pdf" if safe_title else f"report_{report.id}.pdf"
+
+
+def pdf_not_modified(etag):
+    """304 if the client already holds this revision of the PDF, else None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def send_report_pdf(report, user_id, wait=None):
+    """Conditional PDF download response for a report's current revision"""
+    # The ETag names the report revision, so a client that has it needs no render at all
+    etag = PDFService.etag(report)
+    not_modified = pdf_not_modified(etag)
+    if not_modified:
+        return not_modified
+
+    def load_report_data():
+        return ReportService.get_report_by_id(
+            report_id=report.id,
+            user_id=user_id,
+            team_id=report.team_id
+        )
+
+    if current_app.config['PDF_DOWNLOAD_IN_MEMORY']:
+        pdf_bytes = PDFRenderService.render_bytes(report, load_report_data, wait=wait)
+        if pdf_bytes is None:
+            return pdf_pending_response()
+        pdf_source = io.BytesIO(pdf_bytes)
+    else:
+        # Cached render, or one from the render pool if the report changed since
+        pdf_source = PDFRenderService.get_report_pdf(report, load_report_data, wait=wait)
+        if not pdf_source:
+            return pdf_pending_response()
+
+    # Send file with proper headers; clients must revalidate, which costs a 304
+    response = send_file(
+        pdf_source,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=pdf_download_name(report),
+        etag=etag,
+        conditional=True
+    )
+    response.cache_control.private = True
+    return response
 
 
 @reports_bp.route('', methods=['GET'])
+@read_replica
 @token_required
 def get_reports(current_user):
     """Get all reports with pagination and filters"""
@@ -34,12 +118,7 @@ def get_reports(current_user):
 
         # If team_id is provided, verify user is member of that team
         if requested_team_id:
-            member = TeamMember.query.filter_by(
-                user_id=current_user.id,
-                team_id=requested_team_id
-            ).first()
-
-            if not member:
+            if not IdentityService.is_member(current_user.id, requested_team_id):
                 return jsonify({
                     'success': False,
                     'message': 'You are not a member of this team'
@@ -85,7 +164,193 @@ def get_reports(current_user):
         }), 500
 
 
+@reports_bp.route('/search', methods=['GET'])
+@read_replica
+@token_required
+def search_reports(current_user):
+    """Full-text search over report titles, summaries, field values and transcriptions"""
+    try:
+        query_text = request.args.get('q', '', type=str)
+        page = request.args.get('page', 1, type=int)
+        limit = request.args.get('limit', 20, type=int)
+        status = request.args.get('status', None)
+        requested_team_id = request.args.get('team_id', None, type=int)
+
+        if not query_text.strip():
+            return jsonify({
+                'success': False,
+                'message': 'Search query is required'
+            }), 400
+
+        # If team_id is provided, verify user is member of that team
+        if requested_team_id:
+            if not IdentityService.is_member(current_user.id, requested_team_id):
+                return jsonify({
+                    'success': False,
+                    'message': 'You are not a member of this team'
+                }), 403
+
+            team_id = requested_team_id
+        else:
+            team_id = get_user_team_id(current_user.id)
+
+        result = SearchService.search_reports(
+            user_id=current_user.id,
+            team_id=team_id,
+            query_text=query_text,
+            page=max(page, 1),
+            limit=min(max(limit, 1), 100),
+            status=status
+        )
+
+        return jsonify({
+            'success': True,
+            'data': result
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        print(f"Error searching reports for user {current_user.id}: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'message': 'Failed to search reports'
+        }), 500
+
+
+@reports_bp.route('/query', methods=['POST'])
+@read_replica
+@token_required
+def query_reports(current_user):
+    """Find a template's reports by field values
+
+    Body:
+        {
+            "template_id": 3,
+            "filters": [
+                {"field": "sentiment", "op": "eq", "value": "Negative"},
+                {"field": "score", "op": "gte", "value": 8}
+            ],
+            "status": "finalized", "page": 1, "limit": 20, "team_id": 1
+        }
+
+    Operators: eq and in for any indexed field; gt, gte, lt, lte and
+    between ([low, high]) for number fields. Filters are ANDed.
+    """
+    try:
+        data = request.get_json() or {}
+        requested_team_id = data.get('team_id')
+
+        # If team_id is provided, verify user is member of that team
+        if requested_team_id:
+            if not IdentityService.is_member(current_user.id, requested_team_id):
+                return jsonify({
+                    'success': False,
+                    'message': 'You are not a member of this team'
+                }), 403
+
+            team_id = requested_team_id
+        else:
+            team_id = get_user_team_id(current_user.id)
+
+        page = data.get('page', 1)
+        limit = data.get('limit', 20)
+        if not isinstance(page, int) or not isinstance(limit, int):
+            raise ValueError("page and limit must be integers")
+
+        result = FieldIndexService.query_reports(
+            user_id=current_user.id,
+            team_id=team_id,
+            template_id=data.get('template_id'),
+            filters=data.get('filters'),
+            page=max(page, 1),
+            limit=min(max(limit, 1), 100),
+            status=data.get('status', 'finalized')
+        )
+
+        return jsonify({
+            'success': True,
+            'data': result
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        print(f"Error querying reports for user {current_user.id}: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'message': 'Failed to query reports'
+        }), 500
+
+
+@reports_bp.route('/export', methods=['GET'])
+@read_replica
+@token_required
+def export_reports(current_user):
+    """Stream the team's reports as CSV, NDJSON or XLSX"""
+    try:
+        fmt = request.args.get('format', 'csv').lower()
+        template_id = request.args.get('template_id', None, type=int)
+        status = request.args.get('status', None)
+        start = request.args.get('start')
+        end = request.args.get('end')
+        requested_team_id = request.args.get('team_id', None, type=int)
+
+        if requested_team_id:
+            if not IdentityService.is_member(current_user.id, requested_team_id):
+                return jsonify({
+                    'success': False,
+                    'message': 'You are not a member of this team'
+                }), 403
+            team_id = requested_team_id
+        else:
+            team_id = get_user_team_id(current_user.id)
+
+        plan = ExportService.prepare(
+            fmt,
+            team_id,
+            user_id=current_user.id,
+            template_id=template_id,
+            status=status,
+            start_day=date.fromisoformat(start) if start else None,
+            end_day=date.fromisoformat(end) if end else None
+        )
+
+        return Response(
+            stream_with_context(ExportService.stream(plan)),
+            mimetype=plan['mimetype'],
+            headers={
+                'Content-Disposition': f'attachment; filename="{plan["filename"]}"',
+                # Let proxies pass chunks through as they are produced
+                'X-Accel-Buffering': 'no'
+            }
+        )
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        print(f"Error exporting reports: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to export reports'
+        }), 500
+
+
 @reports_bp.route('/<int:report_id>', methods=['GET'])
+@read_replica
 @token_required
 def get_report(current_user, report_id):
     """Get a single report with full details"""
@@ -199,27 +464,21 @@ def generate_pdf(current_user, report_id):
             raise ValueError("Report not found")
 
         # Check if user is a member of the report's team
-        member = TeamMember.query.filter_by(
-            user_id=current_user.id,
-            team_id=report.team_id
-        ).first()
-
-        if not member:
+        if not IdentityService.is_member(current_user.id, report.team_id):
             raise ValueError("You don't have access to this report")
 
-        # Get report data
-        report_data = ReportService.get_report_by_id(
+        # Cached render, or one from the render pool if the report changed since
+        pdf_path = PDFRenderService.get_report_pdf(report, lambda: ReportService.get_report_by_id(
             report_id=report_id,
             user_id=current_user.id,
             team_id=report.team_id
-        )
-
-        # Generate PDF
-        pdf_path = PDFService.generate_report_pdf(report_data)
+        ))
+        if not pdf_path:
+            return pdf_pending_response()
 
         # Get relative path for URL
         pdf_filename = os.path.basename(pdf_path)
-        pdf_url = f"/generated/pdfs/{pdf_filename}"
+        pdf_url = f"/generated/pdfs/{PDFService.CACHE_DIR}/{report.id}/{pdf_filename}"
 
         return jsonify({
             'success': True,
@@ -255,57 +514,148 @@ def download_pdf(current_user, report_id):
             raise ValueError("Report not found")
 
         # Check if user is a member of the report's team
-        member = TeamMember.query.filter_by(
-            user_id=current_user.id,
-            team_id=report.team_id
-        ).first()
-
-        if not member:
+        if not IdentityService.is_member(current_user.id, report.team_id):
             raise ValueError("You don't have access to this report")
 
-        # Get report data
-        report_data = ReportService.get_report_by_id(
-            report_id=report_id,
-            user_id=current_user.id,
-            team_id=report.team_id
-        )
+        return send_report_pdf(report, current_user.id)
 
-        # Generate PDF
-        pdf_path = PDFService.generate_report_pdf(report_data)
+    except ValueError as e:
+        print(f"ValueError downloading PDF: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        print(f"Error downloading PDF: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to download PDF: {str(e)}'
+        }), 500
 
-        # Verify file exists
-        if not os.path.exists(pdf_path):
-            raise ValueError(f"Generated PDF file not found: {pdf_path}")
 
-        # Get report title for filename
-        report_title = report_data.get('title', f'report_{report_id}')
-        # Sanitize filename
-        safe_title = "".join(c for c in report_title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        filename = f"{safe_title}.pdf" if safe_title else f"report_{report_id}.pdf"
+@reports_bp.route('/shared-pdf/<token>', methods=['GET'])
+def download_shared_pdf(token):
+    """Download a report PDF through a signed link from a share email"""
+    try:
+        report_id, team_id = PDFService.verify_link_token(token)
+        report = Report.query.get(report_id)
+        if not report or report.team_id != team_id:
+            raise ValueError("Report not found")
 
-        print(f"Sending PDF file: {pdf_path} as {filename}")
+        return send_report_pdf(report, report.user_id, wait=SHARED_PDF_WAIT_SECONDS)
 
-        # Send file with proper headers
-        return send_file(
-            pdf_path,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        print(f"Error downloading shared PDF: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to download PDF'
+        }), 500
+
+
+@reports_bp.route('/batch-pdf', methods=['POST'])
+@token_required
+def batch_download_pdfs(current_user):
+    """Stream a ZIP of report PDFs, chosen by ID or by the export filters"""
+    try:
+        data = request.get_json(silent=True) or {}
+        report_ids = data.get('report_ids')
+        requested_team_id = data.get('team_id')
+
+        if report_ids is not None and (not report_ids or not isinstance(report_ids, list)):
+            return jsonify({
+                'success': False,
+                'message': 'Report IDs array is required'
+            }), 400
+
+        if requested_team_id:
+            if not IdentityService.is_member(current_user.id, requested_team_id):
+                return jsonify({
+                    'success': False,
+                    'message': 'You are not a member of this team'
+                }), 403
+            team_id = requested_team_id
+        else:
+            team_id = get_user_team_id(current_user.id)
+
+        start = data.get('start')
+        end = data.get('end')
+        plan = PDFArchiveService.prepare(
+            team_id,
+            current_user.id,
+            report_ids=report_ids,
+            template_id=data.get('template_id'),
+            status=data.get('status'),
+            start_day=date.fromisoformat(start) if start else None,
+            end_day=date.fromisoformat(end) if end else None
+        )
+
+        def load_report_data(report):
+            return ReportService.get_report_by_id(
+                report_id=report.id,
+                user_id=current_user.id,
+                team_id=report.team_id
+            )
+
+        return Response(
+            stream_with_context(PDFArchiveService.stream(plan, load_report_data)),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename="{plan["filename"]}"',
+                # Let proxies pass chunks through as they are produced
+                'X-Accel-Buffering': 'no'
+            }
         )
 
     except ValueError as e:
-        print(f"ValueError downloading PDF: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        print(f"Error building PDF archive: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to download PDFs'
+        }), 500
+
+
+@reports_bp.route('/<int:report_id>/pdf-status', methods=['GET'])
+@token_required
+def get_pdf_status(current_user, report_id):
+    """Whether the PDF of a report's current revision is ready, rendering or not started"""
+    try:
+        report = Report.query.get(report_id)
+
+        if not report:
+            raise ValueError("Report not found")
+
+        if not IdentityService.is_member(current_user.id, report.team_id):
+            raise ValueError("You don't have access to this report")
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'status': PDFRenderService.status(report)
+            }
+        }), 200
+
+    except ValueError as e:
         return jsonify({
             'success': False,
             'message': str(e)
         }), 404
     except Exception as e:
-        print(f"Error downloading PDF: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        print(f"Error getting PDF status: {str(e)}")
         return jsonify({
             'success': False,
-            'message': f'Failed to download PDF: {str(e)}'
+            'message': 'Failed to get PDF status'
         }), 500
 
 
@@ -322,12 +672,7 @@ def share_email(current_user, report_id):
             raise ValueError("Report not found")
 
         # Check if user is a member of the report's team
-        member = TeamMember.query.filter_by(
-            user_id=current_user.id,
-            team_id=report.team_id
-        ).first()
-
-        if not member:
+        if not IdentityService.is_member(current_user.id, report.team_id):
             raise ValueError("You don't have access to this report")
 
         data = request.get_json()
@@ -347,24 +692,31 @@ def share_email(current_user, report_id):
             team_id=report.team_id
         )
 
-        # Generate PDF
-        pdf_path = PDFService.generate_report_pdf(report_data)
+        # Cached render, or one from the render pool if the report changed since
+        pdf_path = PDFRenderService.get_report_pdf(report, lambda: report_data)
+        if not pdf_path:
+            return pdf_pending_response()
 
-        # Send email
+        # Queue the email; the outbox senders deliver it
         sender_name = f"{current_user.first_name} {current_user.last_name}"
         custom_message = data.get('message')
 
-        EmailService.send_report_email(
+        email = EmailService.send_report_email(
             recipients=recipients,
             report_data=report_data,
             pdf_path=pdf_path,
             sender_name=sender_name,
-            custom_message=custom_message
+            custom_message=custom_message,
+            pdf_name=pdf_download_name(report)
         )
 
         return jsonify({
             'success': True,
-            'message': 'Report shared successfully via email'
+            'data': {
+                'email_id': email.id,
+                'status': email.status
+            },
+            'message': 'Report queued for delivery via email'
         }), 200
 
     except ValueError as e:
@@ -381,6 +733,7 @@ def share_email(current_user, report_id):
 
 
 @reports_bp.route('/drafts', methods=['GET'])
+@read_replica
 @token_required
 def get_drafts(current_user):
     """Get all draft reports"""
@@ -526,12 +879,7 @@ def share_whatsapp(current_user, report_id):
             raise ValueError("Report not found")
 
         # Check if user is a member of the report's team
-        member = TeamMember.query.filter_by(
-            user_id=current_user.id,
-            team_id=report.team_id
-        ).first()
-
-        if not member:
+        if not IdentityService.is_member(current_user.id, report.team_id):
             raise ValueError("You don't have access to this report")
 
         # Get report data
@@ -541,8 +889,10 @@ def share_whatsapp(current_user, report_id):
             team_id=report.team_id
         )
 
-        # Generate PDF
-        pdf_path = PDFService.generate_report_pdf(report_data)
+        # Cached render, or one from the render pool if the report changed since
+        pdf_path = PDFRenderService.get_report_pdf(report, lambda: report_data)
+        if not pdf_path:
+            return pdf_pending_response()
         pdf_filename = os.path.basename(pdf_path)
 
         # Create WhatsApp message
@@ -599,12 +949,7 @@ def get_share_link(current_user, report_id):
             raise ValueError("Report not found")
 
         # Check if user is a member of the report's team
-        member = TeamMember.query.filter_by(
-            user_id=current_user.id,
-            team_id=report.team_id
-        ).first()
-
-        if not member:
+        if not IdentityService.is_member(current_user.id, report.team_id):
             raise ValueError("You don't have access to this report")
 
         # Generate shareable link
@@ -768,31 +1113,7 @@ def batch_delete_reports(current_user):
             }), 400
 
         team_id = get_user_team_id(current_user.id)
-        deleted_count = 0
-        failed_ids = []
-
-        for report_id in report_ids:
-            try:
-                # Get report and verify access
-                report = Report.query.get(report_id)
-                if not report:
-                    failed_ids.append(report_id)
-                    continue
-
-                # Check if user has access (same team)
-                if report.team_id != team_id:
-                    failed_ids.append(report_id)
-                    continue
-
-                # Delete report
-                db.session.delete(report)
-                deleted_count += 1
-
-            except Exception as e:
-                print(f"Error deleting report {report_id}: {str(e)}")
-                failed_ids.append(report_id)
-
-        db.session.commit()
+        deleted_count, failed_ids = ReportService.batch_delete_reports(report_ids, team_id)
 
         return jsonify({
             'success': True,
@@ -828,37 +1149,7 @@ def batch_finalize_reports(current_user):
             }), 400
 
         team_id = get_user_team_id(current_user.id)
-        finalized_count = 0
-        failed_ids = []
-
-        for report_id in report_ids:
-            try:
-                # Get report and verify access
-                report = Report.query.get(report_id)
-                if not report:
-                    failed_ids.append(report_id)
-                    continue
-
-                # Check if user has access (same team)
-                if report.team_id != team_id:
-                    failed_ids.append(report_id)
-                    continue
-
-                # Check if already finalized
-                if report.status == 'finalized':
-                    failed_ids.append(report_id)
-                    continue
-
-                # Finalize report
-                report.status = 'finalized'
-                report.finalized_at = datetime.utcnow()
-                finalized_count += 1
-
-            except Exception as e:
-                print(f"Error finalizing report {report_id}: {str(e)}")
-                failed_ids.append(report_id)
-
-        db.session.commit()
+        finalized_count, failed_ids = ReportService.batch_finalize_reports(report_ids, team_id, current_user)
 
         return jsonify({
             'success': True,
@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify
 from app.middleware.auth_middleware import token_required
+from app.db_routing import read_replica
 from app.services.team_service import TeamService
+from app.services.search_service import SearchService
+from app.services.identity_service import IdentityService
+from app.services.retention_service import RetentionService
 from app.models.team import TeamMember, Team
 from app.models.template import ReportTemplate
 from app.models.report import Report
@@ -13,10 +17,10 @@ teams_bp = Blueprint('teams', __name__)
 
 def get_user_team_id(user_id):
     """Get the team ID for a user"""
-    team_member = TeamMember.query.filter_by(user_id=user_id).first()
-    if not team_member:
+    team_id = IdentityService.primary_team_id(user_id)
+    if not team_id:
         raise ValueError("User is not part of any team")
-    return team_member.team_id
+    return team_id
 
 
 @teams_bp.route('', methods=['GET'])
@@ -46,6 +50,7 @@ def get_team(current_user):
 
 
 @teams_bp.route('/members', methods=['GET'])
+@read_replica
 @token_required
 def get_members(current_user):
     """Get all members of the user's team"""
@@ -498,6 +503,7 @@ def leave_team(current_user, team_id):
 
 
 @teams_bp.route('/dashboard', methods=['GET'])
+@read_replica
 @token_required
 def get_team_dashboard(current_user):
     """Get team dashboard metrics and reports"""
@@ -567,6 +573,7 @@ def get_team_dashboard(current_user):
 
 
 @teams_bp.route('/dashboard/reports', methods=['GET'])
+@read_replica
 @token_required
 def get_team_dashboard_reports(current_user):
     """Get team reports for the dashboard"""
@@ -596,8 +603,8 @@ def get_team_dashboard_reports(current_user):
         )
 
         # Apply search filter
-        if search:
-            query = query.filter(Report.title.ilike(f'%{search}%'))
+        if search and search.strip():
+            query = query.filter(Report.id.in_(SearchService.matching_report_ids(search.strip())))
 
         # Apply template filter
         if template_id:
@@ -667,3 +674,111 @@ def get_team_dashboard_reports(current_user):
             'success': False,
             'message': 'Failed to get team reports'
         }), 500
+
+
+@teams_bp.route('/retention', methods=['GET'])
+@token_required
+def get_retention_policy(current_user):
+    """Get the team's retention settings"""
+    try:
+        team_id = get_user_team_id(current_user.id)
+        policy = RetentionService.get_policy(team_id)
+
+        return jsonify({
+            'success': True,
+            'data': policy
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        print(f"Error getting retention policy: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to get retention policy'
+        }), 500
+
+
+@teams_bp.route('/retention', methods=['PUT'])
+@token_required
+def update_retention_policy(current_user):
+    """Update the team's retention settings (owner only)"""
+    try:
+        team_id = get_user_team_id(current_user.id)
+        policy = RetentionService.update_policy(team_id, current_user.id, request.get_json() or {})
+
+        return jsonify({
+            'success': True,
+            'data': policy
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        print(f"Error updating retention policy: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to update retention policy'
+        }), 500
+
+
+@teams_bp.route('/archived-reports', methods=['GET'])
+@read_replica
+@token_required
+def get_archived_reports(current_user):
+    """Get the team's archived reports"""
+    try:
+        team_id = get_user_team_id(current_user.id)
+        page = request.args.get('page', 1, type=int)
+        limit = request.args.get('limit', 20, type=int)
+
+        result = RetentionService.get_archived_reports(current_user.id, team_id, page, limit)
+
+        return jsonify({
+            'success': True,
+            'data': result
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        print(f"Error getting archived reports: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to get archived reports'
+        }), 500
+
+
+@teams_bp.route('/archived-reports/<int:report_id>/restore', methods=['POST'])
+@token_required
+def restore_archived_report(current_user, report_id):
+    """Restore an archived report, with the rest of its analysis"""
+    try:
+        team_id = get_user_team_id(current_user.id)
+        restored = RetentionService.restore_report(report_id, current_user.id, team_id)
+
+        return jsonify({
+            'success': True,
+            'data': restored
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        print(f"Error restoring archived report: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Failed to restore archived report'
+        }), 500
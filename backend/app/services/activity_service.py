@@ -0,0 +1,159 @@
+from app import db
+from app.models.activity import ActivityEvent
+from app.models.user import User
+from app.models.report import Report
+from app.models.template import ReportTemplate
+from app.services.identity_service import IdentityService
+from sqlalchemy import insert
+from datetime import datetime
+
+
+class ActivityService:
+    # Event types shown on the dashboard feed by default
+    FEED_EVENT_TYPES = ('report_created', 'template_created', 'draft_finalized', 'member_joined')
+
+    @staticmethod
+    def _actor_name(actor):
+        """Display name for a user (or user id), resolved once at write time"""
+        if actor is None:
+            return None, 'Unknown'
+
+        if not isinstance(actor, int):
+            first_name, last_name, actor_id = actor.first_name, actor.last_name, actor.id
+        else:
+            actor_id = actor
+            identity = IdentityService.get_identity(actor_id)
+            if not identity:
+                return actor_id, 'Unknown'
+            first_name, last_name = identity['first_name'], identity['last_name']
+
+        name = f"{first_name or ''} {last_name or ''}".strip()
+        return actor_id, name or 'Unknown'
+
+    @staticmethod
+    def record(team_id, event_type, actor, subject_type=None, subject_id=None, subject_title=None):
+        """Append an activity event to the current transaction
+
+        Args:
+            team_id: Team the event belongs to
+            event_type: e.g. 'report_created', 'template_created', 'member_joined'
+            actor: User instance or user id that performed the action
+            subject_type: 'report', 'template' or 'team'
+            subject_id: ID of the subject
+            subject_title: Subject name as it should appear in the feed
+
+        Returns:
+            ActivityEvent: The pending event (committed with the caller's transaction)
+        """
+        if not team_id:
+            return None
+
+        actor_id, actor_name = ActivityService._actor_name(actor)
+
+        event = ActivityEvent(
+            team_id=team_id,
+            event_type=event_type,
+            actor_id=actor_id,
+            actor_name=actor_name,
+            subject_type=subject_type,
+            subject_id=subject_id,
+            subject_title=(subject_title or '')[:255] or None
+        )
+        db.session.add(event)
+        return event
+
+    @staticmethod
+    def record_many(team_id, event_type, actor, subject_type, subjects):
+        """Append one event per (subject_id, subject_title) in a single insert"""
+        if not team_id or not subjects:
+            return
+
+        actor_id, actor_name = ActivityService._actor_name(actor)
+        now = datetime.utcnow()
+
+        db.session.execute(insert(ActivityEvent.__table__), [
+            {
+                'team_id': team_id,
+                'event_type': event_type,
+                'actor_id': actor_id,
+                'actor_name': actor_name,
+                'subject_type': subject_type,
+                'subject_id': subject_id,
+                'subject_title': (subject_title or '')[:255] or None,
+                'created_at': now
+            }
+            for subject_id, subject_title in subjects
+        ])
+
+    @staticmethod
+    def get_feed(team_id, limit=10, event_types=None):
+        """Most recent events for a team in one indexed range read"""
+        event_types = event_types or ActivityService.FEED_EVENT_TYPES
+
+        events = ActivityEvent.query.filter(
+            ActivityEvent.team_id == team_id,
+            ActivityEvent.event_type.in_(event_types)
+        ).order_by(
+            ActivityEvent.created_at.desc(),
+            ActivityEvent.id.desc()
+        ).limit(limit).all()
+
+        return [event.to_dict() for event in events]
+
+    @staticmethod
+    def backfill(team_id=None):
+        """Seed the log from existing finalized reports and active templates
+
+        Only teams without any events yet are seeded, so running it twice
+        does not duplicate history.
+
+        Returns:
+            int: Number of events written
+        """
+        seeded_teams = {row[0] for row in db.session.query(ActivityEvent.team_id).distinct()}
+
+        report_query = db.session.query(
+            Report.team_id, Report.user_id, Report.id, Report.title, Report.created_at
+        ).filter(Report.status == 'finalized')
+        template_query = db.session.query(
+            ReportTemplate.team_id, ReportTemplate.created_by, ReportTemplate.id, ReportTemplate.name, ReportTemplate.created_at
+        ).filter(ReportTemplate.is_active == True)
+
+        if team_id:
+            report_query = report_query.filter(Report.team_id == team_id)
+            template_query = template_query.filter(ReportTemplate.team_id == team_id)
+
+        sources = [
+            ('report_created', 'report', report_query.all()),
+            ('template_created', 'template', template_query.all())
+        ]
+
+        actor_ids = {row[1] for _, _, rows in sources for row in rows if row[1]}
+        names = {
+            user_id: f"{first_name or ''} {last_name or ''}".strip() or 'Unknown'
+            for user_id, first_name, last_name in db.session.query(
+                User.id, User.first_name, User.last_name
+            ).filter(User.id.in_(actor_ids))
+        } if actor_ids else {}
+
+        rows = [
+            {
+                'team_id': tid,
+                'event_type': event_type,
+                'actor_id': actor_id,
+                'actor_name': names.get(actor_id, 'Unknown'),
+                'subject_type': subject_type,
+                'subject_id': subject_id,
+                'subject_title': (title or '')[:255] or None,
+                'created_at': created_at
+            }
+            for event_type, subject_type, source_rows in sources
+            for tid, actor_id, subject_id, title, created_at in source_rows
+            if tid and tid not in seeded_teams and created_at
+        ]
+
+        if rows:
+            db.session.execute(insert(ActivityEvent.__table__), rows)
+        db.session.commit()
+
+        return len(rows)
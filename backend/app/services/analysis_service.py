@@ -4,19 +4,25 @@ from datetime import datetime
 import json
 from app.models.template import ReportTemplate, TemplateField
 from app.models.analysis import CallAnalysis
-from app.models.report import Report, ReportFieldValue
+from app.models.report import Report
+from app.services.search_service import SearchService
+from app.services.field_value_service import FieldValueService
+from app.services.activity_service import ActivityService
+from app.services.template_revision_service import TemplateRevisionService
+from app.services.pdf_render_service import PDFRenderService
 from app import db
 
 
 class AnalysisService:
     @staticmethod
-    def analyze_transcription(transcription: str, template: ReportTemplate) -> dict:
+    def analyze_transcription(transcription: str, template: ReportTemplate, revision_id: int = None) -> dict:
         """
         Analyze transcription using GPT-4 based on template fields with retry logic
 
         Args:
             transcription: The transcribed text
             template: Report template with fields
+            revision_id: Template revision to extract (defaults to the current one)
 
         Returns:
             dict: Analysis results with field values and summary
@@ -26,10 +32,12 @@ class AnalysisService:
         max_retries = 3
         retry_delay = 2  # seconds
 
+        revision_id = revision_id or template.current_revision_id
+
         for attempt in range(max_retries):
             try:
                 # Build enhanced prompt for GPT-4
-                prompt = AnalysisService._build_enhanced_analysis_prompt(transcription, template)
+                prompt = AnalysisService._build_enhanced_analysis_prompt(transcription, template, revision_id)
 
                 # Initialize OpenAI client
                 client = OpenAI(api_key=current_app.config['OPENAI_API_KEY'])
@@ -66,7 +74,7 @@ Be thorough, accurate, and consistent."""
                 analysis_result = json.loads(response.choices[0].message.content)
 
                 # Validate response structure
-                if not AnalysisService._validate_analysis_result(analysis_result, template):
+                if not AnalysisService._validate_analysis_result(analysis_result, revision_id):
                     if attempt < max_retries - 1:
                         print(f"Validation failed, retrying... (attempt {attempt + 1}/{max_retries})")
                         time.sleep(retry_delay * (attempt + 1))  # Exponential backoff
@@ -166,57 +174,69 @@ Be accurate and concise in your analysis."""
         return prompt
 
     @staticmethod
-    def _build_enhanced_analysis_prompt(transcription: str, template: ReportTemplate) -> str:
-        """Build enhanced prompt with better structure and examples"""
+    def _field_descriptions(revision_id: int) -> tuple:
+        """Field descriptions and example output for a revision, as JSON text
 
-        # Build detailed field descriptions with validation rules
-        fields_description = []
-        for field in template.fields:
-            field_info = {
-                "field_name": field.field_name,
-                "field_label": field.field_label,
-                "field_type": field.field_type,
-                "is_required": field.is_required,
-                "description": f"Extract the {field.field_label.lower()} from the text"
+        Cached per revision, which never changes once written.
+        """
+        def build():
+            # Build detailed field descriptions with validation rules
+            fields_description = []
+            for field in TemplateRevisionService.get_fields(revision_id):
+                field_info = {
+                    "field_name": field['field_name'],
+                    "field_label": field['field_label'],
+                    "field_type": field['field_type'],
+                    "is_required": field['is_required'],
+                    "description": f"Extract the {field['field_label'].lower()} from the text"
+                }
+
+                # Add type-specific validation rules
+                if field['field_type'] == 'number':
+                    field_info['validation'] = "Must be a numeric value (integer or decimal)"
+                    field_info['example'] = 8 if 'score' in field['field_name'].lower() else 100
+                elif field['field_type'] == 'text':
+                    field_info['validation'] = "Must be a string"
+                    field_info['example'] = "John Doe" if 'name' in field['field_name'].lower() else "Sample text"
+                elif field['field_type'] == 'dropdown':
+                    options = field['field_options']
+                    field_info['options'] = options
+                    field_info['validation'] = f"Must be EXACTLY one of: {', '.join(options)}"
+                    field_info['example'] = options[0] if options else "Option 1"
+                elif field['field_type'] == 'multi_select':
+                    options = field['field_options']
+                    field_info['options'] = options
+                    field_info['validation'] = f"Must be an array of values from: {', '.join(options)}"
+                    field_info['example'] = [options[0]] if options else ["Option 1"]
+                elif field['field_type'] == 'long_text':
+                    field_info['validation'] = "Must be a string (can be multiple sentences)"
+                    field_info['example'] = "Detailed description or notes"
+
+                fields_description.append(field_info)
+
+            # Build example output structure
+            example_output = {
+                "summary": "Brief summary of the content (2-3 sentences)",
+                "fields": []
             }
 
-            # Add type-specific validation rules
-            if field.field_type == 'number':
-                field_info['validation'] = "Must be a numeric value (integer or decimal)"
-                field_info['example'] = 8 if 'score' in field.field_name.lower() else 100
-            elif field.field_type == 'text':
-                field_info['validation'] = "Must be a string"
-                field_info['example'] = "John Doe" if 'name' in field.field_name.lower() else "Sample text"
-            elif field.field_type == 'dropdown':
-                options = field.get_options()
-                field_info['options'] = options
-                field_info['validation'] = f"Must be EXACTLY one of: {', '.join(options)}"
-                field_info['example'] = options[0] if options else "Option 1"
-            elif field.field_type == 'multi_select':
-                options = field.get_options()
-                field_info['options'] = options
-                field_info['validation'] = f"Must be an array of values from: {', '.join(options)}"
-                field_info['example'] = [options[0]] if options else ["Option 1"]
-            elif field.field_type == 'long_text':
-                field_info['validation'] = "Must be a string (can be multiple sentences)"
-                field_info['example'] = "Detailed description or notes"
-
-            fields_description.append(field_info)
-
-        # Build example output structure
-        example_output = {
-            "summary": "Brief summary of the content (2-3 sentences)",
-            "fields": []
-        }
+            for field_info in fields_description[:3]:  # Show first 3 fields as examples
+                example_output["fields"].append({
+                    "field_name": field_info["field_name"],
+                    "value": field_info.get("example", "extracted value")
+                })
 
-        for field_info in fields_description[:3]:  # Show first 3 fields as examples
-            example_output["fields"].append({
-                "field_name": field_info["field_name"],
-                "value": field_info.get("example", "extracted value")
-            })
+            if len(fields_description) > 3:
+                example_output["fields"].append({"...": "..."})
+
+            return json.dumps(fields_description, indent=2), json.dumps(example_output, indent=2)
 
-        if len(fields_description) > 3:
-            example_output["fields"].append({"...": "..."})
+        return TemplateRevisionService.memo(revision_id, 'prompt_fields', build)
+
+    @staticmethod
+    def _build_enhanced_analysis_prompt(transcription: str, template: ReportTemplate, revision_id: int = None) -> str:
+        """Build enhanced prompt with better structure and examples"""
+        fields_json, example_json = AnalysisService._field_descriptions(revision_id or template.current_revision_id)
 
         prompt = f"""**Report Template:** {template.name}
 {template.description if template.description else ""}
@@ -227,7 +247,7 @@ Be accurate and concise in your analysis."""
 ```
 
 **FIELDS TO EXTRACT:**
-{json.dumps(fields_description, indent=2)}
+{fields_json}
 
 **CRITICAL INSTRUCTIONS:**
 
@@ -259,7 +279,7 @@ Be accurate and concise in your analysis."""
 **EXPECTED OUTPUT FORMAT:**
 
 Return a JSON object with this EXACT structure:
-{json.dumps(example_output, indent=2)}
+{example_json}
 
 **VALIDATION CHECKLIST:**
 - All field names match exactly
@@ -275,13 +295,21 @@ Analyze now and return valid JSON."""
         return prompt
 
     @staticmethod
-    def _validate_analysis_result(result: dict, template: ReportTemplate) -> bool:
+    def _validation_index(revision_id: int) -> tuple:
+        """(field_name, field_type, is_required, options) per field, cached per revision"""
+        return TemplateRevisionService.memo(revision_id, 'validation', lambda: tuple(
+            (field['field_name'], field['field_type'], field['is_required'], tuple(field['field_options'] or ()))
+            for field in TemplateRevisionService.get_fields(revision_id)
+        ))
+
+    @staticmethod
+    def _validate_analysis_result(result: dict, revision_id: int) -> bool:
         """
         Validate analysis result structure and field values
 
         Args:
             result: Analysis result dictionary
-            template: Report template
+            revision_id: Template revision the result was extracted for
 
         Returns:
             bool: True if valid, False otherwise
@@ -296,18 +324,13 @@ Analyze now and return valid JSON."""
                 print("Validation error: 'fields' must be a list")
                 return False
 
-            # Build field map from template
-            template_fields = {field.field_name: field for field in template.fields}
-
             # Validate each field
             result_field_map = {f['field_name']: f['value'] for f in result['fields'] if 'field_name' in f and 'value' in f}
 
-            for field in template.fields:
-                field_name = field.field_name
-
+            for field_name, field_type, is_required, options in AnalysisService._validation_index(revision_id):
                 # Check if field exists in result
                 if field_name not in result_field_map:
-                    if field.is_required:
+                    if is_required:
                         print(f"Validation error: Missing required field '{field_name}'")
                         return False
                     continue
@@ -319,7 +342,7 @@ Analyze now and return valid JSON."""
                     continue
 
                 # Type validation
-                if field.field_type == 'number':
+                if field_type == 'number':
                     if not isinstance(value, (int, float)):
                         try:
                             float(value)  # Try to convert
@@ -327,14 +350,13 @@ Analyze now and return valid JSON."""
                             print(f"Validation error: Field '{field_name}' must be numeric, got {type(value)}")
                             return False
 
-                elif field.field_type in ['dropdown', 'multi_select']:
-                    options = field.get_options()
+                elif field_type in ['dropdown', 'multi_select']:
                     if not options:
                         continue
 
-                    if field.field_type == 'dropdown':
+                    if field_type == 'dropdown':
                         if value not in options:
-                            print(f"Validation error: Field '{field_name}' value '{value}' not in options {options}")
+                            print(f"Validation error: Field '{field_name}' value '{value}' not in options {list(options)}")
                             return False
                     else:  # multi_select
                         if not isinstance(value, list):
@@ -342,7 +364,7 @@ Analyze now and return valid JSON."""
                             return False
                         for v in value:
                             if v not in options:
-                                print(f"Validation error: Field '{field_name}' value '{v}' not in options {options}")
+                                print(f"Validation error: Field '{field_name}' value '{v}' not in options {list(options)}")
                                 return False
 
             return True
@@ -377,40 +399,24 @@ Analyze now and return valid JSON."""
             user_id=user_id,
             team_id=analysis.team_id,
             template_id=analysis.template_id,
+            template_revision_id=analysis.template_revision_id,
             title=title,
             status='finalized'
         )
         db.session.add(report)
         db.session.flush()  # Get report ID
 
-        # Add field values
-        for fv in field_values:
-            report_field_value = ReportFieldValue(
-                report_id=report.id,
-                field_id=fv['field_id'],
-                field_value=str(fv['value']) if fv['value'] is not None else None
-            )
-            db.session.add(report_field_value)
-
-        # Add custom fields if provided
-        if custom_fields:
-            for cf in custom_fields:
-                custom_field_name = cf.get('custom_field_name')
-                value = cf.get('value')
-
-                if custom_field_name:  # Only add if name is provided
-                    custom_field_value = ReportFieldValue(
-                        report_id=report.id,
-                        field_id=None,
-                        custom_field_name=custom_field_name,
-                        field_value=str(value) if value is not None else None
-                    )
-                    db.session.add(custom_field_value)
+        # Add template and custom field values in one insert
+        FieldValueService.insert_values(report.id, field_values, custom_fields)
 
         # Mark report as finalized
         report.finalize()
 
+        SearchService.index_report(report)
+        ActivityService.record(report.team_id, 'report_created', user_id, 'report', report.id, report.title)
+
         db.session.commit()
+        PDFRenderService.prerender([report.id])
 
         return report
 
@@ -433,6 +439,7 @@ Analyze now and return valid JSON."""
             user_id=user_id,
             team_id=team_id,
             template_id=template_id,
+            template_revision_id=TemplateRevisionService.current_revision_id(template_id),
             input_type='text',
             input_text=text,
             transcription=text  # Use text as transcription for analysis
@@ -462,6 +469,7 @@ Analyze now and return valid JSON."""
             user_id=user_id,
             team_id=team_id,
             template_id=template_id,
+            template_revision_id=TemplateRevisionService.current_revision_id(template_id),
             input_type='image',
             image_file_path=image_path
         )
@@ -631,6 +639,7 @@ Provide the extracted information as a structured text that can be analyzed."""
             user_id=user_id,
             team_id=team_id,
             template_id=template_id,
+            template_revision_id=template.current_revision_id,
             input_type='text',
             input_text=text,
             transcription=text
@@ -639,7 +648,7 @@ Provide the extracted information as a structured text that can be analyzed."""
         db.session.flush()  # Get analysis ID
 
         # Analyze text using AI
-        analysis_result = AnalysisService.analyze_transcription(text, template)
+        analysis_result = AnalysisService.analyze_transcription(text, template, analysis.template_revision_id)
 
         # Generate title
         title = f"Report from text - {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}"
@@ -738,6 +747,7 @@ Provide the extracted information as a structured text that can be analyzed."""
             user_id=user_id,
             team_id=team_id,
             template_id=template_id,
+            template_revision_id=template.current_revision_id,
             input_type='audio',
             audio_file_path=audio_path,
             audio_duration=audio_duration,
@@ -747,7 +757,7 @@ Provide the extracted information as a structured text that can be analyzed."""
         db.session.flush()  # Get analysis ID
 
         # Analyze transcription using AI
-        analysis_result = AnalysisService.analyze_transcription(transcription, template)
+        analysis_result = AnalysisService.analyze_transcription(transcription, template, analysis.template_revision_id)
 
         # Generate title
         title = f"Report from audio - {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}"
@@ -837,6 +847,7 @@ Provide the extracted information as a structured text that can be analyzed."""
             user_id=user_id,
             team_id=team_id,
             template_id=template_id,
+            template_revision_id=template.current_revision_id,
             input_type='image',
             image_file_path=image_path,
             transcription=extracted_text
@@ -845,7 +856,7 @@ Provide the extracted information as a structured text that can be analyzed."""
         db.session.flush()  # Get analysis ID
 
         # Analyze extracted text using AI
-        analysis_result = AnalysisService.analyze_transcription(extracted_text, template)
+        analysis_result = AnalysisService.analyze_transcription(extracted_text, template, analysis.template_revision_id)
 
         # Generate title
         title = f"Report from image - {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}"
@@ -6,6 +6,7 @@ from app.models.team import Team, TeamMember
 from flask import current_app
 from app.services.google_auth_service import GoogleAuthService
 from app.services.template_service import TemplateService
+from app.services.activity_service import ActivityService
 
 class AuthService:
     @staticmethod
@@ -63,6 +64,7 @@ class AuthService:
                 role='member'
             )
             db.session.add(team_member)
+            ActivityService.record(invitation.team_id, 'member_joined', user, 'team', invitation.team_id, invitation.team.name)
             db.session.commit()
 
             # Create default template for the user in the invited team
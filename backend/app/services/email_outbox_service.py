@@ -0,0 +1,585 @@
+from app import db
+from app.models.email_outbox import OutboxEmail
+from flask import current_app
+from sqlalchemy import update, func
+from datetime import datetime, timedelta
+from uuid import uuid4
+import base64
+import os
+import random
+import re
+import shutil
+import smtplib
+import ssl
+import threading
+import time
+
+
+_LEADING_DOT = re.compile(rb'(?m)^\.')
+_SEND_CHUNK = 64 * 1024
+# Bytes per read when encoding: a multiple of 57 fills whole 76-character base64 lines
+_ENCODE_CHUNK = 57 * 1024
+
+
+class _SMTPConnection:
+    """An authenticated SMTP session reused across messages
+
+    Opened on first use and kept until it has been idle for
+    MAIL_SMTP_IDLE_SECONDS or has carried MAIL_SMTP_MAX_MESSAGES messages;
+    a session the server dropped in between is reopened once.
+    """
+
+    def __init__(self, config):
+        self._config = config
+        self._server = None
+        self._messages = 0
+        self._last_used = 0.0
+
+    def _open(self):
+        config = self._config
+        context = ssl.create_default_context()
+        if config['MAIL_USE_SSL']:
+            server = smtplib.SMTP_SSL(config['MAIL_SERVER'], config['MAIL_PORT'], context=context,
+                                      timeout=config['MAIL_TIMEOUT'])
+        else:
+            server = smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=config['MAIL_TIMEOUT'])
+        try:
+            if config['MAIL_USE_TLS'] and not config['MAIL_USE_SSL']:
+                server.starttls(context=context)
+            if config['MAIL_USE_AUTH']:
+                server.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        self._messages = 0
+
+    def _usable(self):
+        if self._server is None:
+            return False
+        if (self._messages >= self._config['MAIL_SMTP_MAX_MESSAGES']
+                or time.monotonic() - self._last_used > self._config['MAIL_SMTP_IDLE_SECONDS']):
+            self.close()
+            return False
+        return True
+
+    def send(self, from_email, recipients, parts):
+        """
+        Send one message; returns the recipients the server refused
+
+        Args:
+            parts: Message segments from EmailService._message_parts; bytes
+                are sent as they are, a path is copied from the file
+        """
+        if not self._usable():
+            self._open()
+        try:
+            refused = self._transaction(from_email, recipients, parts)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            self._open()
+            refused = self._transaction(from_email, recipients, parts)
+        self._messages += 1
+        self._last_used = time.monotonic()
+        return refused
+
+    def _reset(self):
+        try:
+            self._server.rset()
+        except smtplib.SMTPServerDisconnected:
+            pass
+
+    def _transaction(self, from_email, recipients, parts):
+        """smtplib's sendmail, but writing the DATA phase in chunks instead of from one string"""
+        server = self._server
+        server.ehlo_or_helo_if_needed()
+        code, response = server.mail(from_email)
+        if code != 250:
+            self._reset()
+            raise smtplib.SMTPSenderRefused(code, response, from_email)
+
+        refused = {}
+        for recipient in recipients:
+            code, response = server.rcpt(recipient)
+            if code not in (250, 251):
+                refused[recipient] = (code, response)
+        if len(refused) == len(recipients):
+            self._reset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        code, response = server.docmd('data')
+        if code != 354:
+            self._reset()
+            raise smtplib.SMTPDataError(code, response)
+
+        last = b''
+        for part in parts:
+            if isinstance(part, bytes):
+                # Base64 lines never start with a dot; only our own segments need stuffing
+                data = _LEADING_DOT.sub(b'..', part)
+                server.send(data)
+                last = data[-2:] or last
+                continue
+            with open(part, 'rb') as source:
+                while True:
+                    data = source.read(_SEND_CHUNK)
+                    if not data:
+                        break
+                    server.send(data)
+                    last = data[-2:]
+        server.send(b'.\r\n' if last == b'\r\n' else b'\r\n.\r\n')
+
+        code, response = server.getreply()
+        if code != 250:
+            self._reset()
+            raise smtplib.SMTPDataError(code, response)
+        return refused
+
+    def close_if_idle(self):
+        if self._server is not None and time.monotonic() - self._last_used > self._config['MAIL_SMTP_IDLE_SECONDS']:
+            self.close()
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+
+class EmailOutboxService:
+    """Database-backed outbox for outgoing email
+
+    Requests only insert an outbox row (and keep their own link to any
+    attachment); sender threads deliver the rows over long-lived SMTP
+    connections, MAIL_MAX_RECIPIENTS recipients per transaction.
+    Attachments are base64-encoded once into a file beside the stored
+    copy and streamed onto the connection, never held in memory. Failures
+    are retried with exponential backoff from MAIL_OUTBOX_RETRY_SECONDS up
+    to MAIL_OUTBOX_MAX_ATTEMPTS tries; permanent (5xx) rejections fail at
+    once. Each web process runs MAIL_OUTBOX_WORKERS senders, and
+    `flask outbox run` runs one in the foreground; any number of senders
+    can share the outbox, since rows are claimed with conditional updates.
+    """
+    KINDS = ('report_share', 'team_invitation')
+    # Unreferenced attachments are kept this long, and swept at most this often
+    ATTACHMENT_GRACE_SECONDS = 3600
+    SWEEP_INTERVAL_SECONDS = 3600
+
+    _lock = threading.Lock()
+    _wakeup = threading.Event()
+    _workers = []
+
+    @staticmethod
+    def _outbox_folder():
+        folder = current_app.config['MAIL_OUTBOX_FOLDER']
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    @staticmethod
+    def _normalize_recipients(recipients):
+        if isinstance(recipients, str):
+            recipients = [recipients]
+        if not isinstance(recipients, (list, tuple)):
+            raise ValueError("Recipients must be a list of email addresses")
+
+        normalized = []
+        for recipient in recipients:
+            address = str(recipient or '').strip()
+            local, _, domain = address.rpartition('@')
+            if not local or '.' not in domain or any(c.isspace() for c in address) or ',' in address:
+                raise ValueError(f"Invalid email address: {address or recipient!r}")
+            if address.lower() not in (existing.lower() for existing in normalized):
+                normalized.append(address)
+
+        if not normalized:
+            raise ValueError("At least one recipient is required")
+        return normalized
+
+    @staticmethod
+    def _store_attachment(attachment_path, attachment_key=None):
+        """
+        Path of the outbox's own copy of an attachment
+
+        With a key, emails with the same attachment share one copy (and its
+        encoding); without one, each email gets its own. Copies are
+        hard links where the filesystem allows.
+        """
+        folder = EmailOutboxService._outbox_folder()
+        if attachment_key:
+            if os.path.basename(attachment_key) != attachment_key or attachment_key.startswith('.'):
+                raise ValueError("Invalid attachment key")
+            stored_path = os.path.join(folder, attachment_key)
+            if os.path.exists(stored_path):
+                # Keep it from the attachment sweep while this email waits
+                os.utime(stored_path)
+                return stored_path
+        else:
+            stored_path = os.path.join(folder, f"{uuid4().hex}_{os.path.basename(attachment_path)}")
+
+        try:
+            os.link(attachment_path, stored_path)
+        except FileExistsError:
+            pass
+        except OSError:
+            temp_path = f"{stored_path}.{uuid4().hex}.tmp"
+            shutil.copyfile(attachment_path, temp_path)
+            os.replace(temp_path, stored_path)
+        return stored_path
+
+    @staticmethod
+    def enqueue(kind, recipients, subject, html_content, attachment_path=None, attachment_name=None,
+                attachment_key=None):
+        """
+        Add an email to the outbox and wake the senders
+
+        The attachment is hard-linked (or copied) into MAIL_OUTBOX_FOLDER,
+        so the caller's file can change or go away before delivery.
+
+        Args:
+            attachment_key: Name identifying the attachment's content (such
+                as a PDF cache filename, which names the report revision);
+                emails with the same key share the stored attachment
+
+        Returns:
+            OutboxEmail: The queued email
+
+        Raises:
+            ValueError: If the recipients or attachment are invalid
+        """
+        if kind not in EmailOutboxService.KINDS:
+            raise ValueError(f"Unknown email kind: {kind}")
+        recipients = EmailOutboxService._normalize_recipients(recipients)
+
+        stored_path = None
+        if attachment_path:
+            if not os.path.isfile(attachment_path):
+                raise ValueError("Attachment not found")
+            attachment_name = attachment_name or os.path.basename(attachment_path)
+            stored_path = EmailOutboxService._store_attachment(attachment_path, attachment_key)
+
+        email = OutboxEmail(
+            kind=kind,
+            subject=subject[:255],
+            html_content=html_content,
+            attachment_path=stored_path,
+            attachment_name=attachment_name
+        )
+        email.recipients = recipients
+        try:
+            db.session.add(email)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        EmailOutboxService.wake()
+        return email
+
+    @staticmethod
+    def wake():
+        """Start this process's senders if needed and have them look for due email"""
+        if not current_app.config['MAIL_OUTBOX_WORKERS']:
+            return
+        EmailOutboxService._start_workers(current_app._get_current_object())
+        EmailOutboxService._wakeup.set()
+
+    @staticmethod
+    def register_request_hook(app):
+        """Start the senders with the first request, so retries resume after a restart"""
+        started = []
+
+        @app.before_request
+        def start_outbox_senders():
+            if not started:
+                started.append(True)
+                if app.config['MAIL_OUTBOX_WORKERS']:
+                    EmailOutboxService._start_workers(app)
+
+    @staticmethod
+    def _start_workers(app):
+        with EmailOutboxService._lock:
+            workers = [worker for worker in EmailOutboxService._workers if worker.is_alive()]
+            for _ in range(app.config['MAIL_OUTBOX_WORKERS'] - len(workers)):
+                worker = threading.Thread(target=EmailOutboxService.run, args=(app,), name='outbox-sender', daemon=True)
+                worker.start()
+                workers.append(worker)
+            EmailOutboxService._workers = workers
+
+    @staticmethod
+    def run(app, once=False):
+        """
+        Sender loop: deliver due email, then sleep until woken or the next poll
+
+        Args:
+            app: Flask app (senders run outside any request)
+            once: Return once nothing is due instead of polling forever
+
+        Returns:
+            int: Number of emails handled (only returned with once=True)
+        """
+        connection = _SMTPConnection(app.config)
+        handled = 0
+        swept_at = 0.0
+        try:
+            while True:
+                EmailOutboxService._wakeup.clear()
+                try:
+                    with app.app_context():
+                        count = EmailOutboxService.send_due(connection)
+                        if time.monotonic() - swept_at > EmailOutboxService.SWEEP_INTERVAL_SECONDS:
+                            swept_at = time.monotonic()
+                            EmailOutboxService.sweep_attachments()
+                except Exception as e:
+                    print(f"Email outbox sender error: {e}")
+                    connection.close()
+                    count = 0
+                handled += count
+
+                if count >= app.config['MAIL_OUTBOX_BATCH_SIZE']:
+                    continue
+                if once:
+                    return handled
+                connection.close_if_idle()
+                EmailOutboxService._wakeup.wait(app.config['MAIL_OUTBOX_POLL_SECONDS'])
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _claim(now):
+        """IDs of due email this sender now holds the lease for"""
+        config = current_app.config
+        due = (
+            OutboxEmail.status.in_(('pending', 'sending')),
+            OutboxEmail.next_attempt_at <= now
+        )
+        email_ids = [row[0] for row in db.session.query(OutboxEmail.id).filter(*due).order_by(
+            OutboxEmail.next_attempt_at, OutboxEmail.id
+        ).limit(config['MAIL_OUTBOX_BATCH_SIZE'])]
+
+        lease_until = now + timedelta(seconds=config['MAIL_OUTBOX_LEASE_SECONDS'])
+        claimed = []
+        for email_id in email_ids:
+            result = db.session.execute(update(OutboxEmail).where(OutboxEmail.id == email_id, *due).values(
+                status='sending',
+                next_attempt_at=lease_until,
+                attempts=OutboxEmail.attempts + 1
+            ))
+            if result.rowcount:
+                claimed.append(email_id)
+        db.session.commit()
+        return claimed
+
+    @staticmethod
+    def send_due(connection):
+        """
+        Deliver one batch of due email over the given connection
+
+        Returns:
+            int: Number of emails claimed
+        """
+        claimed = EmailOutboxService._claim(datetime.utcnow())
+        for email_id in claimed:
+            email = db.session.get(OutboxEmail, email_id)
+            try:
+                EmailOutboxService._deliver(email, connection)
+            except Exception as e:
+                if not isinstance(e, smtplib.SMTPResponseException):
+                    # The session may be in an unknown state
+                    connection.close()
+                EmailOutboxService._retry_or_fail(email, e)
+            db.session.commit()
+        return len(claimed)
+
+    @staticmethod
+    def _deliver(email, connection):
+        """Send to the recipients not yet accepted, in batches of MAIL_MAX_RECIPIENTS"""
+        from app.services.email_service import EmailService
+
+        config = current_app.config
+        recipients = email.recipients
+        if email.attachment_path and not os.path.isfile(email.attachment_path):
+            raise FileNotFoundError("Attachment is missing from the outbox folder")
+
+        parts = EmailService._message_parts(
+            recipients,
+            email.subject,
+            email.html_content,
+            encoded_attachment_path=EmailOutboxService._encoded(email.attachment_path) if email.attachment_path else None,
+            attachment_name=email.attachment_name
+        )
+
+        step = max(config['MAIL_MAX_RECIPIENTS'], 1)
+        refused = {}
+        while email.recipients_sent < len(recipients):
+            batch = recipients[email.recipients_sent:email.recipients_sent + step]
+            try:
+                refused.update(connection.send(config['MAIL_DEFAULT_SENDER'], batch, parts))
+            except smtplib.SMTPRecipientsRefused as e:
+                # Every recipient of the batch was refused; only permanent refusals are final
+                if any(code < 500 for code, _ in e.recipients.values()):
+                    raise
+                refused.update(e.recipients)
+            email.recipients_sent += len(batch)
+
+        if len(refused) == len(recipients):
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        email.status = 'sent'
+        email.sent_at = datetime.utcnow()
+        email.last_error = f"Refused: {', '.join(sorted(refused))}"[:500] if refused else None
+        # Other emails may share the attachment; the sweep removes it once none needs it
+        email.attachment_path = None
+        print(f"Email {email.id} ({email.kind}) sent to {len(recipients) - len(refused)} recipient(s)")
+
+    @staticmethod
+    def _encoded(path):
+        """
+        Path of the attachment's base64 encoding, written once and shared
+
+        Encoded in chunks into a sibling .b64 file with CRLF line breaks, so
+        every email and recipient batch with this attachment streams the
+        same encoded bytes.
+        """
+        encoded_path = f"{path}.b64"
+        if os.path.exists(encoded_path):
+            return encoded_path
+
+        temp_path = f"{encoded_path}.{uuid4().hex}.tmp"
+        try:
+            with open(path, 'rb') as source, open(temp_path, 'wb') as target:
+                separator = b''
+                while True:
+                    data = source.read(_ENCODE_CHUNK)
+                    if not data:
+                        break
+                    # No trailing line break: the message supplies the one before the boundary
+                    target.write(separator + base64.encodebytes(data).rstrip(b'\n').replace(b'\n', b'\r\n'))
+                    separator = b'\r\n'
+            os.replace(temp_path, encoded_path)
+        except Exception:
+            EmailOutboxService._remove_attachment(temp_path)
+            raise
+        return encoded_path
+
+    @staticmethod
+    def sweep_attachments(grace_seconds=None):
+        """
+        Remove stored attachments (and encodings) no unsent email refers to
+
+        Files touched within grace_seconds are kept, so an attachment that
+        was just reused by a new email isn't removed before its row commits.
+
+        Returns:
+            int: Number of files removed
+        """
+        folder = current_app.config['MAIL_OUTBOX_FOLDER']
+        if not os.path.isdir(folder):
+            return 0
+        grace_seconds = EmailOutboxService.ATTACHMENT_GRACE_SECONDS if grace_seconds is None else grace_seconds
+
+        referenced = {os.path.basename(row[0]) for row in db.session.query(OutboxEmail.attachment_path).filter(
+            OutboxEmail.status.in_(('pending', 'sending', 'failed')),
+            OutboxEmail.attachment_path.isnot(None)
+        )}
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        for entry in os.scandir(folder):
+            if not entry.is_file():
+                continue
+            name = entry.name
+            if name.endswith('.tmp'):
+                name = name.split('.b64.', 1)[0]
+            elif name.endswith('.b64'):
+                name = name[:-len('.b64')]
+            if name in referenced or entry.stat().st_mtime >= cutoff:
+                continue
+            EmailOutboxService._remove_attachment(entry.path)
+            removed += 1
+        return removed
+
+    @staticmethod
+    def _is_permanent(error):
+        if isinstance(error, smtplib.SMTPAuthenticationError):
+            # Credentials get fixed; keep the mail
+            return False
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return all(code >= 500 for code, _ in error.recipients.values())
+        if isinstance(error, smtplib.SMTPResponseException):
+            return error.smtp_code >= 500
+        return isinstance(error, FileNotFoundError)
+
+    @staticmethod
+    def _retry_or_fail(email, error):
+        config = current_app.config
+        email.last_error = (str(error) or error.__class__.__name__)[:500]
+        if EmailOutboxService._is_permanent(error) or email.attempts >= config['MAIL_OUTBOX_MAX_ATTEMPTS']:
+            email.status = 'failed'
+            print(f"Email {email.id} ({email.kind}) failed after {email.attempts} attempt(s): {email.last_error}")
+            return
+
+        delay = min(
+            config['MAIL_OUTBOX_RETRY_SECONDS'] * 2 ** (email.attempts - 1),
+            config['MAIL_OUTBOX_MAX_RETRY_SECONDS']
+        )
+        # Jitter, so messages that failed together don't all retry together
+        delay *= random.uniform(0.8, 1.2)
+        email.status = 'pending'
+        email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        print(f"Email {email.id} ({email.kind}) attempt {email.attempts} failed, retrying in {delay:.0f}s: {email.last_error}")
+
+    @staticmethod
+    def _remove_attachment(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Failed to remove outbox attachment {path}: {e}")
+
+    @staticmethod
+    def retry_failed(email_id=None):
+        """
+        Queue failed email for delivery again with a fresh set of attempts
+
+        Returns:
+            int: Number of emails requeued
+        """
+        conditions = [OutboxEmail.status == 'failed']
+        if email_id:
+            conditions.append(OutboxEmail.id == email_id)
+        result = db.session.execute(update(OutboxEmail).where(*conditions).values(
+            status='pending',
+            attempts=0,
+            next_attempt_at=datetime.utcnow()
+        ))
+        db.session.commit()
+        # Senders pick them up on their next poll
+        return result.rowcount
+
+    @staticmethod
+    def purge(days):
+        """
+        Delete sent and failed email older than the given number of days,
+        then sweep attachments no email needs any more
+
+        Returns:
+            int: Number of emails deleted
+        """
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        emails = OutboxEmail.query.filter(
+            OutboxEmail.status.in_(('sent', 'failed')),
+            OutboxEmail.created_at < cutoff
+        ).all()
+        for email in emails:
+            db.session.delete(email)
+        db.session.commit()
+        EmailOutboxService.sweep_attachments()
+        return len(emails)
+
+    @staticmethod
+    def counts():
+        """Number of outbox emails per status"""
+        return dict(db.session.query(OutboxEmail.status, func.count(OutboxEmail.id)).group_by(OutboxEmail.status).all())
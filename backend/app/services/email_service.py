@@ -1,107 +1,111 @@
-import smtplib
-import ssl
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
-from email import encoders
+from email.policy import SMTP
 from flask import current_app
+from uuid import uuid4
 import os
 
 
 class EmailService:
     @staticmethod
-    def _send_email(to_emails, subject, html_content, attachment_path=None):
+    def is_configured():
+        """Whether outgoing email has somewhere to go"""
+        config = current_app.config
+        if not config.get('MAIL_SERVER'):
+            return False
+        return not config.get('MAIL_USE_AUTH', True) or bool(config.get('MAIL_USERNAME') and config.get('MAIL_PASSWORD'))
+
+    @staticmethod
+    def _message_parts(to_emails, subject, html_content, encoded_attachment_path=None, attachment_name=None):
+        """
+        Build an email as segments to stream to the SMTP server
+
+        The attachment isn't read here: its part carries a placeholder that
+        is replaced by the file at encoded_attachment_path, which already
+        holds the base64 lines, so the sender can copy it straight onto
+        the socket.
+
+        Args:
+            to_emails: List of email addresses
+            subject: Email subject
+            html_content: HTML content of the email
+            encoded_attachment_path: Optional path to a base64-encoded attachment
+            attachment_name: Filename shown for the attachment
+
+        Returns:
+            list: bytes segments, with the encoded attachment path in between
+        """
+        message = MIMEMultipart('alternative')
+        message['Subject'] = subject
+        message['From'] = current_app.config.get('MAIL_DEFAULT_SENDER')
+        message['To'] = ', '.join(to_emails)
+
+        # Attach HTML content
+        html_part = MIMEText(html_content, 'html')
+        message.attach(html_part)
+
+        placeholder = None
+        if encoded_attachment_path:
+            placeholder = f"attachment-{uuid4().hex}"
+            part = MIMEBase('application', 'octet-stream')
+            part.set_payload(placeholder)
+            part['Content-Transfer-Encoding'] = 'base64'
+            part.add_header('Content-Disposition', 'attachment', filename=attachment_name or 'attachment')
+            message.attach(part)
+
+        data = message.as_bytes(policy=SMTP)
+        if not placeholder:
+            return [data]
+        head, tail = data.split(placeholder.encode('ascii'), 1)
+        return [head, encoded_attachment_path, tail]
+
+    @staticmethod
+    def _queue_email(kind, to_emails, subject, html_content, attachment_path=None, attachment_name=None,
+                     attachment_key=None):
         """
-        Send email using SMTP
+        Put an email in the outbox; the outbox senders deliver it over SMTP
 
         Args:
+            kind: Outbox email kind (report_share, team_invitation)
             to_emails: Single email or list of emails
             subject: Email subject
             html_content: HTML content of the email
             attachment_path: Optional path to file attachment
+            attachment_name: Filename shown for the attachment
+            attachment_key: Name identifying the attachment's content, so
+                emails with the same attachment share one stored copy
 
         Returns:
-            bool: True if email sent successfully
+            OutboxEmail: The queued email
         """
-        try:
-            # Ensure to_emails is a list
-            if isinstance(to_emails, str):
-                to_emails = [to_emails]
-
-            # Get SMTP configuration
-            smtp_server = current_app.config.get('MAIL_SERVER')
-            smtp_port = current_app.config.get('MAIL_PORT')
-            smtp_username = current_app.config.get('MAIL_USERNAME')
-            smtp_password = current_app.config.get('MAIL_PASSWORD')
-            from_email = current_app.config.get('MAIL_DEFAULT_SENDER')
-            use_tls = current_app.config.get('MAIL_USE_TLS', True)
-            use_ssl = current_app.config.get('MAIL_USE_SSL', False)
-
-            # Check if SMTP is configured
-            if not smtp_server or not smtp_username or not smtp_password:
-                print("SMTP not configured. Email settings:")
-                print(f"  MAIL_SERVER: {smtp_server}")
-                print(f"  MAIL_USERNAME: {smtp_username}")
-                print(f"  MAIL_PASSWORD: {'***' if smtp_password else 'Not set'}")
-                raise ValueError("SMTP email service not configured. Please set MAIL_SERVER, MAIL_USERNAME, and MAIL_PASSWORD.")
-
-            # Create message
-            message = MIMEMultipart('alternative')
-            message['Subject'] = subject
-            message['From'] = from_email
-            message['To'] = ', '.join(to_emails)
-
-            # Attach HTML content
-            html_part = MIMEText(html_content, 'html')
-            message.attach(html_part)
-
-            # Attach file if provided
-            if attachment_path and os.path.exists(attachment_path):
-                with open(attachment_path, 'rb') as attachment:
-                    part = MIMEBase('application', 'octet-stream')
-                    part.set_payload(attachment.read())
-
-                encoders.encode_base64(part)
-                part.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename= {os.path.basename(attachment_path)}',
-                )
-                message.attach(part)
-
-            # Send email
-            if use_ssl:
-                # Use SSL connection (port 465)
-                context = ssl.create_default_context()
-                with smtplib.SMTP_SSL(smtp_server, smtp_port, context=context) as server:
-                    server.login(smtp_username, smtp_password)
-                    server.sendmail(from_email, to_emails, message.as_string())
-            else:
-                # Use TLS connection (port 587)
-                with smtplib.SMTP(smtp_server, smtp_port) as server:
-                    if use_tls:
-                        context = ssl.create_default_context()
-                        server.starttls(context=context)
-                    server.login(smtp_username, smtp_password)
-                    server.sendmail(from_email, to_emails, message.as_string())
-
-            print(f"Email sent successfully to {', '.join(to_emails)}")
-            return True
-
-        except smtplib.SMTPAuthenticationError as e:
-            print(f"SMTP Authentication Error: {str(e)}")
-            print("Please check your MAIL_USERNAME and MAIL_PASSWORD")
-            raise ValueError(f"Email authentication failed: {str(e)}")
-        except smtplib.SMTPException as e:
-            print(f"SMTP Error: {str(e)}")
-            raise ValueError(f"Failed to send email: {str(e)}")
-        except Exception as e:
-            print(f"Error sending email: {str(e)}")
-            raise ValueError(f"Failed to send email: {str(e)}")
+        from app.services.email_outbox_service import EmailOutboxService
+
+        # Check if SMTP is configured
+        if not EmailService.is_configured():
+            config = current_app.config
+            print("SMTP not configured. Email settings:")
+            print(f"  MAIL_SERVER: {config.get('MAIL_SERVER')}")
+            print(f"  MAIL_USERNAME: {config.get('MAIL_USERNAME')}")
+            print(f"  MAIL_PASSWORD: {'***' if config.get('MAIL_PASSWORD') else 'Not set'}")
+            raise ValueError("SMTP email service not configured. Please set MAIL_SERVER, MAIL_USERNAME, and MAIL_PASSWORD.")
+
+        email = EmailOutboxService.enqueue(
+            kind,
+            to_emails,
+            subject,
+            html_content,
+            attachment_path=attachment_path,
+            attachment_name=attachment_name,
+            attachment_key=attachment_key
+        )
+        print(f"Email {email.id} queued for {', '.join(email.recipients)}")
+        return email
 
     @staticmethod
-    def send_report_email(recipients, report_data, pdf_path=None, sender_name=None, custom_message=None):
+    def send_report_email(recipients, report_data, pdf_path=None, sender_name=None, custom_message=None, pdf_name=None):
         """
-        Send report via email
+        Queue a report email
 
         Args:
             recipients: List of email addresses
@@ -109,23 +113,45 @@ class EmailService:
             pdf_path: Optional path to PDF attachment
             sender_name: Name of the person sharing the report
             custom_message: Custom message to include in the email
+            pdf_name: Filename shown for the PDF attachment
+
+        PDFs larger than MAIL_ATTACHMENT_LINK_BYTES (if set) are replaced by
+        a signed download link. Attached PDFs are stored once per cached
+        render, so every email of the same report revision shares the
+        stored file and its base64 encoding.
 
         Returns:
-            bool: True if email sent successfully
+            OutboxEmail: The queued email
         """
         try:
             # Build email content
             subject = f"Call Analysis Report: {report_data.get('title', 'Untitled')}"
 
+            pdf_link = None
+            link_threshold = current_app.config['MAIL_ATTACHMENT_LINK_BYTES']
+            if pdf_path and link_threshold and os.path.getsize(pdf_path) > link_threshold:
+                from app.services.pdf_service import PDFService
+                pdf_link = PDFService.signed_link(report_data['id'], report_data['team_id'])
+                pdf_path = None
+
             # HTML content
             html_content = EmailService._build_report_email_html(
                 report_data,
                 sender_name,
-                custom_message
+                custom_message,
+                pdf_link=pdf_link
             )
 
-            # Send email
-            return EmailService._send_email(recipients, subject, html_content, pdf_path)
+            return EmailService._queue_email(
+                'report_share',
+                recipients,
+                subject,
+                html_content,
+                attachment_path=pdf_path,
+                attachment_name=pdf_name,
+                # Cached renders are named by report revision
+                attachment_key=os.path.basename(pdf_path) if pdf_path else None
+            )
 
         except Exception as e:
             print(f"Error sending report email: {str(e)}")
@@ -134,7 +160,7 @@ class EmailService:
     @staticmethod
     def send_team_invitation(email, team_name, inviter_name, invitation_link):
         """
-        Send team invitation email
+        Queue a team invitation email
 
         Args:
             email: Recipient email address
@@ -143,7 +169,7 @@ class EmailService:
             invitation_link: Link to accept invitation
 
         Returns:
-            bool: True if email sent successfully
+            OutboxEmail: The queued email
         """
         try:
             subject = f"You've been invited to join {team_name} on Call Analyzer"
@@ -218,15 +244,14 @@ class EmailService:
             </html>
             """
 
-            # Send email
-            return EmailService._send_email(email, subject, html_content)
+            return EmailService._queue_email('team_invitation', email, subject, html_content)
 
         except Exception as e:
             print(f"Error sending invitation email: {str(e)}")
             raise
 
     @staticmethod
-    def _build_report_email_html(report_data, sender_name, custom_message):
+    def _build_report_email_html(report_data, sender_name, custom_message, pdf_link=None):
         """Build HTML content for report sharing email"""
         created_by = report_data.get('created_by', {}).get('name', 'Unknown')
         created_at = report_data.get('created_at', 'Unknown')
@@ -253,6 +278,16 @@ class EmailService:
             </div>
             """
 
+        pdf_link_html = ""
+        if pdf_link:
+            pdf_link_html = f"""
+            <div style='background-color: #f9fafb; padding: 15px; border-radius: 5px; margin: 20px 0; text-align: center;'>
+                <p style='margin: 0 0 10px 0;'>The PDF report is too large to attach.</p>
+                <a href="{pdf_link}" style='display: inline-block; padding: 12px 24px; background-color: #2563eb; color: white; text-decoration: none; border-radius: 5px;'>Download PDF</a>
+                <p style='margin: 10px 0 0 0; font-size: 12px; color: #6b7280;'>This link expires in {current_app.config['MAIL_ATTACHMENT_LINK_DAYS']} days.</p>
+            </div>
+            """
+
         html = f"""
         <!DOCTYPE html>
         <html>
@@ -318,6 +353,8 @@ class EmailService:
 
                     {field_values_html}
 
+                    {pdf_link_html}
+
                     <p style="margin-top: 30px; font-size: 12px; color: #6b7280;">
                         This report was generated using Call Analyzer. If you have access to the platform, you can view the full report with audio transcription.
                     </p>
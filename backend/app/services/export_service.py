@@ -0,0 +1,376 @@
+from app import db
+from app.models.report import Report, ReportFieldValue
+from app.models.template import ReportTemplate, TemplateField
+from app.models.user import User
+from app.services.identity_service import IdentityService
+from app.services.field_value_service import FieldValueService
+from app.services.field_index_service import FieldIndexService
+from sqlalchemy import select, func
+from xml.sax.saxutils import escape
+from datetime import datetime, time, timedelta
+import csv
+import io
+import json
+import math
+import re
+import zipfile
+
+
+class _ChunkBuffer:
+    """Write-only file object whose contents are drained between yields"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ExportService:
+    """Streaming export of a team's reports
+
+    Reports are read through a server-side cursor on a dedicated connection
+    and encoded in chunks, so memory stays flat however many reports match
+    and the first bytes go out before the query has finished. Template
+    fields are pivoted into one column per field name (newest label wins),
+    followed by one column per custom field name.
+    """
+    FORMATS = {
+        'csv': 'text/csv',
+        'ndjson': 'application/x-ndjson',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    }
+    STATUSES = ('draft', 'finalized')
+
+    FETCH_SIZE = 1000
+    CHUNK_ROWS = 500
+
+    # Excel sheet limits
+    XLSX_MAX_ROWS = 1048576
+    XLSX_MAX_CELL = 32767
+
+    BASE_COLUMNS = (
+        ('id', 'Report ID'),
+        ('title', 'Title'),
+        ('status', 'Status'),
+        ('template_name', 'Template'),
+        ('created_by', 'Created By'),
+        ('created_at', 'Created At'),
+        ('finalized_at', 'Finalized At'),
+        ('summary', 'Summary')
+    )
+
+    # Characters XML 1.0 doesn't allow, even escaped
+    _XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+    @staticmethod
+    def _conditions(team_id, user_id=None, template_id=None, status=None, start_day=None, end_day=None):
+        """Report filters; a user_id limits plain members to their own reports"""
+        conditions = [Report.team_id == team_id]
+        if user_id is not None and not IdentityService.is_owner(user_id, team_id):
+            conditions.append(Report.user_id == user_id)
+        if template_id:
+            conditions.append(Report.template_id == template_id)
+        if status:
+            conditions.append(Report.status == status)
+        if start_day:
+            conditions.append(Report.created_at >= datetime.combine(start_day, time.min))
+        if end_day:
+            conditions.append(Report.created_at < datetime.combine(end_day + timedelta(days=1), time.min))
+        return conditions
+
+    @staticmethod
+    def _columns(conditions):
+        """(template field columns, custom field names) for the matching reports
+
+        Returns:
+            tuple: ([(field_name, field_label, field_type)], [custom_field_name])
+        """
+        template_ids = select(Report.template_id).where(*conditions).distinct()
+
+        fields = {}
+        for field_name, field_label, field_type in db.session.query(
+            TemplateField.field_name, TemplateField.field_label, TemplateField.field_type
+        ).filter(
+            TemplateField.template_id.in_(template_ids)
+        ).order_by(TemplateField.template_id, TemplateField.revision_id.desc(), TemplateField.display_order):
+            fields.setdefault(field_name, (field_name, field_label, field_type))
+
+        custom_names = [row[0] for row in db.session.query(ReportFieldValue.custom_field_name).join(
+            Report, Report.id == ReportFieldValue.report_id
+        ).filter(
+            *conditions,
+            ReportFieldValue.field_id.is_(None),
+            ReportFieldValue.custom_field_name.isnot(None)
+        ).distinct().order_by(ReportFieldValue.custom_field_name)]
+
+        return list(fields.values()), custom_names
+
+    @staticmethod
+    def prepare(fmt, team_id, user_id=None, template_id=None, status=None, start_day=None, end_day=None):
+        """Validate an export and work out its columns before any bytes are sent
+
+        Returns:
+            dict: Export plan for stream()
+        """
+        if fmt not in ExportService.FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}. Use one of {', '.join(ExportService.FORMATS)}")
+        if status and status not in ExportService.STATUSES:
+            raise ValueError("Status must be 'draft' or 'finalized'")
+        if start_day and end_day and end_day < start_day:
+            raise ValueError("start must not be after end")
+        if template_id:
+            template = db.session.get(ReportTemplate, template_id)
+            if not template or template.team_id != team_id:
+                raise ValueError("Template not found")
+
+        conditions = ExportService._conditions(team_id, user_id, template_id, status, start_day, end_day)
+
+        if fmt == 'xlsx':
+            total = db.session.query(func.count(Report.id)).filter(*conditions).scalar() or 0
+            if total >= ExportService.XLSX_MAX_ROWS:
+                raise ValueError(f"{total} reports exceed the XLSX row limit; export as CSV or NDJSON instead")
+
+        fields, custom_names = ExportService._columns(conditions)
+        # The cursor statement is routed like any other read, so it honors @read_replica
+        statement = select(
+            Report.id, Report.title, Report.status, Report.summary, Report.template_id,
+            Report.created_at, Report.finalized_at, Report.field_snapshot,
+            ReportTemplate.name, User.first_name, User.last_name
+        ).join(
+            ReportTemplate, ReportTemplate.id == Report.template_id
+        ).join(
+            User, User.id == Report.user_id
+        ).where(*conditions).order_by(Report.id)
+
+        return {
+            'format': fmt,
+            'statement': statement,
+            'bind': db.session.get_bind(clause=statement),
+            'fields': fields,
+            'custom_names': custom_names,
+            'filename': f"reports_{team_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{fmt}",
+            'mimetype': ExportService.FORMATS[fmt]
+        }
+
+    @staticmethod
+    def _rows(plan):
+        """Report dicts in ID order, read through a server-side cursor
+
+        The cursor gets its own connection so the session stays free for
+        the snapshot fallback of reports written before snapshots existed.
+        """
+        field_types = {name: field_type for name, _, field_type in plan['fields']}
+
+        with plan['bind'].connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=ExportService.FETCH_SIZE
+            ).execute(plan['statement'])
+
+            for partition in result.partitions():
+                missing = [row.id for row in partition if row.field_snapshot is None]
+                fallback = FieldValueService.snapshot_entries(missing) if missing else {}
+
+                for row in partition:
+                    snapshot = row.field_snapshot if row.field_snapshot is not None else fallback.get(row.id, [])
+                    values, custom = {}, {}
+                    for field_id, field_name, field_label, field_type, value in snapshot:
+                        if field_id is None:
+                            custom[field_label] = value
+                        else:
+                            values[field_name] = value
+
+                    yield {
+                        'id': row.id,
+                        'title': row.title,
+                        'status': row.status,
+                        'template_id': row.template_id,
+                        'template_name': row.name,
+                        'created_by': f"{row.first_name} {row.last_name}",
+                        'created_at': row.created_at.isoformat() if row.created_at else None,
+                        'finalized_at': row.finalized_at.isoformat() if row.finalized_at else None,
+                        'summary': row.summary,
+                        'fields': {
+                            name: ExportService._typed(field_types.get(name), value)
+                            for name, value in values.items()
+                        },
+                        'custom_fields': custom
+                    }
+
+    @staticmethod
+    def _typed(field_type, value):
+        """Field value as exported: numbers as numbers, multi_select as a list"""
+        if value is None:
+            return None
+        if field_type == 'multi_select':
+            return FieldIndexService._split_options(str(value))
+        if field_type == 'number':
+            try:
+                number = float(value)
+            except ValueError:
+                return value
+            if math.isfinite(number):
+                return int(number) if number.is_integer() else number
+        return value
+
+    @staticmethod
+    def _flat_row(plan, row):
+        """Cells of one report in header order"""
+        cells = [row[key] for key, _ in ExportService.BASE_COLUMNS]
+        for name, _, _ in plan['fields']:
+            value = row['fields'].get(name)
+            cells.append(', '.join(value) if isinstance(value, list) else value)
+        cells.extend(row['custom_fields'].get(name) for name in plan['custom_names'])
+        return cells
+
+    @staticmethod
+    def _header(plan):
+        return (
+            [label for _, label in ExportService.BASE_COLUMNS]
+            + [label for _, label, _ in plan['fields']]
+            + plan['custom_names']
+        )
+
+    @staticmethod
+    def _csv_cell(value):
+        """Plain cell text, with formula-like strings neutralized for spreadsheets"""
+        if value is None:
+            return ''
+        if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+            try:
+                float(value)
+            except ValueError:
+                return "'" + value
+        return value
+
+    @staticmethod
+    def _stream_csv(plan):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # BOM so Excel opens the file as UTF-8
+        buffer.write('\ufeff')
+        writer.writerow(ExportService._header(plan))
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+        pending = 0
+        for row in ExportService._rows(plan):
+            writer.writerow([ExportService._csv_cell(cell) for cell in ExportService._flat_row(plan, row)])
+            pending += 1
+            if pending >= ExportService.CHUNK_ROWS:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+
+        if pending:
+            yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def _stream_ndjson(plan):
+        lines = []
+        for row in ExportService._rows(plan):
+            lines.append(json.dumps(row, ensure_ascii=False))
+            if len(lines) >= ExportService.CHUNK_ROWS:
+                yield ('\n'.join(lines) + '\n').encode('utf-8')
+                lines = []
+
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+    @staticmethod
+    def _xlsx_cell(value):
+        if value is None:
+            return '<c/>'
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return f'<c><v>{value}</v></c>'
+        text = ExportService._XML_ILLEGAL.sub('', str(value))[:ExportService.XLSX_MAX_CELL]
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+    @staticmethod
+    def _xlsx_row(cells):
+        return '<row>' + ''.join(ExportService._xlsx_cell(cell) for cell in cells) + '</row>'
+
+    XLSX_PARTS = {
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'
+        ),
+        '_rels/.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ),
+        'xl/workbook.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets><sheet name="Reports" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ),
+        'xl/_rels/workbook.xml.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            'Target="worksheets/sheet1.xml"/>'
+            '</Relationships>'
+        )
+    }
+
+    @staticmethod
+    def _stream_xlsx(plan):
+        """Minimal single-sheet workbook with inline strings, zipped as it is written"""
+        output = _ChunkBuffer()
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, content in ExportService.XLSX_PARTS.items():
+                archive.writestr(name, content)
+            yield output.drain()
+
+            with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+                sheet.write((
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                    + ExportService._xlsx_row(ExportService._header(plan))
+                ).encode('utf-8'))
+
+                rows = []
+                for row in ExportService._rows(plan):
+                    rows.append(ExportService._xlsx_row(ExportService._flat_row(plan, row)))
+                    if len(rows) >= ExportService.CHUNK_ROWS:
+                        sheet.write(''.join(rows).encode('utf-8'))
+                        rows = []
+                        yield output.drain()
+
+                sheet.write((''.join(rows) + '</sheetData></worksheet>').encode('utf-8'))
+
+        yield output.drain()
+
+    @staticmethod
+    def stream(plan):
+        """Generator of encoded export chunks for a plan from prepare()"""
+        return {
+            'csv': ExportService._stream_csv,
+            'ndjson': ExportService._stream_ndjson,
+            'xlsx': ExportService._stream_xlsx
+        }[plan['format']](plan)
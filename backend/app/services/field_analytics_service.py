@@ -0,0 +1,423 @@
+from app import db
+from app.models.rollup import TemplateFieldDailyStats
+from app.models.report import Report, ReportFieldValue
+from app.models.field_index import ReportFieldIndex
+from app.models.template import ReportTemplate
+from app.services.rollup_service import RollupService
+from app.services.template_revision_service import TemplateRevisionService
+from sqlalchemy import select, delete, insert, func, case
+from sqlalchemy.exc import IntegrityError
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+import numpy as np
+
+
+class FieldAnalyticsService:
+    """Per-template field statistics for the dashboard charts
+
+    Finalized reports are aggregated per (template revision, day): fill and
+    'Not mentioned' counts for every field, option counts for dropdown and
+    multi_select fields and the sorted values of number fields. Closed days
+    are stored in template_field_daily_stats, so a range read only computes
+    today and days whose reports changed. Daily partials of every revision
+    are then merged by field name.
+    """
+    MAX_DAYS = 366
+    PERCENTILES = (25, 50, 75, 90)
+    DISTRIBUTION_TYPES = ('dropdown', 'multi_select')
+
+    # Value states as classified in SQL
+    EMPTY, NOT_MENTIONED, FILLED = 0, 1, 2
+
+    # IDs per IN (...) list when invalidating
+    CHUNK_SIZE = 1000
+
+    @staticmethod
+    def _conditions(team_id, template_id, start_day, end_day):
+        """Filters for a template's finalized reports created in [start_day, end_day]"""
+        return [
+            Report.team_id == team_id,
+            Report.template_id == template_id,
+            Report.status == 'finalized',
+            Report.created_at >= datetime.combine(start_day, time.min),
+            Report.created_at < datetime.combine(end_day + timedelta(days=1), time.min)
+        ]
+
+    @staticmethod
+    def _positions(keys, values):
+        """Index of each value in the sorted keys array, and whether it was found"""
+        if len(keys) == 0:
+            return np.zeros(len(values), dtype=np.int64), np.zeros(len(values), dtype=bool)
+        positions = np.searchsorted(keys, values)
+        clipped = np.minimum(positions, len(keys) - 1)
+        return clipped, keys[clipped] == values
+
+    @staticmethod
+    def _compute(team_id, template_id, revision_id, days):
+        """Daily partials of one revision for the given days
+
+        Returns:
+            dict: {day: (report_count, stats)}
+        """
+        fields = TemplateRevisionService.get_fields(revision_id)
+        field_ids = np.array(sorted(field['id'] for field in fields), dtype=np.int64)
+        day_keys = np.array(sorted(days), dtype='datetime64[D]')
+        field_count, day_count = len(field_ids), len(day_keys)
+
+        conditions = FieldAnalyticsService._conditions(team_id, template_id, min(days), max(days)) + [
+            Report.template_revision_id == revision_id
+        ]
+
+        # Reports of the revision, and the requested day each one falls on
+        reports = db.session.execute(
+            select(Report.id, Report.created_at).where(*conditions).order_by(Report.id)
+        ).all()
+        if not reports:
+            return {day: (0, {}) for day in days}
+        report_ids = np.array([row[0] for row in reports], dtype=np.int64)
+        report_day, report_found = FieldAnalyticsService._positions(
+            day_keys, np.array([row[1] for row in reports], dtype='datetime64[D]')
+        )
+        report_counts = np.bincount(report_day[report_found], minlength=day_count)
+
+        def slots(row_report_ids, row_field_ids):
+            """(day * field_count + field) slot of each row, and which rows count"""
+            report_pos, found = FieldAnalyticsService._positions(report_ids, row_report_ids)
+            field_pos, field_found = FieldAnalyticsService._positions(field_ids, row_field_ids)
+            keep = found & report_found[report_pos] & field_found
+            return report_day[report_pos] * field_count + field_pos, keep
+
+        # Value states, classified in SQL so long text never leaves the database
+        value = func.trim(func.coalesce(ReportFieldValue.field_value, ''))
+        state = case(
+            (value == '', FieldAnalyticsService.EMPTY),
+            (value == 'Not mentioned', FieldAnalyticsService.NOT_MENTIONED),
+            else_=FieldAnalyticsService.FILLED
+        )
+        states = np.array(db.session.execute(
+            select(ReportFieldValue.report_id, ReportFieldValue.field_id, state)
+            .join(Report, Report.id == ReportFieldValue.report_id)
+            .where(*conditions, ReportFieldValue.field_id.isnot(None))
+        ).all(), dtype=np.int64).reshape(-1, 3)
+
+        state_slots, keep = slots(states[:, 0], states[:, 1])
+        size = day_count * field_count
+        filled = np.bincount(state_slots[keep & (states[:, 2] == FieldAnalyticsService.FILLED)], minlength=size)
+        not_mentioned = np.bincount(
+            state_slots[keep & (states[:, 2] == FieldAnalyticsService.NOT_MENTIONED)], minlength=size
+        )
+
+        # Typed values come straight from the field index
+        typed_ids = [
+            field['id'] for field in fields
+            if field['field_type'] == 'number' or field['field_type'] in FieldAnalyticsService.DISTRIBUTION_TYPES
+        ]
+        typed = db.session.execute(
+            select(ReportFieldIndex.report_id, ReportFieldIndex.field_id,
+                   ReportFieldIndex.value_text, ReportFieldIndex.value_number)
+            .join(Report, Report.id == ReportFieldIndex.report_id)
+            .where(*conditions, ReportFieldIndex.field_id.in_(typed_ids))
+        ).all() if typed_ids else []
+
+        numbers = {}
+        number_rows = [row for row in typed if row[3] is not None]
+        if number_rows:
+            number_slots, keep = slots(
+                np.array([row[0] for row in number_rows], dtype=np.int64),
+                np.array([row[1] for row in number_rows], dtype=np.int64)
+            )
+            number_slots = number_slots[keep]
+            values = np.array([row[3] for row in number_rows], dtype=np.float64)[keep]
+            order = np.lexsort((values, number_slots))
+            number_slots, values = number_slots[order], values[order]
+            unique_slots, starts = np.unique(number_slots, return_index=True)
+            for slot, slot_values in zip(unique_slots, np.split(values, starts[1:])):
+                numbers[int(slot)] = slot_values.tolist()
+
+        options = defaultdict(dict)
+        option_rows = [row for row in typed if row[2] is not None]
+        if option_rows:
+            option_slots, keep = slots(
+                np.array([row[0] for row in option_rows], dtype=np.int64),
+                np.array([row[1] for row in option_rows], dtype=np.int64)
+            )
+            labels, codes = np.unique(np.array([row[2] for row in option_rows], dtype=object), return_inverse=True)
+            keyed, counts = np.unique(option_slots[keep] * len(labels) + codes.reshape(-1)[keep], return_counts=True)
+            for key, count in zip(keyed, counts):
+                options[int(key // len(labels))][str(labels[key % len(labels)])] = int(count)
+
+        field_types = {field['id']: field['field_type'] for field in fields}
+        partials = {}
+        for day_index, day in enumerate(day_keys.tolist()):
+            stats = {}
+            for field_index, field_id in enumerate(field_ids.tolist()):
+                slot = day_index * field_count + field_index
+                entry = {'filled': int(filled[slot]), 'not_mentioned': int(not_mentioned[slot])}
+                if field_types[field_id] == 'number':
+                    entry['numbers'] = numbers.get(slot, [])
+                elif field_types[field_id] in FieldAnalyticsService.DISTRIBUTION_TYPES:
+                    entry['options'] = options.get(slot, {})
+                stats[str(field_id)] = entry
+            partials[day] = (int(report_counts[day_index]), stats)
+
+        return partials
+
+    @staticmethod
+    def _store(team_id, revision_id, partials):
+        """Persist the partials of closed days; a concurrent writer wins ties"""
+        if not partials:
+            return
+
+        table = TemplateFieldDailyStats.__table__
+        now = datetime.utcnow()
+        try:
+            db.session.execute(delete(table).where(
+                table.c.team_id == team_id,
+                table.c.template_revision_id == revision_id,
+                table.c.day.in_(list(partials))
+            ))
+            db.session.execute(insert(table), [
+                {
+                    'team_id': team_id,
+                    'template_revision_id': revision_id,
+                    'day': day,
+                    'report_count': report_count,
+                    'stats': stats,
+                    'computed_at': now
+                }
+                for day, (report_count, stats) in partials.items()
+            ])
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+
+    @staticmethod
+    def _daily_partials(team_id, template_id, start_day, end_day):
+        """{(revision_id, day): (report_count, stats)} for every day with reports"""
+        day_column = func.date(Report.created_at)
+        counts = {
+            (revision_id, RollupService._day(day)): count
+            for revision_id, day, count in db.session.query(
+                Report.template_revision_id, day_column, func.count(Report.id)
+            ).filter(
+                *FieldAnalyticsService._conditions(team_id, template_id, start_day, end_day),
+                Report.template_revision_id.isnot(None)
+            ).group_by(Report.template_revision_id, day_column)
+        }
+        if not counts:
+            return {}
+
+        cached = {
+            (row.template_revision_id, row.day): (row.report_count, row.stats)
+            for row in TemplateFieldDailyStats.query.filter(
+                TemplateFieldDailyStats.team_id == team_id,
+                TemplateFieldDailyStats.template_revision_id.in_({revision_id for revision_id, _ in counts}),
+                TemplateFieldDailyStats.day >= start_day,
+                TemplateFieldDailyStats.day <= end_day
+            )
+        }
+
+        partials = {}
+        missing = defaultdict(list)
+        for key, count in counts.items():
+            # A changed report count means the stored day is stale
+            if key in cached and cached[key][0] == count:
+                partials[key] = cached[key]
+            else:
+                missing[key[0]].append(key[1])
+
+        today = datetime.utcnow().date()
+        for revision_id, days in missing.items():
+            computed = FieldAnalyticsService._compute(team_id, template_id, revision_id, days)
+            for day, partial in computed.items():
+                partials[(revision_id, day)] = partial
+            FieldAnalyticsService._store(team_id, revision_id, {
+                day: partial for day, partial in computed.items() if day < today
+            })
+
+        return partials
+
+    @staticmethod
+    def _field_catalog(template, revision_ids):
+        """Fields by name across revisions, newest definition first in display order
+
+        Returns:
+            tuple: (ordered field dicts, {revision_id: {field_name: field_id}})
+        """
+        by_revision = {}
+        catalog = {}
+        for revision_id in sorted((set(revision_ids) | {template.current_revision_id}) - {None}):
+            fields = TemplateRevisionService.get_fields(revision_id)
+            by_revision[revision_id] = {field['field_name']: field['id'] for field in fields}
+            for field in fields:
+                catalog.pop(field['field_name'], None)
+                catalog[field['field_name']] = field
+
+        current = [field['field_name'] for field in TemplateRevisionService.get_fields(template.current_revision_id)]
+        ordered = [catalog[name] for name in current] + [
+            field for name, field in catalog.items() if name not in current
+        ]
+        return ordered, by_revision
+
+    @staticmethod
+    def _rate(count, total):
+        return round(count / total, 4) if total else None
+
+    @staticmethod
+    def get_field_stats(team_id, template_id, start_day, end_day):
+        """Field statistics of a template's finalized reports over a date range
+
+        Args:
+            start_day, end_day: Inclusive date range (UTC days)
+
+        Returns:
+            dict: Totals, a per-day report series and per-field fill rates,
+                'Not mentioned' rates, option distributions and numeric summaries
+        """
+        if end_day < start_day:
+            raise ValueError("start must not be after end")
+        if (end_day - start_day).days + 1 > FieldAnalyticsService.MAX_DAYS:
+            raise ValueError(f"Date range can be at most {FieldAnalyticsService.MAX_DAYS} days")
+
+        template = db.session.get(ReportTemplate, template_id) if template_id else None
+        if not template or template.team_id != team_id:
+            raise ValueError("Template not found")
+
+        partials = FieldAnalyticsService._daily_partials(team_id, template.id, start_day, end_day)
+        fields, by_revision = FieldAnalyticsService._field_catalog(template, [key[0] for key in partials])
+
+        days = [start_day + timedelta(days=offset) for offset in range((end_day - start_day).days + 1)]
+        reports_per_day = defaultdict(int)
+        for (revision_id, day), (report_count, _) in partials.items():
+            reports_per_day[day] += report_count
+
+        results = []
+        for field in fields:
+            name = field['field_name']
+            daily = {day: {'report_count': 0, 'filled': 0, 'not_mentioned': 0, 'numbers': []} for day in days}
+            options = defaultdict(int)
+
+            for (revision_id, day), (report_count, stats) in partials.items():
+                field_id = by_revision.get(revision_id, {}).get(name)
+                entry = stats.get(str(field_id)) if field_id is not None else None
+                if entry is None:
+                    continue
+                totals = daily[day]
+                totals['report_count'] += report_count
+                totals['filled'] += entry['filled']
+                totals['not_mentioned'] += entry['not_mentioned']
+                if entry.get('numbers'):
+                    totals['numbers'].append(np.asarray(entry['numbers'], dtype=np.float64))
+                for option, count in entry.get('options', {}).items():
+                    options[option] += count
+
+            report_count = sum(totals['report_count'] for totals in daily.values())
+            filled = sum(totals['filled'] for totals in daily.values())
+            not_mentioned = sum(totals['not_mentioned'] for totals in daily.values())
+
+            result = {
+                'field_name': name,
+                'field_label': field['field_label'],
+                'field_type': field['field_type'],
+                'report_count': report_count,
+                'filled': filled,
+                'not_mentioned': not_mentioned,
+                'fill_rate': FieldAnalyticsService._rate(filled, report_count),
+                'not_mentioned_rate': FieldAnalyticsService._rate(not_mentioned, report_count)
+            }
+
+            if field['field_type'] in FieldAnalyticsService.DISTRIBUTION_TYPES:
+                result['distribution'] = [
+                    {'value': option, 'count': count, 'rate': FieldAnalyticsService._rate(count, report_count)}
+                    for option, count in sorted(options.items(), key=lambda item: (-item[1], item[0]))
+                ]
+
+            if field['field_type'] == 'number':
+                arrays = [array for totals in daily.values() for array in totals['numbers']]
+                values = np.concatenate(arrays) if arrays else np.empty(0)
+                numeric = {'count': int(values.size)}
+                if values.size:
+                    percentiles = np.percentile(values, FieldAnalyticsService.PERCENTILES)
+                    numeric.update({
+                        'mean': round(float(values.mean()), 4),
+                        'median': round(float(np.median(values)), 4),
+                        'min': float(values.min()),
+                        'max': float(values.max()),
+                        **{f"p{p}": round(float(v), 4) for p, v in zip(FieldAnalyticsService.PERCENTILES, percentiles)}
+                    })
+                result['numeric'] = numeric
+
+            result['daily'] = []
+            for day in days:
+                totals = daily[day]
+                point = {
+                    'date': day.isoformat(),
+                    'report_count': totals['report_count'],
+                    'filled': totals['filled'],
+                    'not_mentioned': totals['not_mentioned']
+                }
+                if field['field_type'] == 'number':
+                    values = np.concatenate(totals['numbers']) if totals['numbers'] else None
+                    point['mean'] = round(float(values.mean()), 4) if values is not None else None
+                result['daily'].append(point)
+
+            results.append(result)
+
+        return {
+            'template_id': template.id,
+            'template_name': template.name,
+            'start': start_day.isoformat(),
+            'end': end_day.isoformat(),
+            'report_count': sum(reports_per_day.values()),
+            'daily': [{'date': day.isoformat(), 'report_count': reports_per_day.get(day, 0)} for day in days],
+            'fields': results
+        }
+
+    @staticmethod
+    def invalidate_reports(report_ids):
+        """Drop stored days holding any of these finalized reports
+
+        Call after a report's field values change or it is finalized, and
+        before it is deleted. Today is never stored, so only reports from
+        earlier days cost a DELETE.
+        """
+        report_ids = list(report_ids or ())
+        if not report_ids:
+            return
+
+        today_start = datetime.combine(datetime.utcnow().date(), time.min)
+        stale = defaultdict(set)
+        for start in range(0, len(report_ids), FieldAnalyticsService.CHUNK_SIZE):
+            chunk = report_ids[start:start + FieldAnalyticsService.CHUNK_SIZE]
+            for team_id, revision_id, created_at in db.session.query(
+                Report.team_id, Report.template_revision_id, Report.created_at
+            ).filter(
+                Report.id.in_(chunk),
+                Report.status == 'finalized',
+                Report.template_revision_id.isnot(None),
+                Report.created_at < today_start
+            ):
+                stale[(team_id, revision_id)].add(RollupService._day(created_at))
+
+        table = TemplateFieldDailyStats.__table__
+        for (team_id, revision_id), days in stale.items():
+            db.session.execute(delete(table).where(
+                table.c.team_id == team_id,
+                table.c.template_revision_id == revision_id,
+                table.c.day.in_(sorted(days))
+            ))
+
+    @staticmethod
+    def clear(team_id=None):
+        """Drop stored daily field stats (optionally for one team)
+
+        Returns:
+            int: Number of rows deleted
+        """
+        table = TemplateFieldDailyStats.__table__
+        statement = delete(table)
+        if team_id:
+            statement = statement.where(table.c.team_id == team_id)
+        deleted = db.session.execute(statement).rowcount
+        db.session.commit()
+        return deleted
@@ -0,0 +1,307 @@
+from app import db
+from app.models.field_index import ReportFieldIndex
+from app.models.report import Report
+from app.models.template import ReportTemplate, TemplateField
+from app.models.user import User
+from app.services.identity_service import IdentityService
+from app.services.template_revision_service import TemplateRevisionService
+from sqlalchemy import select, insert, delete
+import ast
+import json
+import math
+
+
+class FieldIndexService:
+    """Typed field-value index and the filter queries that run on it
+
+    Rows are rewritten whenever FieldValueService refreshes a report's
+    snapshot. Text-like values go to value_text, numbers to value_number,
+    and multi_select values expand to one row per selected option.
+    long_text fields and custom fields are not indexed.
+    """
+    INDEXED_TYPES = ('text', 'dropdown', 'multi_select', 'number')
+    EMPTY_VALUES = ('', 'Not mentioned')
+    MAX_FILTERS = 10
+    MAX_SET_SIZE = 100
+
+    NUMBER_OPS = ('eq', 'in', 'gt', 'gte', 'lt', 'lte', 'between')
+    TEXT_OPS = ('eq', 'in')
+
+    @staticmethod
+    def _split_options(value):
+        """Selected options of a stored multi_select value"""
+        if value.startswith('['):
+            for parse in (json.loads, ast.literal_eval):
+                try:
+                    parsed = parse(value)
+                except (ValueError, SyntaxError):
+                    continue
+                if isinstance(parsed, list):
+                    return [str(option).strip() for option in parsed if str(option).strip()]
+        return [option.strip() for option in value.split(',') if option.strip()]
+
+    @staticmethod
+    def typed_values(field_type, value):
+        """(value_text, value_number) pairs a stored field value expands to"""
+        if value is None or field_type not in FieldIndexService.INDEXED_TYPES:
+            return []
+
+        value = str(value).strip()
+        if value in FieldIndexService.EMPTY_VALUES:
+            return []
+
+        if field_type == 'number':
+            try:
+                number = float(value)
+            except ValueError:
+                return []
+            return [(None, number)] if math.isfinite(number) else []
+
+        if field_type == 'multi_select':
+            options = dict.fromkeys(option[:255] for option in FieldIndexService._split_options(value))
+            return [(option, None) for option in options]
+
+        return [(value[:255], None)]
+
+    @staticmethod
+    def refresh(entries):
+        """Rewrite the index rows of reports from their snapshot entries
+
+        Args:
+            entries: {report_id: [[field_id, field_name, field_label, field_type, value], ...]}
+        """
+        if not entries:
+            return
+
+        report_ids = list(entries)
+        owners = {
+            report_id: (team_id, template_id)
+            for report_id, team_id, template_id in db.session.query(
+                Report.id, Report.team_id, Report.template_id
+            ).filter(Report.id.in_(report_ids))
+        }
+
+        db.session.execute(
+            delete(ReportFieldIndex.__table__).where(ReportFieldIndex.__table__.c.report_id.in_(report_ids))
+        )
+
+        rows = []
+        for report_id, report_entries in entries.items():
+            if report_id not in owners:
+                continue
+            team_id, template_id = owners[report_id]
+            for field_id, field_name, field_label, field_type, value in report_entries:
+                if field_id is None:
+                    continue
+                for value_text, value_number in FieldIndexService.typed_values(field_type, value):
+                    rows.append({
+                        'report_id': report_id,
+                        'team_id': team_id,
+                        'template_id': template_id,
+                        'field_id': field_id,
+                        'field_name': field_name,
+                        'value_text': value_text,
+                        'value_number': value_number
+                    })
+
+        if rows:
+            db.session.execute(insert(ReportFieldIndex.__table__), rows)
+
+    @staticmethod
+    def remove_reports(report_ids):
+        """Drop index rows for deleted reports"""
+        if not report_ids:
+            return
+        db.session.execute(
+            delete(ReportFieldIndex.__table__).where(ReportFieldIndex.__table__.c.report_id.in_(list(report_ids)))
+        )
+
+    @staticmethod
+    def rebuild_all(team_id=None, batch_size=500):
+        """Rebuild the index for every report (optionally for one team)
+
+        Returns:
+            int: Number of reports indexed
+        """
+        from app.services.field_value_service import FieldValueService
+
+        query = db.session.query(Report.id).order_by(Report.id)
+        if team_id:
+            query = query.filter(Report.team_id == team_id)
+
+        indexed = 0
+        last_id = 0
+        while True:
+            report_ids = [row[0] for row in query.filter(Report.id > last_id).limit(batch_size)]
+            if not report_ids:
+                break
+
+            FieldIndexService.refresh(FieldValueService.snapshot_entries(report_ids))
+            indexed += len(report_ids)
+            last_id = report_ids[-1]
+            db.session.commit()
+
+        return indexed
+
+    @staticmethod
+    def _resolve_field(template, field_ref):
+        """(field_name, field_type) for a field ID or name of the template"""
+        current_fields = TemplateRevisionService.get_fields(template.current_revision_id)
+
+        for field in current_fields:
+            if field_ref == field['id'] or field_ref == field['field_name']:
+                return field['field_name'], field['field_type']
+
+        # Fields of earlier revisions still match older reports
+        query = db.session.query(TemplateField.field_name, TemplateField.field_type).filter(
+            TemplateField.template_id == template.id
+        )
+        if isinstance(field_ref, int):
+            query = query.filter(TemplateField.id == field_ref)
+        else:
+            query = query.filter(TemplateField.field_name == str(field_ref))
+        field = query.order_by(TemplateField.id.desc()).first()
+        if field:
+            return field.field_name, field.field_type
+
+        raise ValueError(f"Unknown field: {field_ref}")
+
+    @staticmethod
+    def _number(value):
+        if isinstance(value, bool):
+            raise ValueError("Numeric filter values must be numbers")
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError("Numeric filter values must be numbers")
+        if not math.isfinite(number):
+            raise ValueError("Numeric filter values must be finite")
+        return number
+
+    @staticmethod
+    def _condition(field_type, op, value):
+        """Column condition on the index for one filter"""
+        index = ReportFieldIndex
+
+        if field_type == 'number':
+            if op not in FieldIndexService.NUMBER_OPS:
+                raise ValueError(f"Unsupported operator for number field: {op}")
+            column = index.value_number
+            if op == 'in':
+                return column.in_([FieldIndexService._number(v) for v in FieldIndexService._set(value)])
+            if op == 'between':
+                if not isinstance(value, (list, tuple)) or len(value) != 2:
+                    raise ValueError("'between' needs a [low, high] pair")
+                return column.between(FieldIndexService._number(value[0]), FieldIndexService._number(value[1]))
+            number = FieldIndexService._number(value)
+            return {
+                'eq': column == number,
+                'gt': column > number,
+                'gte': column >= number,
+                'lt': column < number,
+                'lte': column <= number
+            }[op]
+
+        if field_type not in FieldIndexService.INDEXED_TYPES:
+            raise ValueError(f"Fields of type {field_type} can't be filtered")
+        if op not in FieldIndexService.TEXT_OPS:
+            raise ValueError(f"Unsupported operator for {field_type} field: {op}")
+
+        column = index.value_text
+        if op == 'in':
+            return column.in_([str(v)[:255] for v in FieldIndexService._set(value)])
+        return column == str(value)[:255]
+
+    @staticmethod
+    def _set(value):
+        if not isinstance(value, (list, tuple)) or not value:
+            raise ValueError("'in' needs a non-empty list of values")
+        if len(value) > FieldIndexService.MAX_SET_SIZE:
+            raise ValueError(f"'in' accepts at most {FieldIndexService.MAX_SET_SIZE} values")
+        return value
+
+    @staticmethod
+    def filter_subqueries(team_id, template, filters):
+        """One report-id subquery per filter, each served by an index range scan"""
+        if not isinstance(filters, list) or not filters:
+            raise ValueError("At least one filter is required")
+        if len(filters) > FieldIndexService.MAX_FILTERS:
+            raise ValueError(f"At most {FieldIndexService.MAX_FILTERS} filters are allowed")
+
+        subqueries = []
+        for spec in filters:
+            if not isinstance(spec, dict) or 'field' not in spec or 'value' not in spec:
+                raise ValueError("Each filter needs 'field', 'op' and 'value'")
+
+            field_name, field_type = FieldIndexService._resolve_field(template, spec['field'])
+            condition = FieldIndexService._condition(field_type, spec.get('op', 'eq'), spec['value'])
+
+            subqueries.append(select(ReportFieldIndex.report_id).where(
+                ReportFieldIndex.team_id == team_id,
+                ReportFieldIndex.template_id == template.id,
+                ReportFieldIndex.field_name == field_name,
+                condition
+            ))
+
+        return subqueries
+
+    @staticmethod
+    def query_reports(user_id, team_id, template_id, filters, page=1, limit=20, status='finalized'):
+        """Reports of a template whose field values match every filter
+
+        Visibility rules match ReportService.get_reports:
+        - Owner can see all reports in the team
+        - Team members can only see their own reports
+
+        Args:
+            filters: List of {'field': field ID or name, 'op': 'eq' | 'in' | 'gt' |
+                'gte' | 'lt' | 'lte' | 'between', 'value': ...}
+        """
+        template = db.session.get(ReportTemplate, template_id) if template_id else None
+        if not template:
+            raise ValueError("Template not found")
+
+        subqueries = FieldIndexService.filter_subqueries(team_id, template, filters)
+
+        query = Report.query.filter(
+            Report.team_id == team_id,
+            Report.template_id == template.id
+        )
+
+        if not IdentityService.is_owner(user_id, team_id):
+            query = query.filter(Report.user_id == user_id)
+
+        if status:
+            query = query.filter(Report.status == status)
+
+        for subquery in subqueries:
+            query = query.filter(Report.id.in_(subquery))
+
+        total = query.count()
+        reports = query.order_by(Report.created_at.desc()).offset((page - 1) * limit).limit(limit).all()
+
+        # Creator names in one query; field values from each report's snapshot
+        from app.services.report_service import ReportService
+        user_ids = {report.user_id for report in reports}
+        names = {
+            uid: f"{first_name} {last_name}"
+            for uid, first_name, last_name in db.session.query(
+                User.id, User.first_name, User.last_name
+            ).filter(User.id.in_(user_ids))
+        } if user_ids else {}
+        field_values = ReportService._list_field_values(reports)
+
+        results = []
+        for report in reports:
+            report_dict = report.to_dict()
+            report_dict['template_name'] = template.name
+            report_dict['created_by'] = names.get(report.user_id, 'Unknown')
+            report_dict['field_values'] = field_values[report.id]
+            results.append(report_dict)
+
+        return {
+            'reports': results,
+            'total': total,
+            'page': page,
+            'pages': (total + limit - 1) // limit
+        }
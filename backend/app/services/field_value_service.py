@@ -0,0 +1,257 @@
+from app import db
+from app.models.report import Report, ReportFieldValue
+from app.models.template import TemplateField
+from app.services.field_index_service import FieldIndexService
+from app.services.field_analytics_service import FieldAnalyticsService
+from sqlalchemy import insert, update, delete, bindparam
+from sqlalchemy.orm.util import identity_key
+from datetime import datetime
+
+
+class FieldValueService:
+    """Bulk writes of report field values
+
+    Rows are built as plain mappings and sent as one executemany rather
+    than one ORM object (and one flush round trip) per field. Every write
+    also refreshes the report's denormalized field_snapshot and its rows in
+    the typed field index.
+    """
+
+    @staticmethod
+    def _serialize(value):
+        return str(value) if value is not None else None
+
+    @staticmethod
+    def build_rows(report_id, field_values=None, custom_fields=None):
+        """Mappings for template field values and named custom fields"""
+        now = datetime.utcnow()
+        rows = []
+
+        for fv in field_values or []:
+            if fv.get('field_id') is None:
+                continue
+            rows.append({
+                'report_id': report_id,
+                'field_id': fv['field_id'],
+                'custom_field_name': None,
+                'field_value': FieldValueService._serialize(fv.get('value')),
+                'created_at': now,
+                'updated_at': now
+            })
+
+        for cf in custom_fields or []:
+            custom_field_name = cf.get('custom_field_name')
+            if not custom_field_name:  # Only add if name is provided
+                continue
+            rows.append({
+                'report_id': report_id,
+                'field_id': None,
+                'custom_field_name': custom_field_name,
+                'field_value': FieldValueService._serialize(cf.get('value')),
+                'created_at': now,
+                'updated_at': now
+            })
+
+        return rows
+
+    @staticmethod
+    def insert_values(report_id, field_values=None, custom_fields=None):
+        """Insert all field values for a new report in one statement
+
+        Returns:
+            int: Number of rows written
+        """
+        rows = FieldValueService.build_rows(report_id, field_values, custom_fields)
+        if rows:
+            db.session.execute(insert(ReportFieldValue.__table__), rows)
+        FieldValueService.refresh_snapshots([report_id])
+        return len(rows)
+
+    @staticmethod
+    def replace_values(report_id, field_values=None, custom_fields=None):
+        """Delete every field value of a report and insert the new set"""
+        db.session.execute(
+            delete(ReportFieldValue.__table__).where(ReportFieldValue.__table__.c.report_id == report_id)
+        )
+        return FieldValueService.insert_values(report_id, field_values, custom_fields)
+
+    @staticmethod
+    def _upsert_statement(dialect):
+        """INSERT ... ON DUPLICATE KEY / ON CONFLICT keyed on (report_id, field_id)"""
+        table = ReportFieldValue.__table__
+
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+            stmt = mysql_insert(table)
+            return stmt.on_duplicate_key_update(
+                field_value=stmt.inserted.field_value,
+                updated_at=stmt.inserted.updated_at
+            )
+
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            stmt = dialect_insert(table)
+            return stmt.on_conflict_do_update(
+                index_elements=['report_id', 'field_id'],
+                set_={
+                    'field_value': stmt.excluded.field_value,
+                    'updated_at': stmt.excluded.updated_at
+                }
+            )
+
+        return None
+
+    @staticmethod
+    def upsert_values(report_id, field_values):
+        """Insert or update template field values in one upsert
+
+        Relies on the unique constraint on (report_id, field_id).
+
+        Returns:
+            int: Number of values written
+        """
+        rows = FieldValueService.build_rows(report_id, field_values)
+        if not rows:
+            return 0
+
+        stmt = FieldValueService._upsert_statement(db.session.get_bind().dialect.name)
+        if stmt is not None:
+            db.session.execute(stmt, rows)
+            FieldValueService.refresh_snapshots([report_id])
+            return len(rows)
+
+        # Other databases: one lookup for the existing keys, then an executemany each way
+        table = ReportFieldValue.__table__
+        existing = {
+            field_id for (field_id,) in db.session.execute(
+                table.select().with_only_columns(table.c.field_id).where(
+                    table.c.report_id == report_id,
+                    table.c.field_id.in_([row['field_id'] for row in rows])
+                )
+            )
+        }
+        updates = [row for row in rows if row['field_id'] in existing]
+        inserts = [row for row in rows if row['field_id'] not in existing]
+
+        if updates:
+            db.session.execute(
+                update(table).where(
+                    table.c.report_id == bindparam('b_report_id'),
+                    table.c.field_id == bindparam('b_field_id')
+                ).values(field_value=bindparam('b_field_value'), updated_at=bindparam('b_updated_at')),
+                [
+                    {
+                        'b_report_id': row['report_id'],
+                        'b_field_id': row['field_id'],
+                        'b_field_value': row['field_value'],
+                        'b_updated_at': row['updated_at']
+                    }
+                    for row in updates
+                ]
+            )
+        if inserts:
+            db.session.execute(insert(table), inserts)
+
+        FieldValueService.refresh_snapshots([report_id])
+        return len(rows)
+
+    @staticmethod
+    def replace_custom_fields(report_id, custom_fields):
+        """Swap a report's custom fields for a new set"""
+        table = ReportFieldValue.__table__
+        db.session.execute(
+            delete(table).where(table.c.report_id == report_id, table.c.field_id.is_(None))
+        )
+        return FieldValueService.insert_values(report_id, custom_fields=custom_fields)
+
+    @staticmethod
+    def snapshot_entries(report_ids):
+        """Snapshot entries per report, built from the normalized rows in one query"""
+        entries = {report_id: [] for report_id in report_ids}
+        if not entries:
+            return entries
+
+        rows = db.session.query(
+            ReportFieldValue.report_id,
+            ReportFieldValue.field_id,
+            TemplateField.field_name,
+            TemplateField.field_label,
+            TemplateField.field_type,
+            ReportFieldValue.custom_field_name,
+            ReportFieldValue.field_value
+        ).outerjoin(
+            TemplateField, TemplateField.id == ReportFieldValue.field_id
+        ).filter(
+            ReportFieldValue.report_id.in_(list(entries))
+        ).order_by(ReportFieldValue.report_id, ReportFieldValue.id).all()
+
+        for report_id, field_id, field_name, field_label, field_type, custom_field_name, value in rows:
+            if field_id is None:
+                if not custom_field_name:
+                    continue
+                entries[report_id].append([
+                    None, custom_field_name.lower().replace(' ', '_'), custom_field_name, 'text', value
+                ])
+            elif field_name is not None:
+                entries[report_id].append([field_id, field_name, field_label, field_type, value])
+
+        return entries
+
+    @staticmethod
+    def refresh_snapshots(report_ids):
+        """Rewrite the field snapshot of each report from its normalized rows
+
+        Leaves updated_at alone, so rebuilding snapshots doesn't look like
+        an edit to anything keyed on it.
+        """
+        entries = FieldValueService.snapshot_entries(report_ids)
+        if not entries:
+            return 0
+
+        table = Report.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('b_id')).values(
+                field_snapshot=bindparam('b_snapshot'),
+                updated_at=table.c.updated_at
+            ),
+            [{'b_id': report_id, 'b_snapshot': snapshot} for report_id, snapshot in entries.items()]
+        )
+
+        # Loaded reports would otherwise keep serving the old snapshot
+        for report_id in entries:
+            report = db.session.identity_map.get(identity_key(Report, report_id))
+            if report is not None:
+                db.session.expire(report, ['field_snapshot'])
+
+        # The typed filter index is derived from the same entries
+        FieldIndexService.refresh(entries)
+        FieldAnalyticsService.invalidate_reports(list(entries))
+
+        return len(entries)
+
+    @staticmethod
+    def rebuild_all(team_id=None, batch_size=500):
+        """Rebuild field snapshots and index rows for every report (optionally for one team)
+
+        Returns:
+            int: Number of reports rebuilt
+        """
+        query = db.session.query(Report.id).order_by(Report.id)
+        if team_id:
+            query = query.filter(Report.team_id == team_id)
+
+        rebuilt = 0
+        last_id = 0
+        while True:
+            report_ids = [row[0] for row in query.filter(Report.id > last_id).limit(batch_size)]
+            if not report_ids:
+                break
+
+            rebuilt += FieldValueService.refresh_snapshots(report_ids)
+            last_id = report_ids[-1]
+            db.session.commit()
+
+        return rebuilt
@@ -0,0 +1,252 @@
+from app import db
+from app.db_routing import use_primary
+from app.models.user import User
+from app.models.team import Team, TeamMember
+from flask import current_app, request, has_app_context, has_request_context
+from sqlalchemy import event, inspect, update
+import threading
+import time
+
+
+class IdentityService:
+    """Short-TTL cache of who a user is and which teams they belong to
+
+    Entries hold the user's active flag, names, team memberships with roles
+    and owned teams. Each entry is stored with the user's identity_version;
+    any flush that touches the user, their memberships or teams they own
+    bumps that column in the same transaction. Before serving an entry
+    every worker reads the column back with one primary-key lookup, so
+    once the change commits no worker serves the old identity.
+    """
+    MAX_ENTRIES = 10000
+
+    _lock = threading.Lock()
+    _entries = {}   # user_id -> (identity_version, expires_at, identity)
+
+    REQUEST_CACHE_KEY = 'voiceflow.identities'
+
+    @staticmethod
+    def _ttl():
+        if not has_app_context():
+            return 0
+        return current_app.config.get('IDENTITY_CACHE_TTL', 30)
+
+    @staticmethod
+    def _request_cache():
+        """Per-request memo so one request sees a single identity"""
+        if not has_request_context():
+            return None
+        return request.environ.setdefault(IdentityService.REQUEST_CACHE_KEY, {})
+
+    @staticmethod
+    def _load(user_id):
+        """Read a user's identity from the primary database"""
+        with use_primary():
+            return IdentityService._load_from_session(user_id)
+
+    @staticmethod
+    def _load_from_session(user_id):
+        user = db.session.query(
+            User.id, User.email, User.first_name, User.last_name, User.is_active, User.identity_version
+        ).filter(User.id == user_id).first()
+
+        if not user:
+            return None
+
+        memberships = db.session.query(TeamMember.team_id, TeamMember.role).filter(
+            TeamMember.user_id == user_id
+        ).order_by(TeamMember.id).all()
+
+        owned_team_ids = [row[0] for row in db.session.query(Team.id).filter(
+            Team.owner_id == user_id
+        ).order_by(Team.id)]
+
+        return {
+            'id': user.id,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'is_active': bool(user.is_active),
+            'memberships': [{'team_id': team_id, 'role': role} for team_id, role in memberships],
+            'owned_team_ids': owned_team_ids,
+            'version': user.identity_version
+        }
+
+    @staticmethod
+    def _current_version(user_id):
+        """The user's identity_version on the primary, or None if the user is gone"""
+        with use_primary():
+            return db.session.query(User.identity_version).filter(User.id == user_id).scalar()
+
+    @staticmethod
+    def get_identity(user_id):
+        """Cached identity dict for a user, or None if the user does not exist"""
+        if user_id is None:
+            return None
+
+        # Within a request the same identity is reused without locking
+        request_cache = IdentityService._request_cache()
+        if request_cache is not None and user_id in request_cache:
+            return request_cache[user_id]
+
+        ttl = IdentityService._ttl()
+        now = time.monotonic()
+
+        with IdentityService._lock:
+            entry = IdentityService._entries.get(user_id)
+
+        if ttl > 0 and entry and entry[1] > now and entry[0] == IdentityService._current_version(user_id):
+            identity = entry[2]
+        else:
+            identity = IdentityService._load(user_id)
+
+            if ttl > 0 and identity is not None:
+                # An entry loaded just before a change carries the old version and is reloaded next time
+                with IdentityService._lock:
+                    if len(IdentityService._entries) >= IdentityService.MAX_ENTRIES:
+                        IdentityService._entries.clear()
+                    IdentityService._entries[user_id] = (identity['version'], now + ttl, identity)
+
+        if request_cache is not None:
+            request_cache[user_id] = identity
+
+        return identity
+
+    @staticmethod
+    def invalidate(*user_ids):
+        """Drop this worker's cached identities for the given users"""
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return
+
+        with IdentityService._lock:
+            for user_id in user_ids:
+                IdentityService._entries.pop(user_id, None)
+
+        request_cache = IdentityService._request_cache()
+        if request_cache:
+            for user_id in user_ids:
+                request_cache.pop(user_id, None)
+
+    @staticmethod
+    def clear():
+        """Drop every cached identity"""
+        with IdentityService._lock:
+            IdentityService._entries.clear()
+
+        request_cache = IdentityService._request_cache()
+        if request_cache:
+            request_cache.clear()
+
+    @staticmethod
+    def team_ids(user_id):
+        """All team IDs the user owns or belongs to"""
+        identity = IdentityService.get_identity(user_id)
+        if not identity:
+            return []
+
+        team_ids = list(identity['owned_team_ids'][:1])
+        for membership in identity['memberships']:
+            if membership['team_id'] not in team_ids:
+                team_ids.append(membership['team_id'])
+        return team_ids
+
+    @staticmethod
+    def primary_team_id(user_id):
+        """The user's first team membership (the team most routes act on)"""
+        identity = IdentityService.get_identity(user_id)
+        if not identity or not identity['memberships']:
+            return None
+        return identity['memberships'][0]['team_id']
+
+    @staticmethod
+    def home_team_id(user_id):
+        """The team the user owns, falling back to their first membership"""
+        identity = IdentityService.get_identity(user_id)
+        if not identity:
+            return None
+        if identity['owned_team_ids']:
+            return identity['owned_team_ids'][0]
+        return IdentityService.primary_team_id(user_id)
+
+    @staticmethod
+    def get_role(user_id, team_id):
+        """The user's role in a team, or None if they are not a member"""
+        identity = IdentityService.get_identity(user_id)
+        if not identity:
+            return None
+        for membership in identity['memberships']:
+            if membership['team_id'] == team_id:
+                return membership['role']
+        return None
+
+    @staticmethod
+    def is_owner(user_id, team_id):
+        """Whether the user owns the team"""
+        identity = IdentityService.get_identity(user_id)
+        return bool(identity) and team_id in identity['owned_team_ids']
+
+    @staticmethod
+    def is_member(user_id, team_id):
+        """Whether the user has a membership row in the team"""
+        return IdentityService.get_role(user_id, team_id) is not None
+
+    @staticmethod
+    def _affected_user_ids(session):
+        """Users whose cached identity is changed by the pending flush"""
+        user_ids = set()
+
+        for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+            if isinstance(obj, User):
+                user_ids.add(obj.id)
+            elif isinstance(obj, TeamMember):
+                user_ids.add(obj.user_id)
+                history = inspect(obj).attrs.user_id.history
+                user_ids.update(history.deleted or ())
+            elif isinstance(obj, Team):
+                user_ids.add(obj.owner_id)
+                history = inspect(obj).attrs.owner_id.history
+                user_ids.update(history.deleted or ())
+
+        return user_ids
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        user_ids = IdentityService._affected_user_ids(session)
+        user_ids.discard(None)
+        if user_ids:
+            # Commits or rolls back with the change; updated_at is kept, as the user row itself may not have changed
+            users = User.__table__
+            session.connection().execute(
+                update(users).where(users.c.id.in_(user_ids)).values(
+                    identity_version=users.c.identity_version + 1,
+                    updated_at=users.c.updated_at
+                )
+            )
+            IdentityService.invalidate(*user_ids)
+            session.info.setdefault('identity_invalidations', set()).update(user_ids)
+
+    @staticmethod
+    def _after_commit(session):
+        # Drop local entries again so nothing cached between flush and commit is served without a check
+        user_ids = session.info.pop('identity_invalidations', None)
+        if user_ids:
+            IdentityService.invalidate(*user_ids)
+
+    @staticmethod
+    def _after_rollback(session, previous_transaction):
+        user_ids = session.info.pop('identity_invalidations', None)
+        if user_ids:
+            IdentityService.invalidate(*user_ids)
+
+    @staticmethod
+    def register_session_hooks():
+        """Invalidate cached identities whenever users, memberships or teams change"""
+        hooks = (
+            ('after_flush', IdentityService._after_flush),
+            ('after_commit', IdentityService._after_commit),
+            ('after_soft_rollback', IdentityService._after_rollback)
+        )
+        for name, hook in hooks:
+            if not event.contains(db.session, name, hook):
+                event.listen(db.session, name, hook)
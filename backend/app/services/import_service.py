@@ -0,0 +1,536 @@
+from flask import current_app
+from app import db
+from app.models.import_job import ImportJob, ImportItem
+from app.models.analysis import CallAnalysis
+from app.models.template import ReportTemplate
+from app.services.identity_service import IdentityService
+from app.services.template_revision_service import TemplateRevisionService
+from sqlalchemy import update
+from werkzeug.datastructures import FileStorage
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+
+
+class _FairQueue:
+    """Per-team FIFO queues served round-robin, with a cap on each team's running items"""
+
+    def __init__(self, team_limit):
+        self.team_limit = max(team_limit, 1)
+        self._queues = OrderedDict()
+        self._running = defaultdict(int)
+        self._cond = threading.Condition()
+
+    def put(self, team_id, item_ids):
+        with self._cond:
+            self._queues.setdefault(team_id, deque()).extend(item_ids)
+            self._cond.notify_all()
+
+    def get(self):
+        """Next (team_id, item_id), waiting until some team is below its cap"""
+        with self._cond:
+            while True:
+                for team_id in list(self._queues):
+                    if self._running[team_id] >= self.team_limit:
+                        continue
+                    queue = self._queues.pop(team_id)
+                    item_id = queue.popleft()
+                    if queue:
+                        # Back of the line, so the other teams go first next time
+                        self._queues[team_id] = queue
+                    self._running[team_id] += 1
+                    return team_id, item_id
+                self._cond.wait()
+
+    def done(self, team_id):
+        with self._cond:
+            self._running[team_id] -= 1
+            if self._running[team_id] <= 0:
+                del self._running[team_id]
+            self._cond.notify_all()
+
+    def idle(self):
+        with self._cond:
+            return not self._queues and not self._running
+
+
+class ImportService:
+    """Bulk import of transcripts and audio as draft reports
+
+    An upload is read as a stream and turned into analyses and import
+    items one batch at a time; each batch is handed to the worker pool as
+    soon as it commits, so LLM calls start before the upload is fully
+    read. The pool runs at most IMPORT_WORKERS items per process and at
+    most IMPORT_TEAM_CONCURRENCY for any one team, serving teams with
+    waiting items in turn so one large import can't hold up the rest.
+    The queue lives in memory; `flask imports resume` requeues what a
+    restarted process left behind.
+    """
+    SOURCE_TYPES = ('ndjson', 'zip')
+    TEXT_EXTENSIONS = ('txt', 'md')
+    MANIFEST_NAME = 'manifest.ndjson'
+    MAX_TEXT_BYTES = 5 * 1024 * 1024
+    MAX_AUDIO_BYTES = 500 * 1024 * 1024
+    FAILURES_LIMIT = 100
+
+    _lock = threading.Lock()
+    _queue = None
+    _workers = []
+
+    @staticmethod
+    def _template(template_id, user_id):
+        """Active template the user created or that is shared with one of their teams"""
+        template = db.session.get(ReportTemplate, template_id) if template_id else None
+        if not template or not template.is_active:
+            raise ValueError("Template not found")
+        if template.created_by != user_id and not (
+            template.shared_with_team and template.team_id in IdentityService.team_ids(user_id)
+        ):
+            raise ValueError("Template not found")
+        return template
+
+    @staticmethod
+    def create_job(user_id, template_id, source_type):
+        """Validate an import and create its job row"""
+        from app.services.template_service import TemplateService
+
+        if source_type not in ImportService.SOURCE_TYPES:
+            raise ValueError("Upload must be NDJSON or a zip archive")
+
+        template = ImportService._template(template_id, user_id)
+        job = ImportJob(
+            team_id=TemplateService.get_or_create_team_id(user_id),
+            user_id=user_id,
+            template_id=template.id,
+            template_revision_id=template.current_revision_id,
+            source_type=source_type,
+            status='receiving'
+        )
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def get_job(job_id, user_id, failures_limit=None):
+        """Progress of an import plus its failed items
+
+        Visible to the user who started it and to the team owner.
+        """
+        job = db.session.get(ImportJob, job_id)
+        if not job or (job.user_id != user_id and not IdentityService.is_owner(user_id, job.team_id)):
+            raise ValueError("Import not found")
+
+        limit = min(failures_limit or ImportService.FAILURES_LIMIT, ImportService.FAILURES_LIMIT)
+        failures = ImportItem.query.filter(
+            ImportItem.job_id == job.id,
+            ImportItem.status == 'failed'
+        ).order_by(ImportItem.position).limit(limit).all()
+
+        result = job.to_dict()
+        result['failures'] = [item.to_dict() for item in failures]
+        return result
+
+    @staticmethod
+    def _spec_entry(position, spec, archive):
+        """(position, source_name, title, kind, payload, error) for one manifest or NDJSON line"""
+        if not isinstance(spec, dict):
+            return position, None, None, None, None, "Each line must be a JSON object"
+
+        source_name = spec.get('id') or spec.get('name') or spec.get('audio') or spec.get('text_file')
+        source_name = str(source_name)[:255] if source_name is not None else None
+        title = str(spec['title'])[:255] if spec.get('title') else None
+
+        text = spec.get('text', spec.get('transcript'))
+        if text is not None:
+            if not isinstance(text, str) or not text.strip():
+                return position, source_name, title, None, None, "Text is empty"
+            return position, source_name, title, 'text', text, None
+
+        member = spec.get('audio') or spec.get('text_file')
+        if not member:
+            return position, source_name, title, None, None, "Line needs 'text', 'audio' or 'text_file'"
+        if archive is None:
+            return position, source_name, title, None, None, "'audio' and 'text_file' need a zip upload"
+        try:
+            info = archive.getinfo(str(member))
+        except KeyError:
+            return position, source_name, title, None, None, f"{member} is not in the archive"
+
+        kind = 'audio' if spec.get('audio') else 'text'
+        return ImportService._member_entry(position, archive, info, source_name, title, kind)
+
+    @staticmethod
+    def _member_entry(position, archive, info, source_name, title, kind):
+        """Entry for a file inside the archive; audio is only checked here and saved with its batch"""
+        if kind == 'text':
+            if info.file_size > ImportService.MAX_TEXT_BYTES:
+                return position, source_name, title, None, None, "Text file is too large"
+            text = archive.read(info).decode('utf-8-sig', errors='replace')
+            if not text.strip():
+                return position, source_name, title, None, None, "Text is empty"
+            return position, source_name, title, 'text', text, None
+
+        if info.file_size > ImportService.MAX_AUDIO_BYTES:
+            return position, source_name, title, None, None, "Audio file exceeds 500MB limit"
+        return position, source_name, title, 'audio', info, None
+
+    @staticmethod
+    def _ndjson_entries(stream, archive=None):
+        for position, raw in enumerate(stream, start=1):
+            if not raw.strip():
+                continue
+            try:
+                spec = json.loads(raw)
+            except ValueError as e:
+                yield position, None, None, None, None, f"Invalid JSON: {e}"
+                continue
+            yield ImportService._spec_entry(position, spec, archive)
+
+    @staticmethod
+    def _zip_entries(archive):
+        """Entries of a zip: its manifest.ndjson if it has one, otherwise every text and audio file"""
+        from app.services.audio_service import AudioService
+
+        if ImportService.MANIFEST_NAME in archive.namelist():
+            with archive.open(ImportService.MANIFEST_NAME) as manifest:
+                yield from ImportService._ndjson_entries(manifest, archive)
+            return
+
+        position = 0
+        for info in archive.infolist():
+            name = info.filename
+            base = os.path.basename(name)
+            if info.is_dir() or not base or base.startswith('.') or name.startswith('__MACOSX/'):
+                continue
+
+            position += 1
+            title = os.path.splitext(base)[0][:255]
+            extension = base.rsplit('.', 1)[-1].lower() if '.' in base else ''
+            if extension in ImportService.TEXT_EXTENSIONS:
+                yield ImportService._member_entry(position, archive, info, name[:255], title, 'text')
+            elif AudioService.allowed_file(base):
+                yield ImportService._member_entry(position, archive, info, name[:255], title, 'audio')
+            else:
+                yield position, name[:255], title, None, None, "Unsupported file type"
+
+    @staticmethod
+    def _save_audio(archive, info, user_id):
+        from app.services.audio_service import AudioService
+
+        with archive.open(info) as member:
+            return AudioService.save_audio_file(
+                FileStorage(stream=member, filename=os.path.basename(info.filename)),
+                user_id
+            )
+
+    @staticmethod
+    def _create_batch(job, batch, archive):
+        """Create the analyses and items of a batch in one transaction
+
+        Returns:
+            list: IDs of the items ready for analysis
+        """
+        analyses = []
+        items = []
+        failed = 0
+        for position, source_name, title, kind, payload, error in batch:
+            item = ImportItem(
+                job_id=job.id,
+                team_id=job.team_id,
+                position=position,
+                source_name=source_name,
+                title=title
+            )
+
+            analysis = None
+            if not error and kind == 'audio':
+                try:
+                    file_path, duration = ImportService._save_audio(archive, payload, job.user_id)
+                    analysis = CallAnalysis(input_type='audio', audio_file_path=file_path, audio_duration=duration)
+                except Exception as e:
+                    error = str(e) or 'Failed to read audio file'
+            elif not error:
+                analysis = CallAnalysis(input_type='text', input_text=payload, transcription=payload)
+
+            if analysis is None:
+                item.status = 'failed'
+                item.error = error[:500]
+                failed += 1
+            else:
+                analysis.user_id = job.user_id
+                analysis.team_id = job.team_id
+                analysis.template_id = job.template_id
+                analysis.template_revision_id = job.template_revision_id
+                analyses.append((item, analysis))
+            items.append(item)
+
+        db.session.add_all([analysis for item, analysis in analyses])
+        db.session.flush()
+        for item, analysis in analyses:
+            item.analysis_id = analysis.id
+        db.session.add_all(items)
+
+        # Counters are shared with the workers, so they are only ever incremented in SQL
+        db.session.execute(update(ImportJob).where(ImportJob.id == job.id).values(
+            total_items=ImportJob.total_items + len(items),
+            failed_items=ImportJob.failed_items + failed
+        ))
+        db.session.commit()
+
+        return [item.id for item, analysis in analyses]
+
+    @staticmethod
+    def ingest(job, stream):
+        """Read an upload into the job, scheduling analysis work batch by batch
+
+        Lines or files that can't be used become failed items; the import
+        only fails as a whole if nothing at all could be read.
+        """
+        job_id = job.id
+        team_id = job.team_id
+        batch_size = max(current_app.config['IMPORT_BATCH_SIZE'], 1)
+        max_items = current_app.config['IMPORT_MAX_ITEMS']
+
+        spool = None
+        archive = None
+        count = 0
+        error = None
+        try:
+            if job.source_type == 'zip':
+                if not stream.seekable():
+                    spool = tempfile.TemporaryFile()
+                    shutil.copyfileobj(stream, spool)
+                    spool.seek(0)
+                    stream = spool
+                archive = zipfile.ZipFile(stream)
+                entries = ImportService._zip_entries(archive)
+            else:
+                entries = ImportService._ndjson_entries(stream)
+
+            batch = []
+            for entry in entries:
+                if count >= max_items:
+                    error = f"Only the first {max_items} items were imported"
+                    break
+                batch.append(entry)
+                count += 1
+                if len(batch) >= batch_size:
+                    ImportService.schedule(team_id, ImportService._create_batch(job, batch, archive))
+                    batch = []
+            if batch:
+                ImportService.schedule(team_id, ImportService._create_batch(job, batch, archive))
+
+        except zipfile.BadZipFile:
+            db.session.rollback()
+            error = "Upload is not a valid zip archive"
+        except Exception as e:
+            db.session.rollback()
+            print(f"Import {job_id} upload error: {e}")
+            error = f"Upload stopped after {count} items: {e}"
+        finally:
+            if archive is not None:
+                archive.close()
+            if spool is not None:
+                spool.close()
+
+        job = db.session.get(ImportJob, job_id)
+        if error:
+            job.error = error[:500]
+        if job.total_items == 0:
+            job.status = 'failed'
+            job.error = job.error or "The upload contained no items"
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = 'running'
+        db.session.commit()
+
+        ImportService._complete_if_done(job_id)
+        db.session.refresh(job)
+        return job
+
+    @staticmethod
+    def schedule(team_id, item_ids):
+        """Queue items on this process's worker pool"""
+        if not item_ids:
+            return
+        ImportService._start_workers(current_app._get_current_object())
+        ImportService._queue.put(team_id, item_ids)
+
+    @staticmethod
+    def idle():
+        """True when this process has no queued or running import items"""
+        return ImportService._queue is None or ImportService._queue.idle()
+
+    @staticmethod
+    def _start_workers(app):
+        with ImportService._lock:
+            if ImportService._queue is None:
+                ImportService._queue = _FairQueue(app.config['IMPORT_TEAM_CONCURRENCY'])
+
+            workers = [worker for worker in ImportService._workers if worker.is_alive()]
+            for _ in range(max(app.config['IMPORT_WORKERS'], 1) - len(workers)):
+                worker = threading.Thread(target=ImportService._work, args=(app,), name='import-worker', daemon=True)
+                worker.start()
+                workers.append(worker)
+            ImportService._workers = workers
+
+    @staticmethod
+    def _work(app):
+        queue = ImportService._queue
+        while True:
+            team_id, item_id = queue.get()
+            try:
+                with app.app_context():
+                    try:
+                        ImportService.process_item(item_id)
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Import item {item_id} failed: {e}")
+                        ImportService._finish_item(item_id, error=str(e) or e.__class__.__name__)
+            except Exception as e:
+                print(f"Import worker error on item {item_id}: {e}")
+            finally:
+                queue.done(team_id)
+
+    @staticmethod
+    def process_item(item_id):
+        """Transcribe if needed, analyze, and save the draft report of one item"""
+        from app.services.analysis_service import AnalysisService
+        from app.services.audio_service import AudioService
+        from app.services.transcription_service import TranscriptionService
+        from app.services.report_service import ReportService
+
+        # Claim the item so a resumed job never runs it twice at once
+        claimed = db.session.execute(
+            update(ImportItem).where(
+                ImportItem.id == item_id,
+                ImportItem.status == 'pending'
+            ).values(status='running', attempts=ImportItem.attempts + 1)
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return
+
+        item = db.session.get(ImportItem, item_id)
+        analysis = db.session.get(CallAnalysis, item.analysis_id) if item.analysis_id else None
+        if not analysis:
+            raise ValueError("Analysis not found")
+        template = db.session.get(ReportTemplate, analysis.template_id)
+        if not template:
+            raise ValueError("Template not found")
+
+        transcription = analysis.transcription
+        if not transcription:
+            if analysis.input_type != 'audio' or not analysis.audio_file_path:
+                raise ValueError("Nothing to analyze")
+            transcription = TranscriptionService.transcribe_audio(
+                AudioService.get_absolute_path(analysis.audio_file_path)
+            )
+            if not transcription:
+                raise ValueError("Failed to transcribe audio")
+            analysis.transcription = transcription
+            db.session.commit()
+
+        revision_id = analysis.template_revision_id or template.current_revision_id
+        analysis_result = AnalysisService.analyze_transcription(transcription, template, revision_id)
+
+        generated = {
+            f['field_name']: f['value']
+            for f in analysis_result.get('fields', [])
+            if isinstance(f, dict) and 'field_name' in f and 'value' in f
+        }
+        field_values = []
+        for field in TemplateRevisionService.get_fields(revision_id):
+            value = generated.get(field['field_name'])
+            # Handle "Not mentioned" as empty
+            if value == "Not mentioned" or value is None:
+                value = ''
+            field_values.append({'field_id': field['id'], 'value': value})
+
+        title = item.title or f"Imported {item.source_name or f'item {item.position}'}"
+        report = ReportService.create_draft_report(
+            analysis_id=analysis.id,
+            user_id=analysis.user_id,
+            team_id=analysis.team_id,
+            title=title[:255],
+            summary=analysis_result.get('summary', ''),
+            field_values=field_values,
+            custom_fields=[]
+        )
+
+        ImportService._finish_item(item_id, report_id=report.id)
+
+    @staticmethod
+    def _finish_item(item_id, report_id=None, error=None):
+        """Record an item's outcome and count it on its job exactly once"""
+        job_id = db.session.query(ImportItem.job_id).filter(ImportItem.id == item_id).scalar()
+        if job_id is None:
+            return
+
+        finished = db.session.execute(
+            update(ImportItem).where(
+                ImportItem.id == item_id,
+                ImportItem.status == 'running'
+            ).values(
+                status='failed' if error else 'succeeded',
+                report_id=report_id,
+                error=error[:500] if error else None
+            )
+        ).rowcount
+        if finished:
+            counter = ImportJob.failed_items if error else ImportJob.succeeded_items
+            db.session.execute(update(ImportJob).where(ImportJob.id == job_id).values({counter: counter + 1}))
+        db.session.commit()
+
+        ImportService._complete_if_done(job_id)
+
+    @staticmethod
+    def _complete_if_done(job_id):
+        db.session.execute(update(ImportJob).where(
+            ImportJob.id == job_id,
+            ImportJob.status == 'running',
+            ImportJob.succeeded_items + ImportJob.failed_items >= ImportJob.total_items
+        ).values(status='completed', finished_at=datetime.utcnow()))
+        db.session.commit()
+
+    @staticmethod
+    def resume(job_id=None):
+        """Requeue unfinished items of running imports on this process
+
+        Items left 'running' by a process that stopped are reset first, so
+        only run this when no other process is working on the same imports.
+
+        Returns:
+            int: Number of items queued
+        """
+        jobs = ImportJob.query.filter(ImportJob.status.in_(('receiving', 'running')))
+        if job_id:
+            jobs = jobs.filter(ImportJob.id == job_id)
+
+        queued = 0
+        for job in jobs.all():
+            db.session.execute(update(ImportItem).where(
+                ImportItem.job_id == job.id,
+                ImportItem.status == 'running'
+            ).values(status='pending'))
+            if job.status == 'receiving':
+                # The upload was cut off; keep whatever made it in
+                job.status = 'running'
+                job.error = job.error or "Upload was interrupted"
+            db.session.commit()
+
+            item_ids = [row[0] for row in db.session.query(ImportItem.id).filter(
+                ImportItem.job_id == job.id,
+                ImportItem.status == 'pending'
+            ).order_by(ImportItem.position)]
+            ImportService.schedule(job.team_id, item_ids)
+            queued += len(item_ids)
+
+            ImportService._complete_if_done(job.id)
+
+        return queued
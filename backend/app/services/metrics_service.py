@@ -0,0 +1,242 @@
+from app import db
+from app.db_routing import use_primary
+from app.models.metrics import TeamMetrics
+from app.models.analysis import CallAnalysis
+from app.models.report import Report
+from app.models.template import ReportTemplate
+from app.models.team import Team, TeamMember
+from sqlalchemy import event, func, select, inspect, update, insert
+from collections import defaultdict
+from datetime import datetime
+
+
+class MetricsService:
+    # Counter columns maintained on team_metrics
+    COUNTERS = (
+        'audio_seconds',
+        'analysis_count',
+        'template_count',
+        'member_count',
+        'draft_count',
+        'report_count'
+    )
+
+    @staticmethod
+    def _source_counts_statement(team_id):
+        """Single SELECT computing every counter for a team from the source tables"""
+        def scalar(query):
+            return query.scalar_subquery()
+
+        return select(
+            scalar(select(func.coalesce(func.sum(CallAnalysis.audio_duration), 0)).where(CallAnalysis.team_id == team_id)).label('audio_seconds'),
+            scalar(select(func.count(CallAnalysis.id)).where(CallAnalysis.team_id == team_id)).label('analysis_count'),
+            scalar(select(func.count(ReportTemplate.id)).where(
+                ReportTemplate.team_id == team_id,
+                ReportTemplate.is_active.is_(True)
+            )).label('template_count'),
+            scalar(select(func.count(TeamMember.id)).where(TeamMember.team_id == team_id)).label('member_count'),
+            scalar(select(func.count(Report.id)).where(Report.team_id == team_id, Report.status == 'draft')).label('draft_count'),
+            scalar(select(func.count(Report.id)).where(Report.team_id == team_id, Report.status == 'finalized')).label('report_count')
+        )
+
+    @staticmethod
+    def compute_from_source(team_id, connection=None):
+        """Recompute all counters for a team from the source tables"""
+        executor = connection if connection is not None else db.session
+        row = executor.execute(MetricsService._source_counts_statement(team_id)).mappings().one()
+        return {name: int(row[name] or 0) for name in MetricsService.COUNTERS}
+
+    @staticmethod
+    def _create_statement(dialect, deltas, table=None, key_columns=('team_id',), **set_values):
+        """INSERT of a new counters row that adds the deltas instead if the row already exists
+
+        A concurrent writer may create the row between our UPDATE and INSERT;
+        its counts were read without our uncommitted change, so ours is
+        applied on top. Also used for the daily rollup tables, keyed on
+        key_columns; set_values are written on either path.
+        """
+        table = table if table is not None else TeamMetrics.__table__
+        on_existing = {name: table.c[name] + value for name, value in deltas.items()}
+        on_existing.update(set_values)
+
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+            return mysql_insert(table).on_duplicate_key_update(**on_existing)
+
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            return dialect_insert(table).on_conflict_do_update(index_elements=list(key_columns), set_=on_existing)
+
+        return insert(table)
+
+    @staticmethod
+    def apply_deltas(team_id, connection=None, **deltas):
+        """Atomically add deltas to a team's counters
+
+        Runs on the caller's connection so the counters commit or roll back
+        with the change they describe. If the team has no counters row yet,
+        one is created from source, which already includes this change.
+        """
+        deltas = {name: value for name, value in deltas.items() if value}
+        if not team_id or not deltas:
+            return
+
+        executor = connection if connection is not None else db.session
+        table = TeamMetrics.__table__
+        now = datetime.utcnow()
+
+        values = {name: table.c[name] + value for name, value in deltas.items()}
+        values['updated_at'] = now
+        result = executor.execute(
+            update(table).where(table.c.team_id == team_id).values(**values)
+        )
+
+        if result.rowcount == 0:
+            counts = MetricsService.compute_from_source(team_id, connection=connection)
+            dialect = (connection if connection is not None else db.session.get_bind()).dialect.name
+            executor.execute(
+                MetricsService._create_statement(dialect, deltas, updated_at=now).values(
+                    team_id=team_id, updated_at=now, reconciled_at=now, **counts
+                )
+            )
+
+    @staticmethod
+    def get_team_metrics(team_id):
+        """Read the counters row for a team, creating it from source if missing"""
+        metrics = db.session.get(TeamMetrics, team_id)
+        if metrics:
+            return metrics
+
+        # A replica may lag behind a row that already exists on the primary
+        with use_primary():
+            return MetricsService.reconcile_team(team_id)
+
+    @staticmethod
+    def reconcile_team(team_id):
+        """Overwrite a team's counters with values recomputed from source"""
+        counts = MetricsService.compute_from_source(team_id)
+
+        metrics = db.session.get(TeamMetrics, team_id)
+        if not metrics:
+            metrics = TeamMetrics(team_id=team_id)
+            db.session.add(metrics)
+
+        drift = {
+            name: counts[name] - (getattr(metrics, name) or 0)
+            for name in MetricsService.COUNTERS
+            if counts[name] != (getattr(metrics, name) or 0)
+        }
+
+        for name, value in counts.items():
+            setattr(metrics, name, value)
+        metrics.reconciled_at = datetime.utcnow()
+
+        db.session.commit()
+
+        if drift:
+            print(f"Reconciled metrics for team {team_id}, drift: {drift}")
+
+        return metrics
+
+    @staticmethod
+    def reconcile_all(team_id=None):
+        """Reconcile counters for every team (or one team)
+
+        Returns:
+            int: Number of teams reconciled
+        """
+        if team_id:
+            team_ids = [team_id]
+        else:
+            team_ids = [row[0] for row in db.session.query(Team.id).order_by(Team.id).all()]
+
+        for tid in team_ids:
+            MetricsService.reconcile_team(tid)
+
+        return len(team_ids)
+
+    @staticmethod
+    def _committed_value(obj, attribute):
+        """Value of an attribute as loaded from the database, before pending changes"""
+        history = inspect(obj).attrs[attribute].history
+        if history.deleted:
+            return history.deleted[0]
+        if history.unchanged:
+            return history.unchanged[0]
+        return getattr(obj, attribute)
+
+    @staticmethod
+    def _collect_deltas(session):
+        """Work out counter deltas per team from the objects about to be flushed"""
+        deltas = defaultdict(lambda: defaultdict(int))
+
+        for obj in session.new:
+            if isinstance(obj, CallAnalysis):
+                deltas[obj.team_id]['analysis_count'] += 1
+                deltas[obj.team_id]['audio_seconds'] += obj.audio_duration or 0
+            elif isinstance(obj, Report):
+                counter = 'report_count' if obj.status == 'finalized' else 'draft_count'
+                deltas[obj.team_id][counter] += 1
+            elif isinstance(obj, ReportTemplate):
+                if obj.is_active is not False:
+                    deltas[obj.team_id]['template_count'] += 1
+            elif isinstance(obj, TeamMember):
+                deltas[obj.team_id]['member_count'] += 1
+
+        for obj in session.deleted:
+            if isinstance(obj, CallAnalysis):
+                deltas[obj.team_id]['analysis_count'] -= 1
+                deltas[obj.team_id]['audio_seconds'] -= MetricsService._committed_value(obj, 'audio_duration') or 0
+            elif isinstance(obj, Report):
+                status = MetricsService._committed_value(obj, 'status')
+                counter = 'report_count' if status == 'finalized' else 'draft_count'
+                deltas[obj.team_id][counter] -= 1
+            elif isinstance(obj, ReportTemplate):
+                if MetricsService._committed_value(obj, 'is_active') is not False:
+                    deltas[obj.team_id]['template_count'] -= 1
+            elif isinstance(obj, TeamMember):
+                deltas[obj.team_id]['member_count'] -= 1
+
+        for obj in session.dirty:
+            if isinstance(obj, CallAnalysis):
+                history = inspect(obj).attrs.audio_duration.history
+                if history.has_changes():
+                    old = history.deleted[0] if history.deleted else 0
+                    deltas[obj.team_id]['audio_seconds'] += (obj.audio_duration or 0) - (old or 0)
+            elif isinstance(obj, Report):
+                history = inspect(obj).attrs.status.history
+                if history.has_changes() and history.deleted:
+                    old_counter = 'report_count' if history.deleted[0] == 'finalized' else 'draft_count'
+                    new_counter = 'report_count' if obj.status == 'finalized' else 'draft_count'
+                    if old_counter != new_counter:
+                        deltas[obj.team_id][old_counter] -= 1
+                        deltas[obj.team_id][new_counter] += 1
+            elif isinstance(obj, ReportTemplate):
+                history = inspect(obj).attrs.is_active.history
+                if history.has_changes() and history.deleted:
+                    was_active = history.deleted[0] is not False
+                    is_active = obj.is_active is not False
+                    if was_active != is_active:
+                        deltas[obj.team_id]['template_count'] += 1 if is_active else -1
+
+        return deltas
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        """Apply counter deltas for the flushed changes in the same transaction"""
+        deltas = MetricsService._collect_deltas(session)
+        if not deltas:
+            return
+
+        connection = session.connection()
+        for team_id, team_deltas in deltas.items():
+            MetricsService.apply_deltas(team_id, connection=connection, **team_deltas)
+
+    @staticmethod
+    def register_session_hooks():
+        """Keep team_metrics in sync with every ORM flush"""
+        if not event.contains(db.session, 'after_flush', MetricsService._after_flush):
+            event.listen(db.session, 'after_flush', MetricsService._after_flush)
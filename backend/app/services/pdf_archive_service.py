@@ -0,0 +1,193 @@
+from concurrent.futures import wait, FIRST_COMPLETED
+from flask import current_app
+from app.models.report import Report
+from app.services.export_service import ExportService, _ChunkBuffer
+from app.services.pdf_service import PDFService
+from app.services.pdf_render_service import PDFRenderService
+from datetime import datetime
+import time
+import zipfile
+
+
+class PDFArchiveService:
+    """ZIP archives of many report PDFs, streamed as the renders finish
+
+    Cached renders go into the archive first. The rest are rendered in the
+    PDF render pool, keeping up to PDF_BATCH_CONCURRENCY of them in flight
+    (fewer if other requests fill the shared queue), and each is added as
+    soon as it is done. PDFs are copied into the archive in chunks, so
+    neither the archive nor a whole PDF is held in memory. A report that
+    fails to render is listed in errors.txt at the end of the archive
+    instead of aborting the download.
+    """
+    COPY_CHUNK = 64 * 1024
+    # How long to back off when other requests hold the whole render queue
+    QUEUE_POLL_SECONDS = 0.2
+
+    @staticmethod
+    def prepare(team_id, user_id, report_ids=None, template_id=None, status=None, start_day=None, end_day=None):
+        """
+        Resolve the reports of an archive before any bytes are sent
+
+        Args:
+            team_id: Team ID
+            user_id: Requesting user; plain members only get their own reports
+            report_ids: Explicit report IDs, or None to use the filters
+            template_id, status, start_day, end_day: Filters, as for exports
+
+        Returns:
+            dict: Plan for stream()
+
+        Raises:
+            ValueError: If the selection is empty, invalid or too large
+        """
+        if status and status not in ExportService.STATUSES:
+            raise ValueError(f"Invalid status: {status}")
+
+        conditions = ExportService._conditions(
+            team_id,
+            user_id=user_id,
+            template_id=template_id,
+            status=status,
+            start_day=start_day,
+            end_day=end_day
+        )
+
+        missing = []
+        if report_ids is not None:
+            try:
+                report_ids = list(dict.fromkeys(int(report_id) for report_id in report_ids))
+            except (TypeError, ValueError):
+                raise ValueError("Report IDs must be integers")
+            conditions.append(Report.id.in_(report_ids))
+
+        limit = current_app.config['PDF_BATCH_MAX_REPORTS']
+        reports = Report.query.filter(*conditions).order_by(Report.created_at, Report.id).limit(limit + 1).all()
+        if len(reports) > limit:
+            raise ValueError(f"An archive can hold at most {limit} reports; narrow the selection")
+
+        if report_ids is not None:
+            found = {report.id for report in reports}
+            missing = [report_id for report_id in report_ids if report_id not in found]
+        if not reports:
+            raise ValueError("No reports match")
+
+        return {
+            'team_id': team_id,
+            'reports': reports,
+            'missing': missing,
+            'filename': f"reports_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"
+        }
+
+    @staticmethod
+    def _entry_name(report, used):
+        """Unique archive name for a report's PDF"""
+        title = report.title or ''
+        safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip()
+        name = f"{safe_title}_{report.id}.pdf" if safe_title else f"report_{report.id}.pdf"
+        while name in used:
+            name = f"_{name}"
+        used.add(name)
+        return name
+
+    @staticmethod
+    def _write_pdf(archive, output, name, path):
+        """Copy a PDF into the archive, yielding archive chunks as they fill up"""
+        with open(path, 'rb') as source, archive.open(name, 'w', force_zip64=True) as entry:
+            while True:
+                data = source.read(PDFArchiveService.COPY_CHUNK)
+                if not data:
+                    break
+                entry.write(data)
+                chunk = output.drain()
+                if chunk:
+                    yield chunk
+
+    @staticmethod
+    def _rendered(plan, load_report_data, errors):
+        """
+        Yield (report, path) for every report in the plan as its PDF becomes available
+
+        Args:
+            plan: Plan from prepare()
+            load_report_data: Callable taking a Report and returning its data dict
+            errors: List collecting (report, message) for failed renders
+        """
+        waiting = []
+        for report in plan['reports']:
+            path = PDFService.cached_path(report)
+            if path:
+                yield report, path
+            else:
+                waiting.append(report)
+
+        if not current_app.config['PDF_RENDER_WORKERS']:
+            for report in waiting:
+                try:
+                    path = PDFService.get_report_pdf(report, lambda: load_report_data(report))
+                except Exception as e:
+                    errors.append((report, str(e)))
+                    continue
+                yield report, path
+            return
+
+        concurrency = max(current_app.config['PDF_BATCH_CONCURRENCY'], 1)
+        in_flight = {}  # Future -> Report
+        waiting.reverse()
+        while waiting or in_flight:
+            while waiting and len(in_flight) < concurrency:
+                report = waiting[-1]
+                try:
+                    future = PDFRenderService.submit(report, lambda: load_report_data(report))
+                except Exception as e:
+                    waiting.pop()
+                    errors.append((report, str(e)))
+                    continue
+                if future is None:
+                    # The shared queue is full; make room by finishing our own renders first
+                    break
+                waiting.pop()
+                in_flight[future] = report
+
+            if not in_flight:
+                time.sleep(PDFArchiveService.QUEUE_POLL_SECONDS)
+                continue
+
+            done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            for future in done:
+                report = in_flight.pop(future)
+                try:
+                    path = future.result()
+                except Exception as e:
+                    errors.append((report, str(e)))
+                    continue
+                yield report, path
+
+    @staticmethod
+    def stream(plan, load_report_data):
+        """
+        Generator of ZIP archive chunks for a plan from prepare()
+
+        Args:
+            plan: Plan from prepare()
+            load_report_data: Callable taking a Report and returning its data
+                dict; called on cache misses only
+        """
+        output = _ChunkBuffer()
+        errors = []
+        used = set()
+        # PDFs are already compressed; storing them keeps the request thread off deflate
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for report, path in PDFArchiveService._rendered(plan, load_report_data, errors):
+                try:
+                    yield from PDFArchiveService._write_pdf(archive, output, PDFArchiveService._entry_name(report, used), path)
+                except FileNotFoundError:
+                    # Retention or an edit removed the render between finishing and copying
+                    errors.append((report, 'Rendered PDF was removed before it could be added'))
+
+            if errors or plan['missing']:
+                lines = [f"Report {report.id} ({report.title or 'untitled'}): {message}" for report, message in errors]
+                lines += [f"Report {report_id}: not found or not accessible" for report_id in plan['missing']]
+                archive.writestr('errors.txt', '\n'.join(lines) + '\n')
+
+        yield output.drain()
@@ -0,0 +1,265 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from app.models.report import Report
+from app.services.pdf_service import PDFService
+import multiprocessing
+import threading
+import time
+
+
+def _render(report_data, folder, filename):
+    """Worker process entry point"""
+    return PDFService.render_to_cache(report_data, folder, filename)
+
+
+def _render_bytes(report_data):
+    """Worker process entry point for in-memory renders"""
+    return PDFService.render_bytes(report_data)
+
+
+class PDFRenderService:
+    """Renders report PDFs in a process pool, off the request threads
+
+    ReportLab layout is CPU-bound and holds the GIL, so renders run in
+    PDF_RENDER_WORKERS worker processes while the request thread only
+    loads the report data. Each web process keeps at most
+    PDF_RENDER_QUEUE_SIZE renders queued or running; a report revision is
+    rendered once, with every caller sharing its future. Callers wait up
+    to PDF_RENDER_WAIT_SECONDS and otherwise tell the client to come back.
+    PDF_RENDER_WORKERS=0 renders in the calling thread instead. With
+    PDF_DOWNLOAD_IN_MEMORY, downloads are rendered to bytes in the same
+    pool and never touch the cache folder; a finished one is kept for
+    UNCOLLECTED_SECONDS so a client retrying after a 202 gets its bytes.
+    """
+    # How long a finished in-memory render waits for a retry, and how many may wait at once
+    UNCOLLECTED_SECONDS = 60
+    MAX_UNCOLLECTED = 16
+
+    _lock = threading.Lock()
+    _executor = None
+    _pending = {}  # cache filename (prefixed 'memory:' for in-memory renders) -> Future
+    _uncollected = {}  # 'memory:' key -> (expires_at, Future) of finished in-memory renders
+
+    @staticmethod
+    def _pool():
+        if PDFRenderService._executor is None:
+            PDFRenderService._executor = ProcessPoolExecutor(
+                max_workers=current_app.config['PDF_RENDER_WORKERS'],
+                # Forking a threaded server can hand the child locks held by other threads
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return PDFRenderService._executor
+
+    @staticmethod
+    def _reset_pool():
+        """Drop a pool whose worker died; the next submit starts a fresh one"""
+        with PDFRenderService._lock:
+            executor = PDFRenderService._executor
+            PDFRenderService._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _forget(filename, future, keep=False):
+        with PDFRenderService._lock:
+            if PDFRenderService._pending.get(filename) is future:
+                del PDFRenderService._pending[filename]
+            if not keep or future.cancelled() or future.exception() is not None:
+                return
+
+            now = time.monotonic()
+            uncollected = PDFRenderService._uncollected
+            for key in [key for key, (expires_at, _) in uncollected.items() if expires_at <= now]:
+                del uncollected[key]
+            while len(uncollected) >= PDFRenderService.MAX_UNCOLLECTED:
+                del uncollected[min(uncollected, key=lambda key: uncollected[key][0])]
+            uncollected[filename] = (now + PDFRenderService.UNCOLLECTED_SECONDS, future)
+
+    @staticmethod
+    def _collect(key, future=None):
+        """Take a finished in-memory render (or drop the given one once delivered)"""
+        with PDFRenderService._lock:
+            entry = PDFRenderService._uncollected.get(key)
+            if entry is None or (future is not None and entry[1] is not future):
+                return None
+            del PDFRenderService._uncollected[key]
+        return entry[1] if entry[0] > time.monotonic() else None
+
+    @staticmethod
+    def queue_free():
+        """Number of renders that can still be queued"""
+        with PDFRenderService._lock:
+            return max(current_app.config['PDF_RENDER_QUEUE_SIZE'] - len(PDFRenderService._pending), 0)
+
+    @staticmethod
+    def _submit(key, render, load_args, keep=False):
+        """
+        Queue render(*load_args()) under key, sharing the future of an equal render in flight
+
+        With keep, the finished future is held for _collect() instead of dropped.
+        """
+        with PDFRenderService._lock:
+            future = PDFRenderService._pending.get(key)
+        if future is not None:
+            return future
+        if not PDFRenderService.queue_free():
+            return None
+
+        args = load_args()
+
+        with PDFRenderService._lock:
+            future = PDFRenderService._pending.get(key)
+            if future is not None:
+                return future
+            if len(PDFRenderService._pending) >= current_app.config['PDF_RENDER_QUEUE_SIZE']:
+                return None
+            try:
+                future = PDFRenderService._pool().submit(render, *args)
+            except (BrokenProcessPool, RuntimeError):
+                PDFRenderService._executor = None
+                future = PDFRenderService._pool().submit(render, *args)
+            PDFRenderService._pending[key] = future
+
+        # Outside the lock: a future that is already done runs the callback right away
+        future.add_done_callback(lambda done: PDFRenderService._forget(key, done, keep))
+        return future
+
+    @staticmethod
+    def submit(report, load_report_data):
+        """
+        Future for the render of the report's current revision
+
+        Args:
+            report: Report model instance
+            load_report_data: Callable returning the report data dict; called
+                here, since the worker has no database access
+
+        Returns:
+            Future resolving to the cached PDF path, or None if the queue is full
+        """
+        filename = PDFService.cache_filename(report)
+        return PDFRenderService._submit(
+            filename, _render, lambda: (load_report_data(), PDFService._cache_folder(report.id), filename)
+        )
+
+    @staticmethod
+    def get_report_pdf(report, load_report_data, wait=None):
+        """
+        Path of a report's PDF, waiting briefly for a render if it isn't cached
+
+        Args:
+            report: Report model instance
+            load_report_data: Callable returning the report data dict; only
+                called on a cache miss
+            wait: Seconds to wait for the render (default PDF_RENDER_WAIT_SECONDS)
+
+        Returns:
+            str: Path to the cached PDF, or None while it is still being rendered
+        """
+        path = PDFService.cached_path(report)
+        if path:
+            return path
+
+        if not current_app.config['PDF_RENDER_WORKERS']:
+            return PDFService.get_report_pdf(report, load_report_data)
+
+        future = PDFRenderService.submit(report, load_report_data)
+        if future is None:
+            return None
+
+        try:
+            return future.result(timeout=current_app.config['PDF_RENDER_WAIT_SECONDS'] if wait is None else wait)
+        except FutureTimeoutError:
+            return None
+        except BrokenProcessPool:
+            PDFRenderService._reset_pool()
+            raise
+
+    @staticmethod
+    def render_bytes(report, load_report_data, wait=None):
+        """
+        PDF of a report's current revision rendered in memory, bypassing the cache
+
+        Shares the render queue with cached renders; concurrent requests for
+        the same revision share one render.
+
+        Args:
+            report: Report model instance
+            load_report_data: Callable returning the report data dict
+            wait: Seconds to wait for the render (default PDF_RENDER_WAIT_SECONDS)
+
+        Returns:
+            bytes: The PDF document, or None if the queue is full or the
+                render is still running
+        """
+        if not current_app.config['PDF_RENDER_WORKERS']:
+            return PDFService.render_bytes(load_report_data())
+
+        key = f"memory:{PDFService.cache_filename(report)}"
+        # A render that finished after an earlier request stopped waiting
+        finished = PDFRenderService._collect(key)
+        if finished is not None:
+            return finished.result()
+
+        future = PDFRenderService._submit(key, _render_bytes, lambda: (load_report_data(),), keep=True)
+        if future is None:
+            return None
+
+        try:
+            pdf_bytes = future.result(timeout=current_app.config['PDF_RENDER_WAIT_SECONDS'] if wait is None else wait)
+        except FutureTimeoutError:
+            return None
+        except BrokenProcessPool:
+            PDFRenderService._reset_pool()
+            raise
+
+        # Delivered here, so nobody needs to collect it
+        PDFRenderService._collect(key, future)
+        return pdf_bytes
+
+    @staticmethod
+    def status(report):
+        """'ready', 'pending' or 'missing' for the report's current revision"""
+        if PDFService.cached_path(report):
+            return 'ready'
+        with PDFRenderService._lock:
+            future = PDFRenderService._pending.get(PDFService.cache_filename(report))
+        return 'pending' if future is not None and not future.done() else 'missing'
+
+    @staticmethod
+    def prerender(report_ids):
+        """
+        Queue renders of newly finalized reports so the first download is a cache hit
+
+        Best effort: only as many reports as the queue has room for, and
+        errors are logged rather than raised.
+
+        Returns:
+            int: Number of renders queued
+        """
+        if not report_ids or not current_app.config['PDF_RENDER_WORKERS'] or not current_app.config['PDF_PRERENDER']:
+            return 0
+
+        from app.services.report_service import ReportService
+
+        queued = 0
+        try:
+            free = PDFRenderService.queue_free()
+            if not free:
+                return 0
+            for report in Report.query.filter(Report.id.in_(list(report_ids)[:free])):
+                if PDFService.cached_path(report):
+                    continue
+                future = PDFRenderService.submit(report, lambda: ReportService.get_report_by_id(
+                    report_id=report.id,
+                    user_id=report.user_id,
+                    team_id=report.team_id
+                ))
+                if future is None:
+                    break
+                queued += 1
+        except Exception as e:
+            print(f"Error queueing PDF pre-render: {e}")
+
+        return queued
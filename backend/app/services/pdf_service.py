@@ -4,35 +4,105 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
-from datetime import datetime
+from xml.sax.saxutils import escape
+from datetime import datetime, timedelta
+import io
 import os
+import re
+import tempfile
+import jwt
 from flask import current_app
 
 
+# Styles are built once per process and shared by every render
+_SAMPLE_STYLES = getSampleStyleSheet()
+
+_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_SAMPLE_STYLES['Heading1'],
+    fontSize=24,
+    textColor=colors.HexColor('#1a202c'),
+    spaceAfter=30,
+    alignment=TA_CENTER
+)
+
+_HEADING_STYLE = ParagraphStyle(
+    'CustomHeading',
+    parent=_SAMPLE_STYLES['Heading2'],
+    fontSize=16,
+    textColor=colors.HexColor('#2d3748'),
+    spaceAfter=12,
+    spaceBefore=12
+)
+
+_NORMAL_STYLE = ParagraphStyle(
+    'CustomNormal',
+    parent=_SAMPLE_STYLES['Normal'],
+    fontSize=11,
+    textColor=colors.HexColor('#4a5568'),
+    spaceAfter=8
+)
+
+_FOOTER_STYLE = ParagraphStyle(
+    'Footer',
+    parent=_SAMPLE_STYLES['Normal'],
+    fontSize=8,
+    textColor=colors.HexColor('#718096'),
+    alignment=TA_CENTER
+)
+
+_METADATA_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#edf2f7')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2d3748')),
+    ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+    ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cbd5e0'))
+])
+
+_BLANK_LINE = re.compile(r'\n\s*\n')
+
+
 class PDFService:
+    # Bump whenever _build changes what a report looks like, so cached renders are replaced
+    LAYOUT_VERSION = 2
+    CACHE_DIR = 'cache'
+    # Longest run of text laid out as a single Paragraph
+    MAX_PARAGRAPH_CHARS = 1500
+
     @staticmethod
-    def generate_report_pdf(report_data, output_filename=None):
+    def _paragraphs(text, style):
         """
-        Generate a PDF from report data
-
-        Args:
-            report_data: Dictionary containing report information
-            output_filename: Optional filename for the PDF
+        Bounded Paragraph flowables for plain text
 
-        Returns:
-            str: Path to the generated PDF file
+        Blank lines start a new paragraph; a paragraph longer than
+        MAX_PARAGRAPH_CHARS is cut at a sentence end or word boundary, since
+        ReportLab's line breaking and page splitting slow down sharply on
+        very long paragraphs. Each piece is escaped exactly once.
         """
-        # Create output directory if it doesn't exist
-        pdf_folder = current_app.config['PDF_FOLDER']
-        os.makedirs(pdf_folder, exist_ok=True)
-
-        # Generate filename if not provided
-        if not output_filename:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            output_filename = f"report_{report_data['id']}_{timestamp}.pdf"
-
-        output_path = os.path.join(pdf_folder, output_filename)
+        limit = PDFService.MAX_PARAGRAPH_CHARS
+        flowables = []
+        for block in _BLANK_LINE.split(str(text)):
+            block = ' '.join(block.split())
+            while block:
+                if len(block) <= limit:
+                    piece, block = block, ''
+                else:
+                    cut = block.rfind('. ', limit // 2, limit)
+                    cut = cut + 1 if cut != -1 else block.rfind(' ', 0, limit)
+                    if cut <= 0:
+                        cut = limit
+                    piece, block = block[:cut], block[cut:].lstrip()
+                flowables.append(Paragraph(escape(piece), style))
+        return flowables
 
+    @staticmethod
+    def _build(report_data, output_path):
+        """Lay out a report and write the PDF to output_path (a path or binary file object)"""
         # Create the PDF document
         doc = SimpleDocTemplate(
             output_path,
@@ -46,157 +116,74 @@ class PDFService:
         # Container for the 'Flowable' objects
         elements = []
 
-        # Define styles
-        styles = getSampleStyleSheet()
-
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1a202c'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#2d3748'),
-            spaceAfter=12,
-            spaceBefore=12
-        )
-
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontSize=11,
-            textColor=colors.HexColor('#4a5568'),
-            spaceAfter=8
-        )
-
         # Add title
-        title = Paragraph(report_data.get('title', 'Call Analysis Report'), title_style)
+        title = Paragraph(escape(str(report_data.get('title') or 'Call Analysis Report')), _TITLE_STYLE)
         elements.append(title)
         elements.append(Spacer(1, 0.2 * inch))
 
         # Add metadata table
         metadata = [
             ['Report ID:', str(report_data.get('id', 'N/A'))],
-            ['Created By:', report_data.get('created_by', {}).get('name', 'N/A')],
+            ['Created By:', (report_data.get('created_by') or {}).get('name', 'N/A')],
             ['Created At:', PDFService._format_date(report_data.get('created_at'))],
-            ['Template:', report_data.get('template', {}).get('name', 'N/A')],
-            ['Status:', report_data.get('status', 'N/A').upper()]
+            ['Template:', (report_data.get('template') or {}).get('name', 'N/A')],
+            ['Status:', (report_data.get('status') or 'N/A').upper()]
         ]
 
         if report_data.get('finalized_at'):
             metadata.append(['Finalized At:', PDFService._format_date(report_data.get('finalized_at'))])
 
         metadata_table = Table(metadata, colWidths=[2 * inch, 4 * inch])
-        metadata_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#edf2f7')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2d3748')),
-            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-            ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cbd5e0'))
-        ]))
+        metadata_table.setStyle(_METADATA_TABLE_STYLE)
         elements.append(metadata_table)
         elements.append(Spacer(1, 0.3 * inch))
 
         # Add summary if available
         if report_data.get('summary'):
-            summary_heading = Paragraph('Summary', heading_style)
-            elements.append(summary_heading)
-            summary_text = Paragraph(report_data['summary'], normal_style)
-            elements.append(summary_text)
+            elements.append(Paragraph('Summary', _HEADING_STYLE))
+            elements.extend(PDFService._paragraphs(report_data['summary'], _NORMAL_STYLE))
             elements.append(Spacer(1, 0.2 * inch))
 
         # Add field values
         if report_data.get('field_values'):
-            fields_heading = Paragraph('Analysis Details', heading_style)
-            elements.append(fields_heading)
+            elements.append(Paragraph('Analysis Details', _HEADING_STYLE))
             elements.append(Spacer(1, 0.1 * inch))
 
             for field in report_data['field_values']:
-                field_label = Paragraph(
-                    f"<b>{field.get('field_label', 'N/A')}:</b>",
-                    normal_style
-                )
-                elements.append(field_label)
-
-                field_value = field.get('value', 'N/A')
-                # Handle long text values
-                if len(str(field_value)) > 100:
-                    field_value_para = Paragraph(str(field_value), normal_style)
-                    elements.append(field_value_para)
-                else:
-                    field_value_para = Paragraph(str(field_value), normal_style)
-                    elements.append(field_value_para)
-
+                label = escape(str(field.get('field_label', 'N/A')))
+                elements.append(Paragraph(f"<b>{label}:</b>", _NORMAL_STYLE))
+                elements.extend(PDFService._paragraphs(field.get('value', 'N/A'), _NORMAL_STYLE))
                 elements.append(Spacer(1, 0.1 * inch))
 
         # Add custom fields if available
         if report_data.get('custom_fields'):
-            custom_fields_heading = Paragraph('Custom Fields', heading_style)
-            elements.append(custom_fields_heading)
+            elements.append(Paragraph('Custom Fields', _HEADING_STYLE))
             elements.append(Spacer(1, 0.1 * inch))
 
             for custom_field in report_data['custom_fields']:
-                field_label = Paragraph(
-                    f"<b>{custom_field.get('custom_field_name', 'N/A')}:</b>",
-                    normal_style
-                )
-                elements.append(field_label)
-
-                field_value = custom_field.get('value', 'N/A')
-                # Handle long text values
-                if len(str(field_value)) > 100:
-                    field_value_para = Paragraph(str(field_value), normal_style)
-                    elements.append(field_value_para)
-                else:
-                    field_value_para = Paragraph(str(field_value), normal_style)
-                    elements.append(field_value_para)
-
+                label = escape(str(custom_field.get('custom_field_name', 'N/A')))
+                elements.append(Paragraph(f"<b>{label}:</b>", _NORMAL_STYLE))
+                elements.extend(PDFService._paragraphs(custom_field.get('value', 'N/A'), _NORMAL_STYLE))
                 elements.append(Spacer(1, 0.1 * inch))
 
-        # Add transcription if available
+        # Add transcription if available, as many short paragraphs rather than one huge one
         if report_data.get('transcription'):
             elements.append(PageBreak())
-            transcription_heading = Paragraph('Full Transcription', heading_style)
-            elements.append(transcription_heading)
+            elements.append(Paragraph('Full Transcription', _HEADING_STYLE))
             elements.append(Spacer(1, 0.1 * inch))
-
-            # Split transcription into paragraphs for better formatting
-            transcription_text = report_data['transcription']
-            transcription_para = Paragraph(transcription_text, normal_style)
-            elements.append(transcription_para)
+            elements.extend(PDFService._paragraphs(report_data['transcription'], _NORMAL_STYLE))
 
         # Add footer information
         elements.append(Spacer(1, 0.5 * inch))
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontSize=8,
-            textColor=colors.HexColor('#718096'),
-            alignment=TA_CENTER
-        )
         footer = Paragraph(
             f"Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')} | Call Analyzer Application",
-            footer_style
+            _FOOTER_STYLE
         )
         elements.append(footer)
 
         # Build PDF
         doc.build(elements)
 
-        return output_path
-
     @staticmethod
     def _format_date(date_string):
         """Format ISO date string to readable format"""
@@ -213,3 +200,163 @@ class PDFService:
     def get_pdf_url(filename):
         """Get the URL for a generated PDF"""
         return f"/generated/pdfs/{filename}"
+
+    @staticmethod
+    def _cache_folder(report_id, create=True):
+        """Folder holding a report's renders; each report has its own, so changes never list the whole cache"""
+        folder = os.path.join(current_app.config['PDF_FOLDER'], PDFService.CACHE_DIR, str(report_id))
+        if create:
+            os.makedirs(folder, exist_ok=True)
+        return folder
+
+    @staticmethod
+    def cache_key(report):
+        """(report id, report revision, layout version) a render is valid for"""
+        return report.id, report.revision or 1, PDFService.LAYOUT_VERSION
+
+    @staticmethod
+    def cache_filename(report):
+        report_id, revision, version = PDFService.cache_key(report)
+        return f"report_{report_id}_r{revision}_v{version}.pdf"
+
+    @staticmethod
+    def etag(report):
+        """ETag of the report's current revision, known without rendering it"""
+        report_id, revision, version = PDFService.cache_key(report)
+        return f"report-{report_id}-r{revision}-v{version}"
+
+    @staticmethod
+    def signed_link(report_id, team_id):
+        """
+        Download URL for a report's PDF that works without logging in
+
+        The token is a JWT signed with JWT_SECRET_KEY that expires after
+        MAIL_ATTACHMENT_LINK_DAYS. It names the report rather than a
+        revision, so the link serves the report as it is when opened.
+        """
+        now = datetime.utcnow()
+        payload = {
+            'report_id': report_id,
+            'team_id': team_id,
+            'exp': now + timedelta(days=current_app.config['MAIL_ATTACHMENT_LINK_DAYS']),
+            'iat': now,
+            'type': 'report_pdf'
+        }
+        token = jwt.encode(payload, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
+        return f"{current_app.config['BACKEND_URL'].rstrip('/')}/api/reports/shared-pdf/{token}"
+
+    @staticmethod
+    def verify_link_token(token):
+        """(report_id, team_id) of a signed PDF link token"""
+        try:
+            payload = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+        except jwt.ExpiredSignatureError:
+            raise ValueError("This link has expired")
+        except jwt.InvalidTokenError:
+            raise ValueError("Invalid link")
+
+        if payload.get('type') != 'report_pdf':
+            raise ValueError("Invalid link")
+        return payload['report_id'], payload['team_id']
+
+    @staticmethod
+    def _remove_renders(folder, keep=None):
+        """Delete the finished renders in a report's cache folder, except keep"""
+        try:
+            entries = list(os.scandir(folder))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            # .tmp files are renders still being written
+            if entry.name.endswith('.pdf') and entry.name != keep:
+                PDFService._remove(entry.path)
+
+    @staticmethod
+    def cached_path(report):
+        """Path of the report's current render, or None if it isn't cached"""
+        path = os.path.join(PDFService._cache_folder(report.id, create=False), PDFService.cache_filename(report))
+        if not os.path.exists(path):
+            return None
+        # Mark it used, so retention keeps renders that are still requested
+        os.utime(path)
+        return path
+
+    @staticmethod
+    def render_to_cache(report_data, folder, filename):
+        """
+        Render report data into the report's cache folder
+
+        Needs no app context, so it can run in a worker process.
+
+        Returns:
+            str: Path to the cached PDF file
+        """
+        path = os.path.join(folder, filename)
+        report_id = report_data['id']
+        # Retention removes cache folders that have been empty for a while
+        os.makedirs(folder, exist_ok=True)
+
+        # Render beside the target and rename, so readers never see a partial file
+        handle, temp_path = tempfile.mkstemp(dir=folder, prefix=f".report_{report_id}_", suffix='.tmp')
+        os.close(handle)
+        try:
+            PDFService._build(report_data, temp_path)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        # Earlier renders of this report can't be served any more
+        PDFService._remove_renders(folder, keep=filename)
+
+        return path
+
+    @staticmethod
+    def render_bytes(report_data):
+        """
+        Render report data in memory
+
+        Needs no app context, so it can run in a worker process.
+
+        Returns:
+            bytes: The PDF document
+        """
+        buffer = io.BytesIO()
+        PDFService._build(report_data, buffer)
+        return buffer.getvalue()
+
+    @staticmethod
+    def get_report_pdf(report, load_report_data):
+        """
+        Path of a report's PDF, rendering it in this process on a cache miss
+
+        Args:
+            report: Report model instance
+            load_report_data: Callable returning the report data dict; only
+                called on a cache miss
+
+        Returns:
+            str: Path to the cached PDF file
+        """
+        path = PDFService.cached_path(report)
+        if path:
+            return path
+        return PDFService.render_to_cache(
+            load_report_data(), PDFService._cache_folder(report.id), PDFService.cache_filename(report)
+        )
+
+    @staticmethod
+    def invalidate(report_ids):
+        """Drop cached renders of reports that changed or were deleted"""
+        for report_id in set(report_ids):
+            PDFService._remove_renders(PDFService._cache_folder(report_id, create=False))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Failed to remove cached PDF {path}: {e}")
@@ -3,12 +3,43 @@ from app.models.report import Report, ReportFieldValue
 from app.models.analysis import CallAnalysis
 from app.models.template import ReportTemplate, TemplateField
 from app.models.user import User
-from app.models.team import Team
+from app.services.search_service import SearchService
+from app.services.field_value_service import FieldValueService
+from app.services.field_index_service import FieldIndexService
+from app.services.field_analytics_service import FieldAnalyticsService
+from app.services.activity_service import ActivityService
+from app.services.identity_service import IdentityService
+from app.services.metrics_service import MetricsService
+from app.services.rollup_service import RollupService
+from app.services.pdf_service import PDFService
+from app.services.pdf_render_service import PDFRenderService
 from sqlalchemy import or_, and_
+from collections import defaultdict
 from datetime import datetime
 
 
 class ReportService:
+    @staticmethod
+    def _list_field_values(reports):
+        """Field values of each report for list views
+
+        Read from the denormalized snapshot; reports without one yet (not
+        backfilled) are built from the normalized rows in a single query.
+        """
+        result = {}
+        missing = []
+        for report in reports:
+            values = report.snapshot_field_values()
+            if values is None:
+                missing.append(report.id)
+            else:
+                result[report.id] = values
+
+        for report_id, entries in FieldValueService.snapshot_entries(missing).items():
+            result[report_id] = [dict(zip(Report.SNAPSHOT_KEYS, entry)) for entry in entries]
+
+        return result
+
     @staticmethod
     def get_reports(user_id, team_id, page=1, limit=20, search=None, status=None):
         """Get all reports for a team with pagination and filters
@@ -17,9 +48,7 @@ class ReportService:
         - Owner can see all reports (their own + all team members' reports)
         - Team members can only see their own reports (not the owner's reports)
         """
-        # Get the team to check ownership
-        team = Team.query.get(team_id)
-        if not team:
+        if not team_id:
             return {
                 'reports': [],
                 'total': 0,
@@ -31,7 +60,7 @@ class ReportService:
         query = Report.query.filter_by(team_id=team_id)
 
         # Apply visibility rules based on user role
-        is_owner = team.owner_id == user_id
+        is_owner = IdentityService.is_owner(user_id, team_id)
 
         if not is_owner:
             # Team member can only see their own reports (not owner's reports)
@@ -44,9 +73,9 @@ class ReportService:
             # Default: show only finalized reports
             query = query.filter_by(status='finalized')
 
-        # Apply search filter
-        if search:
-            query = query.filter(Report.title.ilike(f'%{search}%'))
+        # Apply search filter (full-text match over title, summary, fields and transcript)
+        if search and search.strip():
+            query = query.filter(Report.id.in_(SearchService.matching_report_ids(search.strip())))
 
         # Order by creation date descending
         query = query.order_by(Report.created_at.desc())
@@ -55,6 +84,9 @@ class ReportService:
         total = query.count()
         reports = query.offset((page - 1) * limit).limit(limit).all()
 
+        # Field values for table display come from each report's snapshot
+        field_values_by_report = ReportService._list_field_values(reports)
+
         # Format reports with additional info and field values
         report_list = []
         for report in reports:
@@ -71,27 +103,7 @@ class ReportService:
             report_dict['created_by'] = f"{creator.first_name} {creator.last_name}" if creator else 'Unknown'
 
             # Include field values for table display
-            field_values = []
-            for fv in report.field_values:
-                if fv.is_custom_field():
-                    field_values.append({
-                        'field_id': None,
-                        'field_label': fv.custom_field_name,
-                        'field_type': 'text',
-                        'field_name': fv.custom_field_name.lower().replace(' ', '_'),
-                        'value': fv.field_value
-                    })
-                else:
-                    field = TemplateField.query.get(fv.field_id)
-                    if field:
-                        field_values.append({
-                            'field_id': fv.field_id,
-                            'field_label': field.field_label,
-                            'field_type': field.field_type,
-                            'field_name': field.field_name,
-                            'value': fv.field_value
-                        })
-            report_dict['field_values'] = field_values
+            report_dict['field_values'] = field_values_by_report[report.id]
 
             report_list.append(report_dict)
 
@@ -172,52 +184,18 @@ class ReportService:
         if summary is not None:
             report.summary = summary
 
-        # Update template field values if provided
+        # Update template field values if provided (one upsert on report_id, field_id)
         if field_values:
-            for fv_data in field_values:
-                field_id = fv_data.get('field_id')
-                value = fv_data.get('value')
-
-                # Find existing field value or create new one
-                field_value = ReportFieldValue.query.filter_by(
-                    report_id=report.id,
-                    field_id=field_id
-                ).first()
-
-                if field_value:
-                    field_value.field_value = value
-                else:
-                    field_value = ReportFieldValue(
-                        report_id=report.id,
-                        field_id=field_id,
-                        field_value=value
-                    )
-                    db.session.add(field_value)
-
-        # Handle custom fields if provided
+            FieldValueService.upsert_values(report.id, field_values)
+
+        # Handle custom fields if provided: replace the existing set
         if custom_fields is not None:
-            # First, remove all existing custom fields for this report
-            ReportFieldValue.query.filter_by(
-                report_id=report.id,
-                field_id=None
-            ).delete()
-
-            # Add new custom fields
-            for cf_data in custom_fields:
-                custom_field_name = cf_data.get('custom_field_name')
-                value = cf_data.get('value')
-
-                if custom_field_name:  # Only add if name is provided
-                    custom_field_value = ReportFieldValue(
-                        report_id=report.id,
-                        field_id=None,
-                        custom_field_name=custom_field_name,
-                        field_value=value
-                    )
-                    db.session.add(custom_field_value)
+            FieldValueService.replace_custom_fields(report.id, custom_fields)
 
         report.updated_at = datetime.utcnow()
+        SearchService.index_report(report)
         db.session.commit()
+        PDFService.invalidate([report.id])
 
         return report.to_dict()
 
@@ -236,8 +214,13 @@ class ReportService:
         report.status = 'finalized'
         report.finalized_at = datetime.utcnow()
         report.updated_at = datetime.utcnow()
+        SearchService.update_status([report.id], 'finalized')
+        FieldAnalyticsService.invalidate_reports([report.id])
+        ActivityService.record(report.team_id, 'draft_finalized', user_id, 'report', report.id, report.title)
 
         db.session.commit()
+        PDFService.invalidate([report.id])
+        PDFRenderService.prerender([report.id])
 
         return report.to_dict()
 
@@ -249,11 +232,166 @@ class ReportService:
         if not report:
             raise ValueError("Report not found")
 
+        SearchService.remove_reports([report.id])
+        FieldIndexService.remove_reports([report.id])
+        FieldAnalyticsService.invalidate_reports([report.id])
         db.session.delete(report)
         db.session.commit()
+        PDFService.invalidate([report_id])
 
         return True
 
+    # IDs per IN (...) list so large batches stay within statement limits
+    BATCH_CHUNK_SIZE = 1000
+
+    @staticmethod
+    def _authorize_batch(report_ids, team_id, *columns):
+        """Load the requested reports that belong to the team in one filtered SELECT per chunk
+
+        Returns:
+            tuple: (rows for accessible reports, list of failed IDs in request order)
+        """
+        requested = []
+        failed_ids = []
+        seen = set()
+        for report_id in report_ids:
+            try:
+                report_id = int(report_id)
+            except (TypeError, ValueError):
+                failed_ids.append(report_id)
+                continue
+            if report_id not in seen:
+                seen.add(report_id)
+                requested.append(report_id)
+
+        rows = []
+        chunk_size = ReportService.BATCH_CHUNK_SIZE
+        for start in range(0, len(requested), chunk_size):
+            chunk = requested[start:start + chunk_size]
+            rows.extend(db.session.query(Report.id, *columns).filter(
+                Report.id.in_(chunk),
+                Report.team_id == team_id
+            ).all())
+
+        found = {row.id for row in rows}
+        failed_ids.extend(report_id for report_id in requested if report_id not in found)
+
+        return rows, failed_ids
+
+    @staticmethod
+    def batch_delete_reports(report_ids, team_id):
+        """Delete many reports with set-based statements
+
+        Field values and search documents are deleted explicitly, then the
+        reports themselves. Bulk deletes skip the ORM flush hooks, so the
+        dashboard counters and rollups are adjusted here.
+
+        Returns:
+            tuple: (deleted_count, failed_ids)
+        """
+        rows, failed_ids = ReportService._authorize_batch(
+            report_ids, team_id, Report.status, Report.template_id, Report.created_at
+        )
+        if not rows:
+            return 0, failed_ids
+
+        ids = [row.id for row in rows]
+        chunk_size = ReportService.BATCH_CHUNK_SIZE
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            ReportFieldValue.query.filter(
+                ReportFieldValue.report_id.in_(chunk)
+            ).delete(synchronize_session=False)
+            SearchService.remove_reports(chunk)
+            FieldIndexService.remove_reports(chunk)
+            FieldAnalyticsService.invalidate_reports(chunk)
+            Report.query.filter(
+                Report.id.in_(chunk),
+                Report.team_id == team_id
+            ).delete(synchronize_session=False)
+
+        finalized = sum(1 for row in rows if row.status == 'finalized')
+        MetricsService.apply_deltas(team_id, report_count=-finalized, draft_count=-(len(rows) - finalized))
+
+        per_day = defaultdict(int)
+        for row in rows:
+            per_day[(RollupService._day(row.created_at), row.template_id)] += 1
+        for (day, template_id), count in per_day.items():
+            RollupService.apply_deltas(team_id, day, template_id=template_id, report_count=-count)
+
+        db.session.commit()
+        db.session.expire_all()
+        PDFService.invalidate(ids)
+
+        return len(rows), failed_ids
+
+    @staticmethod
+    def batch_finalize_reports(report_ids, team_id, actor):
+        """Finalize many drafts with one UPDATE per chunk
+
+        Reports that are missing, in another team or already finalized are
+        returned in failed_ids.
+
+        Returns:
+            tuple: (finalized_count, failed_ids)
+        """
+        rows, failed_ids = ReportService._authorize_batch(
+            report_ids, team_id, Report.status
+        )
+
+        drafts = [row.id for row in rows if row.status == 'draft']
+        failed_ids.extend(row.id for row in rows if row.status != 'draft')
+        if not drafts:
+            return 0, failed_ids
+
+        now = datetime.utcnow()
+        finalized = []
+        chunk_size = ReportService.BATCH_CHUNK_SIZE
+        for start in range(0, len(drafts), chunk_size):
+            # Lock the chunk's drafts so the UPDATE changes exactly these rows,
+            # even if a concurrent finalize moved some since they were read
+            locked = db.session.query(Report.id, Report.title).filter(
+                Report.id.in_(drafts[start:start + chunk_size]),
+                Report.team_id == team_id,
+                Report.status == 'draft'
+            ).with_for_update().all()
+            if not locked:
+                continue
+
+            chunk = [row.id for row in locked]
+            Report.query.filter(
+                Report.id.in_(chunk),
+                Report.status == 'draft'
+            ).update({
+                'status': 'finalized',
+                'finalized_at': now,
+                'updated_at': now
+            }, synchronize_session=False)
+            finalized.extend(locked)
+            SearchService.update_status(chunk, 'finalized')
+            FieldAnalyticsService.invalidate_reports(chunk)
+
+        ids = [row.id for row in finalized]
+        finalized_ids = set(ids)
+        failed_ids.extend(report_id for report_id in drafts if report_id not in finalized_ids)
+        if not finalized:
+            db.session.commit()
+            return 0, failed_ids
+
+        finalized_count = len(finalized)
+        MetricsService.apply_deltas(team_id, draft_count=-finalized_count, report_count=finalized_count)
+        ActivityService.record_many(
+            team_id, 'draft_finalized', actor, 'report',
+            [(row.id, row.title) for row in finalized]
+        )
+
+        db.session.commit()
+        db.session.expire_all()
+        PDFService.invalidate(ids)
+        PDFRenderService.prerender(ids)
+
+        return finalized_count, failed_ids
+
     @staticmethod
     def get_recent_reports(team_id, limit=10):
         """Get recent reports for dashboard"""
@@ -283,9 +421,7 @@ class ReportService:
         - Owner can see all drafts (their own + all team members' drafts)
         - Team members can only see their own drafts
         """
-        # Get the team to check ownership
-        team = Team.query.get(team_id)
-        if not team:
+        if not team_id:
             return {
                 'reports': [],
                 'total': 0,
@@ -299,7 +435,7 @@ class ReportService:
         )
 
         # Apply visibility rules based on user role
-        is_owner = team.owner_id == user_id
+        is_owner = IdentityService.is_owner(user_id, team_id)
 
         if not is_owner:
             # Team member can only see their own drafts
@@ -311,6 +447,9 @@ class ReportService:
         total = query.count()
         reports = query.offset((page - 1) * limit).limit(limit).all()
 
+        # Field values for table display come from each report's snapshot
+        field_values_by_report = ReportService._list_field_values(reports)
+
         # Format reports with additional info and field values
         report_list = []
         for report in reports:
@@ -322,27 +461,7 @@ class ReportService:
             report_dict['created_by_name'] = f"{creator.first_name} {creator.last_name}" if creator else 'Unknown'
 
             # Include field values for table display
-            field_values = []
-            for fv in report.field_values:
-                if fv.is_custom_field():
-                    field_values.append({
-                        'field_id': None,
-                        'field_label': fv.custom_field_name,
-                        'field_type': 'text',
-                        'field_name': fv.custom_field_name.lower().replace(' ', '_'),
-                        'value': fv.field_value
-                    })
-                else:
-                    field = TemplateField.query.get(fv.field_id)
-                    if field:
-                        field_values.append({
-                            'field_id': fv.field_id,
-                            'field_label': field.field_label,
-                            'field_type': field.field_type,
-                            'field_name': field.field_name,
-                            'value': fv.field_value
-                        })
-            report_dict['field_values'] = field_values
+            report_dict['field_values'] = field_values_by_report[report.id]
 
             report_list.append(report_dict)
 
@@ -374,35 +493,12 @@ class ReportService:
                 existing_draft.summary = summary
             existing_draft.updated_at = datetime.utcnow()
 
-            # Delete all existing field values (both template and custom)
-            ReportFieldValue.query.filter_by(report_id=existing_draft.id).delete()
-
-            # Add template field values
-            if field_values:
-                for fv in field_values:
-                    report_field_value = ReportFieldValue(
-                        report_id=existing_draft.id,
-                        field_id=fv['field_id'],
-                        field_value=str(fv['value']) if fv['value'] is not None else None
-                    )
-                    db.session.add(report_field_value)
-
-            # Add custom fields
-            if custom_fields:
-                for cf in custom_fields:
-                    custom_field_name = cf.get('custom_field_name')
-                    value = cf.get('value')
-
-                    if custom_field_name:  # Only add if name is provided
-                        custom_field_value = ReportFieldValue(
-                            report_id=existing_draft.id,
-                            field_id=None,
-                            custom_field_name=custom_field_name,
-                            field_value=str(value) if value is not None else None
-                        )
-                        db.session.add(custom_field_value)
+            # Replace all existing field values (both template and custom)
+            FieldValueService.replace_values(existing_draft.id, field_values, custom_fields)
 
+            SearchService.index_report(existing_draft)
             db.session.commit()
+            PDFService.invalidate([existing_draft.id])
             return existing_draft
 
         # Create new draft report
@@ -411,6 +507,7 @@ class ReportService:
             user_id=user_id,
             team_id=team_id,
             template_id=analysis.template_id,
+            template_revision_id=analysis.template_revision_id,
             title=title,
             summary=summary,
             status='draft'
@@ -418,30 +515,9 @@ class ReportService:
         db.session.add(report)
         db.session.flush()  # Get report ID
 
-        # Add template field values
-        if field_values:
-            for fv in field_values:
-                report_field_value = ReportFieldValue(
-                    report_id=report.id,
-                    field_id=fv['field_id'],
-                    field_value=str(fv['value']) if fv['value'] is not None else None
-                )
-                db.session.add(report_field_value)
-
-        # Add custom fields
-        if custom_fields:
-            for cf in custom_fields:
-                custom_field_name = cf.get('custom_field_name')
-                value = cf.get('value')
-
-                if custom_field_name:  # Only add if name is provided
-                    custom_field_value = ReportFieldValue(
-                        report_id=report.id,
-                        field_id=None,
-                        custom_field_name=custom_field_name,
-                        field_value=str(value) if value is not None else None
-                    )
-                    db.session.add(custom_field_value)
+        # Add template and custom field values in one insert
+        FieldValueService.insert_values(report.id, field_values, custom_fields)
 
+        SearchService.index_report(report)
         db.session.commit()
         return report
@@ -0,0 +1,686 @@
+from app import db
+from app.models.analysis import CallAnalysis, CallAnalysisText
+from app.models.report import Report, ReportFieldValue
+from app.models.retention import RetentionPolicy, ArchivedCallAnalysis, ArchivedReport
+from app.models.team import Team
+from app.services.identity_service import IdentityService
+from app.services.metrics_service import MetricsService
+from app.services.search_service import SearchService
+from app.services.field_index_service import FieldIndexService
+from app.services.field_value_service import FieldValueService
+from app.services.field_analytics_service import FieldAnalyticsService
+from app.services.pdf_service import PDFService
+from flask import current_app
+from sqlalchemy import select, insert, update, delete, exists, func, bindparam, DateTime, Date
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+import gzip
+import json
+import os
+import shutil
+
+
+class RetentionService:
+    """Retention engine for uploads, generated PDFs and old analyses
+
+    Per-team steps follow each team's RetentionPolicy (falling back to the
+    RETENTION_* config defaults):
+    - audio older than audio_delete_after_days is deleted
+    - remaining audio older than audio_cold_after_days is gzipped into
+      uploads/cold/ and the analysis points at the cold copy
+    - images older than image_delete_after_days are deleted
+    - analyses older than archive_after_days whose reports haven't changed
+      since are moved, with their reports, to the archive tables
+
+    Global steps remove generated PDFs older than RETENTION_PDF_HOURS,
+    cached report renders unused for RETENTION_PDF_CACHE_DAYS, and uploads
+    no analysis (live or archived) refers to.
+
+    Archived rows leave the live dashboard counters; the daily rollups keep
+    them, since they describe history.
+    """
+    STEPS = ('pdfs', 'orphans', 'audio', 'images', 'archive')
+    STAT_KEYS = (
+        'pdfs_deleted', 'pdf_bytes',
+        'orphans_deleted', 'orphan_bytes',
+        'audio_deleted', 'audio_deleted_bytes',
+        'audio_cold', 'audio_cold_bytes', 'audio_cold_saved_bytes',
+        'images_deleted', 'image_bytes',
+        'analyses_archived', 'reports_archived'
+    )
+    COLD_PREFIX = 'cold'
+    # Upload directories scanned for orphans, relative to UPLOAD_FOLDER
+    UPLOAD_DIRS = ('audio', 'images', os.path.join('cold', 'audio'))
+    BATCH_SIZE = 200
+    COMPRESS_LEVEL = 6
+
+    # Policy
+    DEFAULTS = {
+        'audio_cold_after_days': 'RETENTION_AUDIO_COLD_DAYS',
+        'audio_delete_after_days': 'RETENTION_AUDIO_DELETE_DAYS',
+        'image_delete_after_days': 'RETENTION_IMAGE_DELETE_DAYS',
+        'archive_after_days': 'RETENTION_ARCHIVE_DAYS'
+    }
+
+    @staticmethod
+    def effective_policy(team_id, policy=None):
+        """Settings that apply to a team, with config defaults filled in"""
+        settings = {}
+        for name, config_key in RetentionService.DEFAULTS.items():
+            value = getattr(policy, name) if policy is not None else None
+            settings[name] = value if value is not None else current_app.config.get(config_key, 0)
+        return settings
+
+    @staticmethod
+    def get_policy(team_id):
+        """A team's stored overrides and the settings in effect"""
+        policy = db.session.get(RetentionPolicy, team_id)
+        return {
+            'team_id': team_id,
+            'overrides': policy.to_dict() if policy else None,
+            'effective': RetentionService.effective_policy(team_id, policy)
+        }
+
+    @staticmethod
+    def update_policy(team_id, user_id, settings):
+        """Set a team's retention overrides (owner only)
+
+        Args:
+            settings: {setting: days, or None to use the default}
+        """
+        if not IdentityService.is_owner(user_id, team_id):
+            raise ValueError("Only team owners can change retention settings")
+        if not isinstance(settings, dict):
+            raise ValueError("Settings must be an object")
+
+        unknown = set(settings) - set(RetentionPolicy.SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown retention settings: {', '.join(sorted(unknown))}")
+
+        for name, value in settings.items():
+            if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 0):
+                raise ValueError(f"{name} must be a non-negative number of days or null")
+
+        policy = db.session.get(RetentionPolicy, team_id)
+        if not policy:
+            policy = RetentionPolicy(team_id=team_id)
+            db.session.add(policy)
+
+        for name, value in settings.items():
+            setattr(policy, name, value)
+        policy.updated_by = user_id
+        db.session.commit()
+
+        return RetentionService.get_policy(team_id)
+
+    # Files
+
+    @staticmethod
+    def _absolute(relative_path):
+        return os.path.join(current_app.config['UPLOAD_FOLDER'], relative_path)
+
+    @staticmethod
+    def _size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing {path}: {e}")
+
+    @staticmethod
+    def is_cold(relative_path):
+        """Whether a stored upload path points into cold storage"""
+        return bool(relative_path) and relative_path.startswith(RetentionService.COLD_PREFIX + '/')
+
+    @staticmethod
+    def _freeze_file(relative_path):
+        """Gzip an upload into cold storage; the original is left for the caller
+
+        Returns:
+            tuple: (cold relative path, compressed size)
+        """
+        cold_path = f"{RetentionService.COLD_PREFIX}/{relative_path}.gz"
+        target = RetentionService._absolute(cold_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        with open(RetentionService._absolute(relative_path), 'rb') as source:
+            with gzip.open(target + '.tmp', 'wb', compresslevel=RetentionService.COMPRESS_LEVEL) as destination:
+                shutil.copyfileobj(source, destination)
+        os.replace(target + '.tmp', target)
+
+        return cold_path, RetentionService._size(target)
+
+    @staticmethod
+    def thaw_audio(analysis):
+        """Bring an analysis' cold audio back to its original location
+
+        Returns:
+            str: The restored relative path
+        """
+        cold_path = analysis.audio_file_path
+        if not RetentionService.is_cold(cold_path):
+            return cold_path
+
+        hot_path = cold_path[len(RetentionService.COLD_PREFIX) + 1:]
+        if hot_path.endswith('.gz'):
+            hot_path = hot_path[:-3]
+        target = RetentionService._absolute(hot_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        with gzip.open(RetentionService._absolute(cold_path), 'rb') as source:
+            with open(target + '.tmp', 'wb') as destination:
+                shutil.copyfileobj(source, destination)
+        os.replace(target + '.tmp', target)
+
+        analysis.audio_file_path = hot_path
+        db.session.commit()
+        RetentionService._remove(RetentionService._absolute(cold_path))
+
+        return hot_path
+
+    @staticmethod
+    def _file_rows(model, column, team_id, cutoff, last_id, not_before=None, cold=None):
+        """Next batch of (id, path) for a team's rows older than cutoff with a file"""
+        path = getattr(model, column)
+        query = db.session.query(model.id, path).filter(
+            model.team_id == team_id,
+            model.created_at < cutoff,
+            path.isnot(None),
+            model.id > last_id
+        )
+        if not_before is not None:
+            query = query.filter(model.created_at >= not_before)
+        if cold is False:
+            query = query.filter(~path.like(f"{RetentionService.COLD_PREFIX}/%"))
+        return query.order_by(model.id).limit(RetentionService.BATCH_SIZE).all()
+
+    @staticmethod
+    def _set_paths(model, column, changes):
+        """Point rows at new file paths (None clears them) and commit"""
+        table = model.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('b_id')).values({column: bindparam('b_path')}),
+            [{'b_id': row_id, 'b_path': path} for row_id, path in changes]
+        )
+        db.session.commit()
+
+    @staticmethod
+    def _expire_files(team_id, column, cutoff, dry_run, stats, count_key, bytes_key):
+        """Delete a team's files in `column` older than cutoff and clear the paths"""
+        for model in (CallAnalysis, ArchivedCallAnalysis):
+            last_id = 0
+            while True:
+                rows = RetentionService._file_rows(model, column, team_id, cutoff, last_id)
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                for _, path in rows:
+                    stats[count_key] += 1
+                    stats[bytes_key] += RetentionService._size(RetentionService._absolute(path))
+
+                if not dry_run:
+                    # Rows go first: a file without a row is an orphan, a row without a file is broken
+                    RetentionService._set_paths(model, column, [(row_id, None) for row_id, _ in rows])
+                    for _, path in rows:
+                        RetentionService._remove(RetentionService._absolute(path))
+
+    @staticmethod
+    def _freeze_audio(team_id, cutoff, dry_run, stats, not_before=None):
+        """Move a team's audio older than cutoff into cold storage"""
+        for model in (CallAnalysis, ArchivedCallAnalysis):
+            last_id = 0
+            while True:
+                rows = RetentionService._file_rows(
+                    model, 'audio_file_path', team_id, cutoff, last_id, not_before=not_before, cold=False
+                )
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                moved = []
+                for row_id, path in rows:
+                    absolute = RetentionService._absolute(path)
+                    if not os.path.isfile(absolute):
+                        continue
+                    size = RetentionService._size(absolute)
+                    stats['audio_cold'] += 1
+                    stats['audio_cold_bytes'] += size
+                    if dry_run:
+                        continue
+
+                    try:
+                        cold_path, compressed = RetentionService._freeze_file(path)
+                    except OSError as e:
+                        print(f"Error moving {path} to cold storage: {e}")
+                        continue
+                    stats['audio_cold_saved_bytes'] += size - compressed
+                    moved.append((row_id, path, cold_path))
+
+                if moved:
+                    RetentionService._set_paths(model, 'audio_file_path', [(row_id, cold) for row_id, _, cold in moved])
+                    for _, path, _ in moved:
+                        RetentionService._remove(RetentionService._absolute(path))
+
+    @staticmethod
+    def _referenced_paths(user_id):
+        """Upload paths any live or archived analysis of a user refers to"""
+        paths = set()
+        for model in (CallAnalysis, ArchivedCallAnalysis):
+            for audio_path, image_path in db.session.query(
+                model.audio_file_path, model.image_file_path
+            ).filter(model.user_id == user_id):
+                paths.update(os.path.normpath(path) for path in (audio_path, image_path) if path)
+        return paths
+
+    @staticmethod
+    def _collect_orphans(dry_run, stats):
+        """Delete uploads in user_* directories that nothing refers to"""
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        grace = current_app.config.get('RETENTION_ORPHAN_GRACE_HOURS', 24)
+        cutoff = (datetime.now() - timedelta(hours=grace)).timestamp()
+
+        for upload_dir in RetentionService.UPLOAD_DIRS:
+            base = os.path.join(upload_folder, upload_dir)
+            if not os.path.isdir(base):
+                continue
+
+            for user_dir in os.scandir(base):
+                if not user_dir.is_dir() or not user_dir.name.startswith('user_'):
+                    continue
+                try:
+                    user_id = int(user_dir.name[len('user_'):])
+                except ValueError:
+                    continue
+
+                referenced = None
+                for entry in os.scandir(user_dir.path):
+                    if not entry.is_file() or entry.stat().st_mtime >= cutoff:
+                        continue
+                    if referenced is None:
+                        referenced = RetentionService._referenced_paths(user_id)
+                    if os.path.normpath(os.path.relpath(entry.path, upload_folder)) in referenced:
+                        continue
+
+                    stats['orphans_deleted'] += 1
+                    stats['orphan_bytes'] += entry.stat().st_size
+                    if not dry_run:
+                        RetentionService._remove(entry.path)
+
+    @staticmethod
+    def _collect_pdfs(dry_run, stats):
+        """Delete generated PDFs older than RETENTION_PDF_HOURS and cached renders unused for RETENTION_PDF_CACHE_DAYS"""
+        pdf_folder = current_app.config['PDF_FOLDER']
+        hours = current_app.config.get('RETENTION_PDF_HOURS', 24)
+        if hours and os.path.isdir(pdf_folder):
+            RetentionService._collect_pdf_folder(pdf_folder, datetime.now() - timedelta(hours=hours), dry_run, stats)
+
+        # Cache hits refresh a render's mtime, so this only drops renders nobody has asked for
+        cache_folder = os.path.join(pdf_folder, PDFService.CACHE_DIR)
+        days = current_app.config.get('RETENTION_PDF_CACHE_DAYS', 30)
+        if days and os.path.isdir(cache_folder):
+            before = datetime.now() - timedelta(days=days)
+            # Renders from before per-report folders sit directly in the cache folder
+            RetentionService._collect_pdf_folder(cache_folder, before, dry_run, stats)
+            for entry in os.scandir(cache_folder):
+                if entry.is_dir():
+                    RetentionService._collect_pdf_folder(entry.path, before, dry_run, stats)
+                    if not dry_run:
+                        RetentionService._remove_empty_folder(entry.path, before)
+
+    @staticmethod
+    def _collect_pdf_folder(folder, before, dry_run, stats):
+        cutoff = before.timestamp()
+        for entry in os.scandir(folder):
+            # .tmp files are renders a crashed worker never finished
+            if not entry.is_file() or not entry.name.endswith(('.pdf', '.tmp')):
+                continue
+            info = entry.stat()
+            if info.st_mtime >= cutoff:
+                continue
+            stats['pdfs_deleted'] += 1
+            stats['pdf_bytes'] += info.st_size
+            if not dry_run:
+                RetentionService._remove(entry.path)
+
+    @staticmethod
+    def _remove_empty_folder(folder, before):
+        """Remove a report's cache folder once it has been empty since before"""
+        try:
+            if os.stat(folder).st_mtime < before.timestamp() and not os.listdir(folder):
+                os.rmdir(folder)
+        except OSError:
+            # Gone already, or a render just started in it
+            pass
+
+    # Archive
+
+    @staticmethod
+    def _encode(table, row):
+        """JSON-ready dict of a row"""
+        data = {}
+        for column in table.columns:
+            value = row[column.name]
+            data[column.name] = value.isoformat() if isinstance(value, (datetime, date)) else value
+        return data
+
+    @staticmethod
+    def _decode(table, data):
+        """Insertable dict for a row encoded by _encode
+
+        Columns added since the row was archived are left to their defaults
+        and columns dropped since are ignored.
+        """
+        row = {}
+        for column in table.columns:
+            if column.name not in data:
+                continue
+            value = data[column.name]
+            if value is not None and isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif value is not None and isinstance(column.type, Date):
+                value = date.fromisoformat(value)
+            row[column.name] = value
+        return row
+
+    @staticmethod
+    def _apply_metric_deltas(analyses, reports, sign):
+        """Add (sign=1) or remove (sign=-1) rows from the live dashboard counters"""
+        deltas = defaultdict(lambda: defaultdict(int))
+        for analysis in analyses:
+            deltas[analysis['team_id']]['analysis_count'] += sign
+            deltas[analysis['team_id']]['audio_seconds'] += sign * (analysis.get('audio_duration') or 0)
+        for report in reports:
+            counter = 'report_count' if report['status'] == 'finalized' else 'draft_count'
+            deltas[report['team_id']][counter] += sign
+        for team_id, team_deltas in deltas.items():
+            MetricsService.apply_deltas(team_id, **team_deltas)
+
+    @staticmethod
+    def archive_analyses(analysis_ids):
+        """Move analyses, their texts, reports and field values to the archive tables
+
+        Returns:
+            tuple: (analyses archived, reports archived)
+        """
+        analyses_table = CallAnalysis.__table__
+        texts_table = CallAnalysisText.__table__
+        reports_table = Report.__table__
+        values_table = ReportFieldValue.__table__
+
+        analyses = db.session.execute(
+            select(analyses_table).where(analyses_table.c.id.in_(analysis_ids))
+        ).mappings().all()
+        if not analyses:
+            return 0, 0
+        ids = [row['id'] for row in analyses]
+
+        texts = {
+            row['analysis_id']: row
+            for row in db.session.execute(
+                select(texts_table).where(texts_table.c.analysis_id.in_(ids))
+            ).mappings()
+        }
+        reports = db.session.execute(
+            select(reports_table).where(reports_table.c.analysis_id.in_(ids))
+        ).mappings().all()
+        report_ids = [row['id'] for row in reports]
+        values = defaultdict(list)
+        if report_ids:
+            for row in db.session.execute(
+                select(values_table).where(values_table.c.report_id.in_(report_ids)).order_by(values_table.c.id)
+            ).mappings():
+                values[row['report_id']].append(RetentionService._encode(values_table, row))
+
+        now = datetime.utcnow()
+        db.session.execute(insert(ArchivedCallAnalysis.__table__), [
+            {
+                'id': row['id'],
+                'team_id': row['team_id'],
+                'user_id': row['user_id'],
+                'template_id': row['template_id'],
+                'audio_file_path': row['audio_file_path'],
+                'image_file_path': row['image_file_path'],
+                'created_at': row['created_at'],
+                'archived_at': now,
+                'payload': json.dumps({
+                    'analysis': RetentionService._encode(analyses_table, row),
+                    'text': RetentionService._encode(texts_table, texts[row['id']]) if row['id'] in texts else None
+                })
+            }
+            for row in analyses
+        ])
+        if reports:
+            db.session.execute(insert(ArchivedReport.__table__), [
+                {
+                    'id': row['id'],
+                    'analysis_id': row['analysis_id'],
+                    'team_id': row['team_id'],
+                    'user_id': row['user_id'],
+                    'template_id': row['template_id'],
+                    'title': row['title'],
+                    'status': row['status'],
+                    'created_at': row['created_at'],
+                    'archived_at': now,
+                    'payload': json.dumps({
+                        'report': RetentionService._encode(reports_table, row),
+                        'field_values': values[row['id']]
+                    })
+                }
+                for row in reports
+            ])
+
+        # Derived rows go with their reports; they are rebuilt on restore
+        FieldAnalyticsService.invalidate_reports(report_ids)
+        SearchService.remove_reports(report_ids)
+        FieldIndexService.remove_reports(report_ids)
+        if report_ids:
+            db.session.execute(delete(values_table).where(values_table.c.report_id.in_(report_ids)))
+            db.session.execute(delete(reports_table).where(reports_table.c.id.in_(report_ids)))
+        db.session.execute(delete(texts_table).where(texts_table.c.analysis_id.in_(ids)))
+        db.session.execute(delete(analyses_table).where(analyses_table.c.id.in_(ids)))
+
+        # Bulk statements skip the flush hooks
+        RetentionService._apply_metric_deltas(analyses, reports, -1)
+
+        db.session.commit()
+        db.session.expire_all()
+        PDFService.invalidate(report_ids)
+
+        return len(analyses), len(reports)
+
+    @staticmethod
+    def _archive_candidates(team_id, cutoff):
+        """IDs of a team's analyses older than cutoff whose reports haven't changed since"""
+        recent_report = select(Report.id).where(
+            Report.analysis_id == CallAnalysis.id,
+            Report.updated_at >= cutoff
+        )
+        return select(CallAnalysis.id).where(
+            CallAnalysis.team_id == team_id,
+            CallAnalysis.created_at < cutoff,
+            ~exists(recent_report)
+        )
+
+    @staticmethod
+    def _archive_team(team_id, cutoff, dry_run, stats):
+        candidates = RetentionService._archive_candidates(team_id, cutoff)
+
+        if dry_run:
+            stats['analyses_archived'] += db.session.execute(
+                select(func.count()).select_from(candidates.subquery())
+            ).scalar() or 0
+            stats['reports_archived'] += db.session.execute(
+                select(func.count(Report.id)).where(Report.analysis_id.in_(candidates))
+            ).scalar() or 0
+            return
+
+        while True:
+            # Archived rows leave the table, so the first page is always the next one
+            analysis_ids = db.session.execute(
+                candidates.order_by(CallAnalysis.id).limit(RetentionService.BATCH_SIZE)
+            ).scalars().all()
+            if not analysis_ids:
+                break
+            analyses, reports = RetentionService.archive_analyses(analysis_ids)
+            stats['analyses_archived'] += analyses
+            stats['reports_archived'] += reports
+
+    @staticmethod
+    def restore_analysis(analysis_id):
+        """Move an archived analysis and its reports back into the live tables
+
+        Returns:
+            dict: The restored analysis ID and report IDs
+        """
+        archived = db.session.get(ArchivedCallAnalysis, analysis_id)
+        if not archived:
+            raise ValueError("Archived analysis not found")
+        archived_reports = ArchivedReport.query.filter_by(analysis_id=analysis_id).order_by(ArchivedReport.id).all()
+
+        payload = json.loads(archived.payload)
+        analysis = RetentionService._decode(CallAnalysis.__table__, payload['analysis'])
+        # File retention may have moved or removed the files while archived
+        analysis['audio_file_path'] = archived.audio_file_path
+        analysis['image_file_path'] = archived.image_file_path
+        db.session.execute(insert(CallAnalysis.__table__), [analysis])
+        if payload.get('text'):
+            db.session.execute(insert(CallAnalysisText.__table__), [
+                RetentionService._decode(CallAnalysisText.__table__, payload['text'])
+            ])
+
+        reports = []
+        values = []
+        for archived_report in archived_reports:
+            report_payload = json.loads(archived_report.payload)
+            reports.append(RetentionService._decode(Report.__table__, report_payload['report']))
+            values.extend(
+                RetentionService._decode(ReportFieldValue.__table__, value)
+                for value in report_payload['field_values']
+            )
+        if reports:
+            db.session.execute(insert(Report.__table__), reports)
+        if values:
+            db.session.execute(insert(ReportFieldValue.__table__), values)
+
+        for archived_report in archived_reports:
+            db.session.delete(archived_report)
+        db.session.flush()
+        db.session.delete(archived)
+
+        RetentionService._apply_metric_deltas([analysis], reports, 1)
+
+        # Rebuild the derived rows dropped on archive
+        report_ids = [report['id'] for report in reports]
+        if report_ids:
+            FieldValueService.refresh_snapshots(report_ids)
+            for report in Report.query.filter(Report.id.in_(report_ids)):
+                SearchService.index_report(report)
+
+        db.session.commit()
+
+        return {'analysis_id': analysis_id, 'report_ids': report_ids}
+
+    @staticmethod
+    def restore_report(report_id, user_id, team_id):
+        """Restore the archived analysis a report belongs to
+
+        Visibility rules match ReportService.get_reports: owners can restore
+        any report of the team, members only their own.
+        """
+        query = ArchivedReport.query.filter_by(id=report_id, team_id=team_id)
+        if not IdentityService.is_owner(user_id, team_id):
+            query = query.filter(ArchivedReport.user_id == user_id)
+        archived_report = query.first()
+        if not archived_report:
+            raise ValueError("Archived report not found")
+
+        return RetentionService.restore_analysis(archived_report.analysis_id)
+
+    @staticmethod
+    def get_archived_reports(user_id, team_id, page=1, limit=20):
+        """Archived reports of a team, newest first"""
+        query = ArchivedReport.query.filter(ArchivedReport.team_id == team_id)
+        if not IdentityService.is_owner(user_id, team_id):
+            query = query.filter(ArchivedReport.user_id == user_id)
+
+        total = query.count()
+        reports = query.order_by(ArchivedReport.created_at.desc()).offset((page - 1) * limit).limit(limit).all()
+
+        return {
+            'reports': [report.to_dict() for report in reports],
+            'total': total,
+            'page': page,
+            'pages': (total + limit - 1) // limit
+        }
+
+    # Runner
+
+    @staticmethod
+    def run(team_id=None, dry_run=False, steps=None):
+        """Apply retention; with dry_run only count what would be done
+
+        Global steps (pdfs, orphans) only run when no team is given.
+
+        Returns:
+            dict: Counters from STAT_KEYS plus the number of teams processed
+        """
+        steps = set(steps or RetentionService.STEPS)
+        unknown = steps - set(RetentionService.STEPS)
+        if unknown:
+            raise ValueError(f"Unknown retention steps: {', '.join(sorted(unknown))}")
+
+        stats = dict.fromkeys(RetentionService.STAT_KEYS, 0)
+        now = datetime.utcnow()
+
+        if team_id is None:
+            if 'pdfs' in steps:
+                RetentionService._collect_pdfs(dry_run, stats)
+            if 'orphans' in steps:
+                RetentionService._collect_orphans(dry_run, stats)
+
+        team_ids = [team_id] if team_id else [row[0] for row in db.session.query(Team.id).order_by(Team.id)]
+        policy_query = RetentionPolicy.query
+        if team_id:
+            policy_query = policy_query.filter(RetentionPolicy.team_id == team_id)
+        policies = {policy.team_id: policy for policy in policy_query}
+
+        def cutoff(days):
+            return now - timedelta(days=days)
+
+        for current_team_id in team_ids:
+            policy = RetentionService.effective_policy(current_team_id, policies.get(current_team_id))
+
+            if 'audio' in steps:
+                # Deletion first, so nothing is compressed only to be removed
+                if policy['audio_delete_after_days']:
+                    RetentionService._expire_files(
+                        current_team_id, 'audio_file_path', cutoff(policy['audio_delete_after_days']),
+                        dry_run, stats, 'audio_deleted', 'audio_deleted_bytes'
+                    )
+                if policy['audio_cold_after_days']:
+                    delete_days = policy['audio_delete_after_days']
+                    RetentionService._freeze_audio(
+                        current_team_id, cutoff(policy['audio_cold_after_days']), dry_run, stats,
+                        not_before=cutoff(delete_days) if delete_days else None
+                    )
+
+            if 'images' in steps and policy['image_delete_after_days']:
+                RetentionService._expire_files(
+                    current_team_id, 'image_file_path', cutoff(policy['image_delete_after_days']),
+                    dry_run, stats, 'images_deleted', 'image_bytes'
+                )
+
+            if 'archive' in steps and policy['archive_after_days']:
+                RetentionService._archive_team(current_team_id, cutoff(policy['archive_after_days']), dry_run, stats)
+
+        stats['teams'] = len(team_ids)
+        return stats
@@ -0,0 +1,209 @@
+from app import db
+from app.models.rollup import TeamDailyStats, TemplateDailyStats
+from app.models.analysis import CallAnalysis
+from app.models.report import Report
+from app.services.metrics_service import MetricsService
+from sqlalchemy import event, func, inspect, update, insert
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+
+
+class RollupService:
+    MAX_DAYS = 365
+
+    @staticmethod
+    def _day(value):
+        """Normalize a datetime/date/string from the database to a date"""
+        if value is None:
+            return datetime.utcnow().date()
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return date.fromisoformat(str(value)[:10])
+
+    @staticmethod
+    def _upsert(executor, dialect, model, key, deltas):
+        """Add deltas to a rollup row, inserting it if the day has no row yet"""
+        deltas = {name: value for name, value in deltas.items() if value}
+        if not deltas:
+            return
+
+        table = model.__table__
+        condition = [table.c[column] == value for column, value in key.items()]
+        result = executor.execute(
+            update(table).where(*condition).values(
+                **{name: table.c[name] + value for name, value in deltas.items()}
+            )
+        )
+
+        if result.rowcount == 0:
+            # Another writer may insert the same day first; then the deltas are added to its row
+            executor.execute(
+                MetricsService._create_statement(dialect, deltas, table=table, key_columns=tuple(key)).values(**key, **deltas)
+            )
+
+    @staticmethod
+    def apply_deltas(team_id, day, template_id=None, connection=None, analysis_count=0, report_count=0, audio_seconds=0):
+        """Add deltas to a team's (and optionally a template's) daily rollup"""
+        if not team_id:
+            return
+
+        executor = connection if connection is not None else db.session
+        dialect = (connection if connection is not None else db.session.get_bind()).dialect.name
+        day = RollupService._day(day)
+
+        RollupService._upsert(executor, dialect, TeamDailyStats, {'team_id': team_id, 'day': day}, {
+            'analysis_count': analysis_count,
+            'report_count': report_count,
+            'audio_seconds': audio_seconds
+        })
+
+        if template_id:
+            RollupService._upsert(executor, dialect, TemplateDailyStats, {'team_id': team_id, 'day': day, 'template_id': template_id}, {
+                'analysis_count': analysis_count,
+                'report_count': report_count
+            })
+
+    @staticmethod
+    def _collect_deltas(session):
+        """Work out rollup deltas keyed by (team, day, template) for a flush"""
+        deltas = defaultdict(lambda: defaultdict(int))
+
+        for obj in session.new:
+            if isinstance(obj, CallAnalysis):
+                key = (obj.team_id, RollupService._day(obj.created_at), obj.template_id)
+                deltas[key]['analysis_count'] += 1
+                deltas[key]['audio_seconds'] += obj.audio_duration or 0
+            elif isinstance(obj, Report):
+                key = (obj.team_id, RollupService._day(obj.created_at), obj.template_id)
+                deltas[key]['report_count'] += 1
+
+        for obj in session.deleted:
+            if isinstance(obj, CallAnalysis):
+                key = (obj.team_id, RollupService._day(obj.created_at), obj.template_id)
+                deltas[key]['analysis_count'] -= 1
+                deltas[key]['audio_seconds'] -= obj.audio_duration or 0
+            elif isinstance(obj, Report):
+                key = (obj.team_id, RollupService._day(obj.created_at), obj.template_id)
+                deltas[key]['report_count'] -= 1
+
+        for obj in session.dirty:
+            if isinstance(obj, CallAnalysis):
+                history = inspect(obj).attrs.audio_duration.history
+                if history.has_changes():
+                    old = history.deleted[0] if history.deleted else 0
+                    key = (obj.team_id, RollupService._day(obj.created_at), obj.template_id)
+                    deltas[key]['audio_seconds'] += (obj.audio_duration or 0) - (old or 0)
+
+        return deltas
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        """Apply daily rollup deltas for the flushed changes in the same transaction"""
+        deltas = RollupService._collect_deltas(session)
+        if not deltas:
+            return
+
+        connection = session.connection()
+        for (team_id, day, template_id), values in deltas.items():
+            RollupService.apply_deltas(team_id, day, template_id=template_id, connection=connection, **values)
+
+    @staticmethod
+    def register_session_hooks():
+        """Keep the daily rollups in sync with every ORM flush"""
+        if not event.contains(db.session, 'after_flush', RollupService._after_flush):
+            event.listen(db.session, 'after_flush', RollupService._after_flush)
+
+    @staticmethod
+    def get_daily_stats(team_id, days=30):
+        """Range read of a team's daily rollups for the last `days` days"""
+        start_day = (datetime.utcnow() - timedelta(days=days)).date()
+
+        return TeamDailyStats.query.filter(
+            TeamDailyStats.team_id == team_id,
+            TeamDailyStats.day >= start_day
+        ).order_by(TeamDailyStats.day).all()
+
+    @staticmethod
+    def get_template_daily_stats(team_id, days=30):
+        """Range read of a team's per-template daily rollups"""
+        start_day = (datetime.utcnow() - timedelta(days=days)).date()
+
+        return TemplateDailyStats.query.filter(
+            TemplateDailyStats.team_id == team_id,
+            TemplateDailyStats.day >= start_day
+        ).order_by(TemplateDailyStats.day, TemplateDailyStats.template_id).all()
+
+    @staticmethod
+    def backfill(team_id=None, days=None):
+        """Rebuild rollups from the source tables
+
+        Args:
+            team_id: Optional team to restrict the backfill to
+            days: Optional number of trailing days to rebuild (default: all history)
+
+        Returns:
+            int: Number of team-day rows written
+        """
+        start = datetime.utcnow() - timedelta(days=days) if days else None
+        start_day = start.date() if start else None
+        if start is not None:
+            # Whole days are rebuilt, so the range starts at midnight
+            start = datetime.combine(start_day, datetime.min.time())
+
+        def grouped(model, *columns):
+            day_column = func.date(model.created_at)
+            query = db.session.query(model.team_id, day_column, model.template_id, *columns).group_by(
+                model.team_id, day_column, model.template_id
+            )
+            if team_id:
+                query = query.filter(model.team_id == team_id)
+            if start is not None:
+                query = query.filter(model.created_at >= start)
+            return query.all()
+
+        analyses = grouped(
+            CallAnalysis,
+            func.count(CallAnalysis.id),
+            func.coalesce(func.sum(CallAnalysis.audio_duration), 0)
+        )
+        reports = grouped(Report, func.count(Report.id))
+
+        team_rows = defaultdict(lambda: {'analysis_count': 0, 'report_count': 0, 'audio_seconds': 0})
+        template_rows = defaultdict(lambda: {'analysis_count': 0, 'report_count': 0})
+
+        for tid, day, template_id, count, seconds in analyses:
+            day = RollupService._day(day)
+            team_rows[(tid, day)]['analysis_count'] += count
+            team_rows[(tid, day)]['audio_seconds'] += int(seconds or 0)
+            template_rows[(tid, day, template_id)]['analysis_count'] += count
+
+        for tid, day, template_id, count in reports:
+            day = RollupService._day(day)
+            team_rows[(tid, day)]['report_count'] += count
+            template_rows[(tid, day, template_id)]['report_count'] += count
+
+        # Replace the rebuilt range wholesale
+        for model in (TeamDailyStats, TemplateDailyStats):
+            query = model.query
+            if team_id:
+                query = query.filter(model.team_id == team_id)
+            if start_day is not None:
+                query = query.filter(model.day >= start_day)
+            query.delete(synchronize_session=False)
+
+        if team_rows:
+            db.session.execute(insert(TeamDailyStats.__table__), [
+                {'team_id': tid, 'day': day, **values}
+                for (tid, day), values in team_rows.items()
+            ])
+        if template_rows:
+            db.session.execute(insert(TemplateDailyStats.__table__), [
+                {'team_id': tid, 'day': day, 'template_id': template_id, **values}
+                for (tid, day, template_id), values in template_rows.items()
+            ])
+
+        db.session.commit()
+
+        return len(team_rows)
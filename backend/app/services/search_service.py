@@ -0,0 +1,310 @@
+from app import db
+from app.models.search import ReportSearchDocument
+from app.models.report import Report, ReportFieldValue
+from app.models.analysis import CallAnalysisText
+from app.models.template import ReportTemplate, TemplateField
+from app.services.identity_service import IdentityService
+from app.models.user import User
+from sqlalchemy import text, select, literal, or_, Integer, Float
+from sqlalchemy.dialects.mysql import match
+import re
+
+
+class SearchService:
+    SNIPPET_LENGTH = 200
+
+    @staticmethod
+    def _dialect():
+        """Name of the database dialect in use"""
+        return db.session.get_bind().dialect.name
+
+    @staticmethod
+    def build_document_body(report):
+        """Flatten a report's summary, field values and transcription into plain text"""
+        parts = []
+
+        if report.summary:
+            parts.append(report.summary)
+
+        snapshot = report.snapshot_field_values()
+        if snapshot is not None:
+            rows = [(entry['field_label'], entry['value']) for entry in snapshot]
+        else:
+            # Template field labels are looked up in the same query as the values
+            rows = [
+                (field_label or custom_field_name, field_value)
+                for field_label, custom_field_name, field_value in db.session.query(
+                    TemplateField.field_label,
+                    ReportFieldValue.custom_field_name,
+                    ReportFieldValue.field_value
+                ).outerjoin(
+                    TemplateField, TemplateField.id == ReportFieldValue.field_id
+                ).filter(
+                    ReportFieldValue.report_id == report.id
+                )
+            ]
+
+        for label, field_value in rows:
+            if not field_value:
+                continue
+            parts.append(f"{label}: {field_value}" if label else field_value)
+
+        transcription = db.session.query(CallAnalysisText.transcription).filter(
+            CallAnalysisText.analysis_id == report.analysis_id
+        ).scalar()
+        if transcription:
+            parts.append(transcription)
+
+        return '\n'.join(parts)
+
+    @staticmethod
+    def index_report(report):
+        """Create or refresh the search document for a report
+
+        Runs inside the caller's transaction, so the index is committed
+        together with the report change that triggered it.
+        """
+        db.session.flush()
+
+        body = SearchService.build_document_body(report)
+
+        document = db.session.get(ReportSearchDocument, report.id)
+        if not document:
+            document = ReportSearchDocument(report_id=report.id)
+            db.session.add(document)
+
+        document.team_id = report.team_id
+        document.user_id = report.user_id
+        document.status = report.status or 'draft'
+        document.title = report.title or ''
+        document.body = body
+        document.report_created_at = report.created_at
+
+        if SearchService._dialect() == 'sqlite':
+            db.session.execute(
+                text("DELETE FROM report_search_fts WHERE rowid = :report_id"),
+                {'report_id': report.id}
+            )
+            db.session.execute(
+                text("INSERT INTO report_search_fts (rowid, title, body) VALUES (:report_id, :title, :body)"),
+                {'report_id': report.id, 'title': document.title, 'body': body}
+            )
+
+        return document
+
+    @staticmethod
+    def remove_reports(report_ids):
+        """Remove search documents for the given report IDs"""
+        if not report_ids:
+            return
+
+        ReportSearchDocument.query.filter(
+            ReportSearchDocument.report_id.in_(report_ids)
+        ).delete(synchronize_session=False)
+
+        if SearchService._dialect() == 'sqlite':
+            # rowids are bound individually; FTS5 tables don't support expanding IN parameters
+            db.session.execute(
+                text("DELETE FROM report_search_fts WHERE rowid = :report_id"),
+                [{'report_id': report_id} for report_id in report_ids]
+            )
+
+    @staticmethod
+    def update_status(report_ids, status):
+        """Propagate a bulk status change to the search documents"""
+        if not report_ids:
+            return
+
+        ReportSearchDocument.query.filter(
+            ReportSearchDocument.report_id.in_(report_ids)
+        ).update({'status': status}, synchronize_session=False)
+
+    @staticmethod
+    def _fts5_query(query_text):
+        """Every term as a quoted prefix, so user input can't be parsed as FTS5 syntax
+
+        Prefixes keep partial words matching as they did with substring
+        search: "acme" finds "acmecorp", and a half-typed word still matches.
+        """
+        terms = [term.replace('"', '""') for term in query_text.split()]
+        return ' '.join(f'"{term}"*' for term in terms if term)
+
+    # Characters with a meaning in MySQL boolean-mode full-text queries
+    _BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+    @staticmethod
+    def _boolean_query(query_text):
+        """MySQL boolean-mode query requiring every term as a prefix"""
+        terms = SearchService._BOOLEAN_OPERATORS.sub(' ', query_text).split()
+        return ' '.join(f'+{term}*' for term in terms)
+
+    @staticmethod
+    def _scored_matches(query_text):
+        """Subquery of (report_id, score) for documents matching the query
+
+        Higher scores are better on every dialect.
+        """
+        dialect = SearchService._dialect()
+
+        if dialect == 'mysql':
+            relevance = match(
+                ReportSearchDocument.title,
+                ReportSearchDocument.body,
+                against=SearchService._boolean_query(query_text)
+            ).in_boolean_mode()
+            return select(
+                ReportSearchDocument.report_id.label('report_id'),
+                relevance.label('score')
+            ).where(relevance > 0).subquery()
+
+        if dialect == 'sqlite':
+            # bm25() returns lower-is-better values, so negate it
+            return text(
+                "SELECT rowid AS report_id, -bm25(report_search_fts) AS score "
+                "FROM report_search_fts WHERE report_search_fts MATCH :query"
+            ).bindparams(
+                query=SearchService._fts5_query(query_text)
+            ).columns(report_id=Integer, score=Float).subquery()
+
+        # Other databases fall back to a substring scan of the documents
+        pattern = f'%{query_text}%'
+        return select(
+            ReportSearchDocument.report_id.label('report_id'),
+            literal(1.0).label('score')
+        ).where(
+            or_(
+                ReportSearchDocument.title.ilike(pattern),
+                ReportSearchDocument.body.ilike(pattern)
+            )
+        ).subquery()
+
+    @staticmethod
+    def matching_report_ids(query_text):
+        """Selectable of report IDs matching the query, for use in IN filters"""
+        scored = SearchService._scored_matches(query_text)
+        return select(scored.c.report_id)
+
+    @staticmethod
+    def _snippet(body, query_text):
+        """Short excerpt of the body around the first matching term"""
+        if not body:
+            return ''
+
+        lowered = body.lower()
+        position = -1
+        for term in query_text.lower().split():
+            position = lowered.find(term)
+            if position != -1:
+                break
+
+        start = max(position - SearchService.SNIPPET_LENGTH // 4, 0) if position != -1 else 0
+        snippet = body[start:start + SearchService.SNIPPET_LENGTH].replace('\n', ' ')
+
+        if start > 0:
+            snippet = '...' + snippet
+        if start + SearchService.SNIPPET_LENGTH < len(body):
+            snippet = snippet + '...'
+
+        return snippet
+
+    @staticmethod
+    def search_reports(user_id, team_id, query_text, page=1, limit=20, status=None):
+        """Ranked full-text search over a team's reports
+
+        Visibility rules match ReportService.get_reports:
+        - Owner can see all reports in the team
+        - Team members can only see their own reports
+        """
+        query_text = (query_text or '').strip()
+        if not query_text:
+            raise ValueError("Search query is required")
+
+        if not team_id:
+            return {
+                'reports': [],
+                'total': 0,
+                'page': page,
+                'pages': 0
+            }
+
+        scored = SearchService._scored_matches(query_text)
+
+        query = db.session.query(
+            ReportSearchDocument,
+            scored.c.score
+        ).join(
+            scored, scored.c.report_id == ReportSearchDocument.report_id
+        ).filter(
+            ReportSearchDocument.team_id == team_id
+        )
+
+        if not IdentityService.is_owner(user_id, team_id):
+            query = query.filter(ReportSearchDocument.user_id == user_id)
+
+        if status:
+            query = query.filter(ReportSearchDocument.status == status)
+
+        total = query.count()
+        rows = query.order_by(
+            scored.c.score.desc(),
+            ReportSearchDocument.report_created_at.desc()
+        ).offset((page - 1) * limit).limit(limit).all()
+
+        # Load the matching reports with their template and creator in one query
+        report_ids = [document.report_id for document, _ in rows]
+        report_rows = db.session.query(Report, ReportTemplate.name, User.first_name, User.last_name).outerjoin(
+            ReportTemplate, ReportTemplate.id == Report.template_id
+        ).outerjoin(
+            User, User.id == Report.user_id
+        ).filter(
+            Report.id.in_(report_ids)
+        ).all() if report_ids else []
+        reports_by_id = {row[0].id: row for row in report_rows}
+
+        results = []
+        for document, score in rows:
+            row = reports_by_id.get(document.report_id)
+            if not row:
+                continue
+            report, template_name, first_name, last_name = row
+
+            report_dict = report.to_dict()
+            report_dict['template_name'] = template_name or 'Unknown'
+            report_dict['created_by'] = f"{first_name} {last_name}" if first_name is not None else 'Unknown'
+            report_dict['score'] = round(float(score or 0), 4)
+            report_dict['snippet'] = SearchService._snippet(document.body, query_text)
+            results.append(report_dict)
+
+        return {
+            'reports': results,
+            'total': total,
+            'page': page,
+            'pages': (total + limit - 1) // limit
+        }
+
+    @staticmethod
+    def reindex_all(team_id=None, batch_size=500):
+        """Rebuild search documents for every report (optionally for one team)
+
+        Returns:
+            int: Number of reports indexed
+        """
+        query = Report.query.order_by(Report.id)
+        if team_id:
+            query = query.filter(Report.team_id == team_id)
+
+        indexed = 0
+        last_id = 0
+        while True:
+            batch = query.filter(Report.id > last_id).limit(batch_size).all()
+            if not batch:
+                break
+
+            for report in batch:
+                SearchService.index_report(report)
+                indexed += 1
+
+            last_id = batch[-1].id
+            db.session.commit()
+
+        return indexed
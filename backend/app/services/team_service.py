@@ -2,6 +2,8 @@ from app import db
 from app.models.team import Team, TeamMember, TeamInvitation
 from app.models.user import User
 from app.services.email_service import EmailService
+from app.services.activity_service import ActivityService
+from app.services.identity_service import IdentityService
 from flask import current_app
 from datetime import datetime, timedelta
 
@@ -32,10 +34,8 @@ class TeamService:
     @staticmethod
     def get_user_team(user_id):
         """Get the team for a user"""
-        team_member = TeamMember.query.filter_by(user_id=user_id).first()
-        if not team_member:
-            return None
-        return Team.query.get(team_member.team_id)
+        team_id = IdentityService.primary_team_id(user_id)
+        return db.session.get(Team, team_id) if team_id else None
 
     @staticmethod
     def get_team_members(team_id):
@@ -92,16 +92,16 @@ class TeamService:
 
         invitation_link = f"{current_app.config['FRONTEND_URL']}/register?token={invitation.invitation_token}"
 
-        # Send invitation email (don't fail if email service is not configured)
+        # Queue invitation email (don't fail if email service is not configured)
         try:
-            if current_app.config.get('MAIL_USERNAME') and current_app.config.get('MAIL_PASSWORD'):
+            if EmailService.is_configured():
                 EmailService.send_team_invitation(
                     email=email,
                     team_name=team.name,
                     inviter_name=inviter_name,
                     invitation_link=invitation_link
                 )
-                print(f"Invitation email sent successfully to {email}")
+                print(f"Invitation email queued for {email}")
             else:
                 print(f"SMTP email service not configured. Invitation link: {invitation_link}")
         except Exception as e:
@@ -152,6 +152,7 @@ class TeamService:
 
         # Update invitation status
         invitation.status = 'accepted'
+        ActivityService.record(invitation.team_id, 'member_joined', user_id, 'team', invitation.team_id, invitation.team.name)
 
         # Flush to ensure the team member is added before committing
         db.session.flush()
@@ -256,16 +257,16 @@ class TeamService:
 
         invitation_link = f"{current_app.config['FRONTEND_URL']}/register?token={invitation.invitation_token}"
 
-        # Send invitation email (don't fail if email service is not configured)
+        # Queue invitation email (don't fail if email service is not configured)
         try:
-            if current_app.config.get('MAIL_USERNAME') and current_app.config.get('MAIL_PASSWORD'):
+            if EmailService.is_configured():
                 EmailService.send_team_invitation(
                     email=invitation.email,
                     team_name=team.name,
                     inviter_name=inviter_name,
                     invitation_link=invitation_link
                 )
-                print(f"Resent invitation email to {invitation.email}")
+                print(f"Invitation email queued again for {invitation.email}")
             else:
                 print(f"SMTP email service not configured. Invitation link: {invitation_link}")
         except Exception as e:
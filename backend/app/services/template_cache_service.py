@@ -0,0 +1,174 @@
+from app import db
+from app.models.template import ReportTemplate
+from app.models.team import Team, TeamMember
+from app.models.user import User
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, select, update, or_
+import copy
+import threading
+import time
+
+
+class TemplateCacheService:
+    """Cache of each user's template listing
+
+    A listing depends on the user's own templates and on the shared
+    templates of every team they belong to. Entries are keyed by the
+    user's template_version and the template_version of each of their
+    teams, read from the database before every lookup. Creating, editing or
+    deleting a template bumps its team and its creator in the same
+    transaction, and a membership change changes the team set, so once the
+    change commits no worker serves the old listing. Field edits always
+    move the template to a new revision, so they are seen as template
+    changes too. Renaming a user bumps every team they belong to or own,
+    since creator names appear in other users' listings.
+    """
+    MAX_ENTRIES = 5000
+
+    _lock = threading.Lock()
+    _entries = {}  # user_id -> (key, expires_at, templates)
+    _generation = 0
+
+    @staticmethod
+    def _ttl():
+        if not has_app_context():
+            return 0
+        return current_app.config.get('TEMPLATE_CACHE_TTL', 300)
+
+    @staticmethod
+    def cache_key(user_id, team_ids):
+        """Version key for a user's listing over the given team set"""
+        user_version = db.session.execute(
+            select(User.template_version).where(User.id == user_id)
+        ).scalar()
+        team_versions = db.session.execute(
+            select(Team.id, Team.template_version).where(Team.id.in_(list(team_ids))).order_by(Team.id)
+        ).all() if team_ids else []
+
+        with TemplateCacheService._lock:
+            generation = TemplateCacheService._generation
+        return generation, user_version, tuple((team_id, version) for team_id, version in team_versions)
+
+    @staticmethod
+    def get(user_id, key):
+        """Cached listing for the key, or None"""
+        if TemplateCacheService._ttl() <= 0:
+            return None
+
+        with TemplateCacheService._lock:
+            entry = TemplateCacheService._entries.get(user_id)
+
+        if entry and entry[0] == key and entry[1] > time.monotonic():
+            return copy.deepcopy(entry[2])
+        return None
+
+    @staticmethod
+    def set(user_id, key, templates):
+        """Store a listing under the key it was built for
+
+        A listing built while a template changed carries the old versions,
+        so it is never served once the change commits.
+        """
+        ttl = TemplateCacheService._ttl()
+        if ttl <= 0:
+            return
+
+        with TemplateCacheService._lock:
+            if len(TemplateCacheService._entries) >= TemplateCacheService.MAX_ENTRIES:
+                TemplateCacheService._entries.clear()
+            TemplateCacheService._entries[user_id] = (key, time.monotonic() + ttl, copy.deepcopy(templates))
+
+    @staticmethod
+    def invalidate(connection, team_ids=(), user_ids=(), renamed_user_ids=()):
+        """Bump the versions of teams and creators whose templates changed
+
+        Runs on the caller's connection, so the bump commits or rolls back
+        with the change. Teams a renamed user belongs to or owns are bumped
+        as well. updated_at is kept, as the rows themselves did not change.
+        """
+        team_ids = {team_id for team_id in team_ids if team_id is not None}
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        renamed_user_ids = set(renamed_user_ids)
+
+        teams = Team.__table__
+        team_conditions = []
+        if team_ids:
+            team_conditions.append(teams.c.id.in_(team_ids))
+        if renamed_user_ids:
+            team_conditions.append(teams.c.owner_id.in_(renamed_user_ids))
+            team_conditions.append(teams.c.id.in_(
+                select(TeamMember.team_id).where(TeamMember.user_id.in_(renamed_user_ids))
+            ))
+        if team_conditions:
+            connection.execute(
+                update(teams).where(or_(*team_conditions)).values(
+                    template_version=teams.c.template_version + 1,
+                    updated_at=teams.c.updated_at
+                )
+            )
+
+        user_ids |= renamed_user_ids
+        if user_ids:
+            users = User.__table__
+            connection.execute(
+                update(users).where(users.c.id.in_(user_ids)).values(
+                    template_version=users.c.template_version + 1,
+                    updated_at=users.c.updated_at
+                )
+            )
+
+    @staticmethod
+    def clear():
+        """Drop every cached listing"""
+        with TemplateCacheService._lock:
+            TemplateCacheService._generation += 1
+            TemplateCacheService._entries.clear()
+
+    @staticmethod
+    def _changes(session):
+        """(team_ids, user_ids, renamed_user_ids) affected by the pending flush"""
+        team_ids, user_ids, renamed_user_ids = set(), set(), set()
+
+        for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+            if isinstance(obj, ReportTemplate):
+                team_ids.add(obj.team_id)
+                user_ids.add(obj.created_by)
+                history = inspect(obj).attrs.team_id.history
+                team_ids.update(history.deleted or ())
+            elif isinstance(obj, User) and obj in session.dirty:
+                state = inspect(obj)
+                if state.attrs.first_name.history.has_changes() or state.attrs.last_name.history.has_changes():
+                    renamed_user_ids.add(obj.id)
+
+        return team_ids, user_ids, renamed_user_ids
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        team_ids, user_ids, renamed_user_ids = TemplateCacheService._changes(session)
+        if not (team_ids or user_ids or renamed_user_ids):
+            return
+
+        TemplateCacheService.invalidate(session.connection(), team_ids, user_ids, renamed_user_ids)
+        session.info['template_cache_changed'] = True
+
+    @staticmethod
+    def _after_commit(session):
+        session.info.pop('template_cache_changed', None)
+
+    @staticmethod
+    def _after_rollback(session, previous_transaction):
+        # Listings built inside the rolled-back transaction carry versions that will be reused
+        if session.info.pop('template_cache_changed', None):
+            TemplateCacheService.clear()
+
+    @staticmethod
+    def register_session_hooks():
+        """Invalidate cached listings whenever templates or creator names change"""
+        hooks = (
+            ('after_flush', TemplateCacheService._after_flush),
+            ('after_commit', TemplateCacheService._after_commit),
+            ('after_soft_rollback', TemplateCacheService._after_rollback)
+        )
+        for name, hook in hooks:
+            if not event.contains(db.session, name, hook):
+                event.listen(db.session, name, hook)
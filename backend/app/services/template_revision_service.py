@@ -0,0 +1,149 @@
+from app import db
+from app.models.template import ReportTemplate, TemplateRevision, TemplateField
+from sqlalchemy import insert, func
+from datetime import datetime
+import copy
+import json
+import threading
+
+
+class TemplateRevisionService:
+    """Template revisions and the per-revision caches built on them
+
+    A revision never changes once written, so anything derived from one
+    (its field list, the prompt's field descriptions, the validation index)
+    is cached per process without any invalidation.
+    """
+    MAX_ENTRIES = 2000
+
+    _lock = threading.Lock()
+    _entries = {}  # (revision_id, kind) -> value
+
+    # Attributes that define a field; used to detect edits that change nothing
+    FIELD_KEYS = ('field_name', 'field_label', 'field_type', 'field_options', 'is_required', 'display_order')
+
+    @staticmethod
+    def _options(field_data):
+        """Options as TemplateField.set_options would store them"""
+        if field_data.get('field_type') not in ['dropdown', 'multi_select']:
+            return None
+        options = field_data.get('field_options', [])
+        if not options:
+            return None
+        return options if isinstance(options, list) else json.dumps(options)
+
+    @staticmethod
+    def _normalize(fields):
+        """Comparable form of a list of field definitions"""
+        normalized = []
+        for field_data in fields:
+            normalized.append((
+                field_data.get('field_name'),
+                field_data.get('field_label'),
+                field_data.get('field_type'),
+                json.dumps(TemplateRevisionService._options(field_data)),
+                bool(field_data.get('is_required', False)),
+                field_data.get('display_order')
+            ))
+        return sorted(normalized, key=lambda item: (item[5] is None, item[5] or 0, item[0] or ''))
+
+    @staticmethod
+    def same_fields(revision_id, fields):
+        """Whether a revision already has exactly these field definitions"""
+        if not revision_id:
+            return False
+        current = [
+            {key: field[key] for key in TemplateRevisionService.FIELD_KEYS}
+            for field in TemplateRevisionService._cached_fields(revision_id)
+        ]
+        return TemplateRevisionService._normalize(current) == TemplateRevisionService._normalize(fields)
+
+    @staticmethod
+    def create_revision(template, fields, user_id):
+        """Add a revision with the given fields and make it the template's current one
+
+        Args:
+            template: ReportTemplate (must already have an ID)
+            fields: List of field definitions as sent by the client
+            user_id: User making the change
+
+        Returns:
+            TemplateRevision: The new revision
+        """
+        last_number = db.session.query(func.max(TemplateRevision.revision_number)).filter(
+            TemplateRevision.template_id == template.id
+        ).scalar() or 0
+
+        revision = TemplateRevision(
+            template_id=template.id,
+            revision_number=last_number + 1,
+            created_by=user_id
+        )
+        db.session.add(revision)
+        db.session.flush()  # Get revision ID
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                'template_id': template.id,
+                'revision_id': revision.id,
+                'field_name': field_data.get('field_name'),
+                'field_label': field_data.get('field_label'),
+                'field_type': field_data.get('field_type'),
+                'field_options': TemplateRevisionService._options(field_data),
+                'is_required': field_data.get('is_required', False),
+                'display_order': field_data.get('display_order'),
+                'created_at': now
+            }
+            for field_data in fields
+        ]
+        if rows:
+            db.session.execute(insert(TemplateField.__table__), rows)
+
+        template.current_revision_id = revision.id
+        # The field list follows current_revision_id; reload it on next access
+        db.session.expire(template, ['fields', 'current_revision'])
+
+        return revision
+
+    @staticmethod
+    def current_revision_id(template_id):
+        """The template's current revision ID"""
+        return db.session.query(ReportTemplate.current_revision_id).filter(
+            ReportTemplate.id == template_id
+        ).scalar()
+
+    @staticmethod
+    def memo(revision_id, kind, builder):
+        """Value derived from a revision, built once per process"""
+        key = (revision_id, kind)
+        with TemplateRevisionService._lock:
+            if key in TemplateRevisionService._entries:
+                return TemplateRevisionService._entries[key]
+
+        value = builder()
+
+        with TemplateRevisionService._lock:
+            if len(TemplateRevisionService._entries) >= TemplateRevisionService.MAX_ENTRIES:
+                TemplateRevisionService._entries.clear()
+            TemplateRevisionService._entries[key] = value
+        return value
+
+    @staticmethod
+    def _cached_fields(revision_id):
+        """Shared field dicts of a revision; callers must not modify them"""
+        if not revision_id:
+            return ()
+
+        def load():
+            fields = TemplateField.query.filter_by(revision_id=revision_id).order_by(
+                TemplateField.display_order, TemplateField.id
+            ).all()
+            return tuple(field.to_dict() for field in fields)
+
+        return TemplateRevisionService.memo(revision_id, 'fields', load)
+
+    @staticmethod
+    def get_fields(revision_id):
+        """Field dicts of a revision, in display order"""
+        return copy.deepcopy(list(TemplateRevisionService._cached_fields(revision_id)))
@@ -1,36 +1,33 @@
 from app import db
-from app.models.template import ReportTemplate, TemplateField
+from app.models.template import ReportTemplate
 from app.models.team import Team, TeamMember
 from app.models.user import User
+from app.services.activity_service import ActivityService
+from app.services.identity_service import IdentityService
+from app.services.template_cache_service import TemplateCacheService
+from app.services.template_revision_service import TemplateRevisionService
 from sqlalchemy.orm import joinedload
-from sqlalchemy import desc
+from sqlalchemy import desc, or_, and_
 
 
 class TemplateService:
     @staticmethod
     def get_user_team(user_id):
         """Get the user's team (either owned or member of)"""
-        # Check if user owns a team
-        team = Team.query.filter_by(owner_id=user_id).first()
-
-        if team:
-            print(f"[DEBUG] User {user_id} owns team {team.id} ({team.name})")
-        else:
-            # Check all team memberships for debugging
-            all_memberships = TeamMember.query.filter_by(user_id=user_id).all()
-            print(f"[DEBUG] User {user_id} has {len(all_memberships)} team memberships")
-            for m in all_memberships:
-                print(f"[DEBUG]   - team_id={m.team_id}, role={m.role}")
-
-            # Check if user is a member of a team
-            team_member = TeamMember.query.filter_by(user_id=user_id).first()
-            if team_member:
-                team = Team.query.get(team_member.team_id)
-                print(f"[DEBUG] User {user_id} is member of team {team.id} ({team.name}) with role {team_member.role}")
-            else:
-                print(f"[DEBUG] User {user_id} has no team membership")
+        team_id = IdentityService.home_team_id(user_id)
+        return db.session.get(Team, team_id) if team_id else None
 
-        return team
+    @staticmethod
+    def get_or_create_team_id(user_id):
+        """Get the ID of the user's team, creating a team if they have none
+
+        Served from the identity cache, so the common case runs no queries.
+        """
+        team_id = IdentityService.home_team_id(user_id)
+        if team_id:
+            return team_id
+
+        return TemplateService.get_or_create_team(user_id).id
 
     @staticmethod
     def get_or_create_team(user_id):
@@ -45,6 +42,7 @@ class TemplateService:
                 owner_id=user_id
             )
             db.session.add(team)
+            db.session.flush()  # Get team ID
 
             # Add user as team member
             team_member = TeamMember(
@@ -60,75 +58,67 @@ class TemplateService:
     @staticmethod
     def get_all_user_team_ids(user_id):
         """Get all team IDs the user is part of (owned + member of)"""
-        team_ids = set()
+        return IdentityService.team_ids(user_id)
 
-        # Get team the user owns
-        owned_team = Team.query.filter_by(owner_id=user_id).first()
-        if owned_team:
-            team_ids.add(owned_team.id)
-
-        # Get all teams user is a member of
-        memberships = TeamMember.query.filter_by(user_id=user_id).all()
-        for membership in memberships:
-            team_ids.add(membership.team_id)
-
-        return list(team_ids)
+    @staticmethod
+    def _creator_names(user_ids):
+        """Display names for template creators in one query"""
+        if not user_ids:
+            return {}
+        return {
+            user_id: f"{first_name} {last_name}"
+            for user_id, first_name, last_name in db.session.query(
+                User.id, User.first_name, User.last_name
+            ).filter(User.id.in_(user_ids))
+        }
 
     @staticmethod
     def get_all_templates(user_id):
-        """Get all templates for user - own templates + shared templates from ALL teams"""
+        """Get all templates for user - own templates + shared templates from ALL teams
+
+        Served from TemplateCacheService when nothing relevant changed;
+        otherwise built with one template query and one creator-name query.
+        """
         # Ensure user has at least one team
-        team = TemplateService.get_or_create_team(user_id)
+        TemplateService.get_or_create_team_id(user_id)
 
         # Get ALL teams the user is part of
         all_team_ids = TemplateService.get_all_user_team_ids(user_id)
 
-        print(f"[DEBUG] get_all_templates called for user_id={user_id}")
-        print(f"[DEBUG] User is part of teams: {all_team_ids}")
+        cache_key = TemplateCacheService.cache_key(user_id, all_team_ids)
+        cached = TemplateCacheService.get(user_id, cache_key)
+        if cached is not None:
+            return cached
 
-        # Get user's own templates
-        own_templates = ReportTemplate.query.filter_by(
-            created_by=user_id,
-            is_active=True
-        ).options(
-            joinedload(ReportTemplate.fields)
-        ).order_by(desc(ReportTemplate.created_at)).all()
-
-        print(f"[DEBUG] Found {len(own_templates)} own templates for user {user_id}")
-
-        # Get templates shared by other team members from ALL teams user is part of
+        # Own templates plus templates shared by other members of the user's teams
         # Use .is_(True) for proper boolean comparison in SQLAlchemy with MySQL
-        shared_templates = ReportTemplate.query.filter(
-            ReportTemplate.team_id.in_(all_team_ids),
-            ReportTemplate.created_by != user_id,
-            ReportTemplate.shared_with_team.is_(True),
-            ReportTemplate.is_active.is_(True)
+        templates = ReportTemplate.query.filter(
+            ReportTemplate.is_active.is_(True),
+            or_(
+                ReportTemplate.created_by == user_id,
+                and_(
+                    ReportTemplate.team_id.in_(all_team_ids),
+                    ReportTemplate.shared_with_team.is_(True)
+                )
+            )
         ).options(
             joinedload(ReportTemplate.fields)
         ).order_by(desc(ReportTemplate.created_at)).all()
 
-        print(f"[DEBUG] Found {len(shared_templates)} shared templates from all teams")
-
-        # Debug: show all templates in user's teams
-        all_team_templates = ReportTemplate.query.filter(
-            ReportTemplate.team_id.in_(all_team_ids),
-            ReportTemplate.is_active.is_(True)
-        ).all()
-        for t in all_team_templates:
-            print(f"[DEBUG] Team template: id={t.id}, name={t.name}, created_by={t.created_by}, shared={t.shared_with_team}, team_id={t.team_id}")
+        # Own templates first, each group newest first
+        own_templates = [t for t in templates if t.created_by == user_id]
+        shared_templates = [t for t in templates if t.created_by != user_id]
+        all_templates = own_templates + shared_templates
 
-        # Combine and remove duplicates (prioritize own templates)
-        own_ids = {t.id for t in own_templates}
-        all_templates = own_templates + [t for t in shared_templates if t.id not in own_ids]
+        creator_names = TemplateService._creator_names({t.created_by for t in all_templates})
 
         result = []
         for template in all_templates:
             # Include fields in the list view for display
             template_dict = template.to_dict(include_fields=True)
             # Add creator name
-            creator = User.query.get(template.created_by)
-            if creator:
-                template_dict['created_by_name'] = f"{creator.first_name} {creator.last_name}"
+            if template.created_by in creator_names:
+                template_dict['created_by_name'] = creator_names[template.created_by]
             # Add permission flag - only creator can edit/delete
             is_owner = template.created_by == user_id
             template_dict['can_edit'] = is_owner
@@ -136,6 +126,8 @@ class TemplateService:
             template_dict['is_shared'] = not is_owner and template.shared_with_team
             result.append(template_dict)
 
+        TemplateCacheService.set(user_id, cache_key, result)
+
         return result
 
     @staticmethod
@@ -188,7 +180,7 @@ class TemplateService:
     @staticmethod
     def create_template(user_id, name, description, fields, shared_with_team=False):
         """Create a new template"""
-        team = TemplateService.get_or_create_team(user_id)
+        team_id = TemplateService.get_or_create_team_id(user_id)
 
         # Validate fields
         if not fields or len(fields) == 0:
@@ -199,28 +191,16 @@ class TemplateService:
             name=name,
             description=description,
             created_by=user_id,
-            team_id=team.id,
+            team_id=team_id,
             shared_with_team=shared_with_team
         )
         db.session.add(template)
         db.session.flush()  # Get template ID
 
-        # Create fields
-        for field_data in fields:
-            field = TemplateField(
-                template_id=template.id,
-                field_name=field_data.get('field_name'),
-                field_label=field_data.get('field_label'),
-                field_type=field_data.get('field_type'),
-                is_required=field_data.get('is_required', False),
-                display_order=field_data.get('display_order')
-            )
-
-            # Set options for dropdown and multi_select fields
-            if field_data.get('field_type') in ['dropdown', 'multi_select']:
-                field.set_options(field_data.get('field_options', []))
+        # Fields live in the template's first revision
+        TemplateRevisionService.create_revision(template, fields, user_id)
 
-            db.session.add(field)
+        ActivityService.record(template.team_id, 'template_created', user_id, 'template', template.id, template.name)
 
         db.session.commit()
 
@@ -257,27 +237,9 @@ class TemplateService:
         if shared_with_team is not None:
             template.shared_with_team = shared_with_team
 
-        # Update fields if provided
-        if fields is not None:
-            # Delete existing fields
-            TemplateField.query.filter_by(template_id=template_id).delete()
-
-            # Create new fields
-            for field_data in fields:
-                field = TemplateField(
-                    template_id=template.id,
-                    field_name=field_data.get('field_name'),
-                    field_label=field_data.get('field_label'),
-                    field_type=field_data.get('field_type'),
-                    is_required=field_data.get('is_required', False),
-                    display_order=field_data.get('display_order')
-                )
-
-                # Set options for dropdown and multi_select fields
-                if field_data.get('field_type') in ['dropdown', 'multi_select']:
-                    field.set_options(field_data.get('field_options', []))
-
-                db.session.add(field)
+        # Changed fields become a new revision; existing reports keep pointing at the old one
+        if fields is not None and not TemplateRevisionService.same_fields(template.current_revision_id, fields):
+            TemplateRevisionService.create_revision(template, fields, user_id)
 
         db.session.commit()
 
@@ -403,17 +365,9 @@ class TemplateService:
         db.session.add(template)
         db.session.flush()
 
-        # Create fields
-        for field_data in default_fields:
-            field = TemplateField(
-                template_id=template.id,
-                field_name=field_data['field_name'],
-                field_label=field_data['field_label'],
-                field_type=field_data['field_type'],
-                is_required=field_data['is_required'],
-                display_order=field_data['display_order']
-            )
-            db.session.add(field)
+        TemplateRevisionService.create_revision(template, default_fields, user_id)
+
+        ActivityService.record(template.team_id, 'template_created', user_id, 'template', template.id, template.name)
 
         db.session.commit()
 
@@ -0,0 +1,96 @@
+"""
+Local SMTP sink for development and testing
+
+Accepts every message (and any AUTH credentials) and writes it to a
+folder as an .eml file instead of delivering it. Point the app at it with:
+
+    MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=False MAIL_USE_AUTH=False
+
+and run `flask outbox sink`.
+"""
+from datetime import datetime
+import itertools
+import os
+import socketserver
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    """One SMTP session: just enough of RFC 5321 for smtplib"""
+
+    def _reply(self, *lines):
+        # Multi-line replies use 'code-text' on every line but the last
+        for index, (code, text) in enumerate(lines):
+            separator = ' ' if index == len(lines) - 1 else '-'
+            self.wfile.write(f"{code}{separator}{text}\r\n".encode('utf-8'))
+
+    def _read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                return b''.join(lines)
+            # Undo dot-stuffing
+            lines.append(line[1:] if line.startswith(b'..') else line)
+
+    def handle(self):
+        self._reply((220, 'voice_flow SMTP sink'))
+        mail_from, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+
+            if verb == 'EHLO':
+                self._reply((250, 'localhost'), (250, 'AUTH PLAIN LOGIN'), (250, '8BITMIME'))
+            elif verb == 'HELO':
+                self._reply((250, 'localhost'))
+            elif verb == 'AUTH':
+                if command.upper().startswith('AUTH LOGIN') and len(command.split()) < 3:
+                    self._reply((334, 'VXNlcm5hbWU6'))
+                    self.rfile.readline()
+                    self._reply((334, 'UGFzc3dvcmQ6'))
+                    self.rfile.readline()
+                self._reply((235, 'Authentication successful'))
+            elif verb == 'MAIL':
+                mail_from, recipients = command.split(':', 1)[-1].strip(), []
+                self._reply((250, 'OK'))
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[-1].strip().strip('<>'))
+                self._reply((250, 'OK'))
+            elif verb == 'DATA':
+                self._reply((354, 'End data with <CR><LF>.<CR><LF>'))
+                path = self.server.save(mail_from, recipients, self._read_data())
+                mail_from, recipients = None, []
+                self._reply((250, f"OK saved {os.path.basename(path)}"))
+            elif verb == 'RSET':
+                mail_from, recipients = None, []
+                self._reply((250, 'OK'))
+            elif verb == 'NOOP':
+                self._reply((250, 'OK'))
+            elif verb == 'QUIT':
+                self._reply((221, 'Bye'))
+                return
+            else:
+                self._reply((502, 'Command not implemented'))
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """SMTP server that saves every message it receives to a folder"""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host, port, folder):
+        super().__init__((host, port), _SinkHandler)
+        self.folder = folder
+        self._counter = itertools.count(1)
+        os.makedirs(folder, exist_ok=True)
+
+    def save(self, mail_from, recipients, data):
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(self.folder, f"{stamp}_{next(self._counter)}.eml")
+        with open(path, 'wb') as handle:
+            handle.write(data)
+        print(f"Received {len(data)} bytes from {mail_from} for {', '.join(recipients)} -> {path}")
+        return path
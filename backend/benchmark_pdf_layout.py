@@ -0,0 +1,118 @@
+"""
+PDF Layout Benchmark
+Renders reports with growing transcripts and checks that render time grows
+linearly with transcript size. Exits non-zero if the time per word at the
+largest size is more than --max-ratio times that at the smallest.
+
+Usage:
+    python benchmark_pdf_layout.py [--words 5000 10000 20000 40000 80000] [--runs 3] [--compare]
+
+--compare also times the old layout (the whole transcript in one Paragraph)
+for sizes up to --compare-max-words, which gets slow quickly.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+parser = argparse.ArgumentParser(description='Time report PDF layout against transcript size')
+parser.add_argument('--words', type=int, nargs='+', default=[5000, 10000, 20000, 40000, 80000],
+                    help='Transcript sizes to render, in words')
+parser.add_argument('--runs', type=int, default=3, help='Renders per size (best time is kept)')
+parser.add_argument('--max-ratio', type=float, default=2.0,
+                    help='Allowed growth of time per word between the smallest and largest size')
+parser.add_argument('--compare', action='store_true', help='Also time the single-Paragraph layout')
+parser.add_argument('--compare-max-words', type=int, default=20000,
+                    help='Largest size rendered with the single-Paragraph layout')
+args = parser.parse_args()
+
+from reportlab.platypus import SimpleDocTemplate, Paragraph
+from reportlab.lib.pagesizes import letter
+from app.services.pdf_service import PDFService, _NORMAL_STYLE
+
+WORDS = ['customer', 'called', 'about', 'the', 'invoice', 'and', 'asked', 'whether', 'refund',
+         'could', 'be', 'processed', 'today', 'agent', 'confirmed', 'account', 'details', 'before']
+
+
+def transcript(words):
+    """Whisper-like transcript: sentences, no line breaks"""
+    rng = random.Random(words)
+    sentences = []
+    count = 0
+    while count < words:
+        length = rng.randint(6, 18)
+        sentence = ' '.join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence.capitalize() + '.')
+        count += length
+    return ' '.join(sentences)
+
+
+def report_data(text):
+    return {
+        'id': 1,
+        'title': 'Benchmark <Report> & Co',
+        'status': 'finalized',
+        'created_at': '2026-10-18T12:00:00',
+        'created_by': {'name': 'Bench Mark'},
+        'template': {'name': 'Benchmark'},
+        'summary': 'Synthetic report used to time PDF layout.',
+        'field_values': [{'field_label': 'Sentiment', 'value': 'Positive'}],
+        'custom_fields': [],
+        'transcription': text
+    }
+
+
+def best_of(render, runs):
+    """Best-of-N wall time in seconds"""
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        render()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def legacy_render(text, path):
+    """The old layout: the whole transcript as one Paragraph"""
+    doc = SimpleDocTemplate(path, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    doc.build([Paragraph(text, _NORMAL_STYLE)])
+
+
+print("=" * 60)
+print("PDF Layout Benchmark")
+print("=" * 60)
+
+results = []
+with tempfile.TemporaryDirectory() as folder:
+    path = os.path.join(folder, 'report.pdf')
+    for words in sorted(args.words):
+        text = transcript(words)
+        seconds = best_of(lambda: PDFService._build(report_data(text), path), args.runs)
+        pages_kb = os.path.getsize(path) // 1024
+        line = f"   {words:>7} words: {seconds * 1000:8.0f} ms  ({seconds * 1e6 / words:6.1f} µs/word, {pages_kb} KB)"
+
+        if args.compare and words <= args.compare_max_words:
+            legacy = best_of(lambda: legacy_render(text, path), 1)
+            line += f"  | single Paragraph: {legacy * 1000:8.0f} ms"
+        print(line)
+        results.append((words, seconds))
+
+print("\n" + "=" * 60)
+if len(results) < 2:
+    print("Need at least two sizes to check growth")
+    sys.exit(0)
+
+smallest_words, smallest_seconds = results[0]
+largest_words, largest_seconds = results[-1]
+ratio = (largest_seconds / largest_words) / (smallest_seconds / smallest_words)
+if ratio > args.max_ratio:
+    print(f"❌ Time per word grew {ratio:.2f}x from {smallest_words} to {largest_words} words "
+          f"(allowed {args.max_ratio:.2f}x)")
+    print("=" * 60)
+    sys.exit(1)
+
+print(f"✅ Linear: time per word changed {ratio:.2f}x from {smallest_words} to {largest_words} words")
+print("=" * 60)
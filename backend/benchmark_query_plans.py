@@ -0,0 +1,282 @@
+"""
+Query Plan Benchmark
+Seeds a large report dataset and checks, via EXPLAIN, that every hot query
+is served by the index it was designed for. Exits non-zero on a regression.
+
+Usage:
+    python benchmark_query_plans.py [--reports 1000000] [--database-url URL] [--keep]
+
+The target database is dropped and recreated unless --keep is given, so never
+point it at a real database. Defaults to a SQLite file under generated/.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+parser = argparse.ArgumentParser(description='Seed reports and verify hot query plans')
+parser.add_argument('--reports', type=int, default=1000000, help='Number of reports to seed')
+parser.add_argument('--teams', type=int, default=500, help='Number of teams to spread them over')
+parser.add_argument('--members', type=int, default=10, help='Users per team')
+parser.add_argument('--fields', type=int, default=2, help='Template field values per report')
+parser.add_argument('--database-url', default=os.getenv('BENCHMARK_DATABASE_URL'),
+                    help='Database to seed (default: sqlite file in generated/)')
+parser.add_argument('--keep', action='store_true', help='Reuse an already seeded database')
+args = parser.parse_args()
+
+default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generated', 'benchmark_query_plans.db')
+os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{default_path}"
+os.environ['DATABASE_REPLICA_URLS'] = ''
+os.environ['DB_STATEMENT_TIMEOUT_MS'] = '0'
+
+from sqlalchemy import insert, update, select, func, text
+from app import create_app, db
+from app.models import (
+    User, Team, TeamMember, ReportTemplate, TemplateRevision, TemplateField,
+    CallAnalysis, Report, ReportFieldValue
+)
+
+CHUNK_SIZE = 10000
+
+app = create_app()
+app.config['SQLALCHEMY_ECHO'] = False
+
+
+def insert_chunked(table, rows):
+    """Executemany in fixed-size chunks, committing each one"""
+    chunk = []
+    count = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            db.session.execute(insert(table), chunk)
+            db.session.commit()
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(insert(table), chunk)
+        db.session.commit()
+        count += len(chunk)
+    return count
+
+
+def seed():
+    """Teams with members and one template each, then analyses, reports and field values"""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    team_count, member_count = args.teams, args.members
+
+    insert_chunked(User.__table__, (
+        {'id': user_id, 'email': f"bench{user_id}@example.com", 'first_name': 'Bench', 'last_name': str(user_id),
+         'is_active': True, 'created_at': now, 'updated_at': now}
+        for user_id in range(1, team_count * member_count + 1)
+    ))
+    insert_chunked(Team.__table__, (
+        {'id': team_id, 'name': f"Team {team_id}", 'owner_id': (team_id - 1) * member_count + 1,
+         'created_at': now, 'updated_at': now}
+        for team_id in range(1, team_count + 1)
+    ))
+    insert_chunked(TeamMember.__table__, (
+        {'team_id': team_id, 'user_id': (team_id - 1) * member_count + offset + 1,
+         'role': 'owner' if offset == 0 else 'member', 'joined_at': now}
+        for team_id in range(1, team_count + 1)
+        for offset in range(member_count)
+    ))
+    insert_chunked(ReportTemplate.__table__, (
+        {'id': team_id, 'name': f"Template {team_id}", 'created_by': (team_id - 1) * member_count + 1,
+         'team_id': team_id, 'is_active': True, 'created_at': now, 'updated_at': now}
+        for team_id in range(1, team_count + 1)
+    ))
+    insert_chunked(TemplateRevision.__table__, (
+        {'id': team_id, 'template_id': team_id, 'revision_number': 1, 'created_at': now}
+        for team_id in range(1, team_count + 1)
+    ))
+    db.session.execute(update(ReportTemplate.__table__).values(current_revision_id=ReportTemplate.__table__.c.id))
+    db.session.commit()
+    insert_chunked(TemplateField.__table__, (
+        {'id': (team_id - 1) * args.fields + order + 1, 'template_id': team_id, 'revision_id': team_id,
+         'field_name': f"field_{order}",
+         'field_label': f"Field {order}", 'field_type': 'text', 'display_order': order, 'created_at': now}
+        for team_id in range(1, team_count + 1)
+        for order in range(args.fields)
+    ))
+
+    # One analysis per report, spread over two years
+    plan = []
+    for report_id in range(1, args.reports + 1):
+        team_id = rng.randint(1, team_count)
+        user_id = (team_id - 1) * member_count + rng.randint(1, member_count)
+        created_at = now - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))
+        status = 'draft' if rng.random() < 0.3 else 'finalized'
+        plan.append((report_id, team_id, user_id, created_at, status))
+
+    insert_chunked(CallAnalysis.__table__, (
+        {'id': report_id, 'user_id': user_id, 'team_id': team_id, 'template_id': team_id,
+         'template_revision_id': team_id, 'input_type': 'text', 'transcription_length': 0, 'created_at': created_at}
+        for report_id, team_id, user_id, created_at, status in plan
+    ))
+    insert_chunked(Report.__table__, (
+        {'id': report_id, 'analysis_id': report_id, 'user_id': user_id, 'team_id': team_id,
+         'template_id': team_id, 'template_revision_id': team_id, 'title': f"Report {report_id}", 'status': status,
+         'created_at': created_at, 'updated_at': created_at,
+         'finalized_at': created_at if status == 'finalized' else None}
+        for report_id, team_id, user_id, created_at, status in plan
+    ))
+    insert_chunked(ReportFieldValue.__table__, (
+        {'report_id': report_id, 'field_id': (team_id - 1) * args.fields + order + 1,
+         'field_value': str(rng.randint(0, 100)), 'created_at': created_at, 'updated_at': created_at}
+        for report_id, team_id, user_id, created_at, status in plan
+        for order in range(args.fields)
+    ))
+
+
+def analyze(dialect):
+    """Refresh planner statistics so plans reflect the seeded distribution"""
+    if dialect == 'mysql':
+        db.session.execute(text("ANALYZE TABLE reports, call_analyses, report_field_values"))
+    else:
+        db.session.execute(text("ANALYZE"))
+    db.session.commit()
+
+
+def hot_queries():
+    """(name, statement, accepted index names) mirroring the service-layer filters"""
+    member_id = 2  # second user of team 1, a plain member
+    field_id = 1
+    return [
+        (
+            'get_reports (owner)',
+            select(Report).where(Report.team_id == 1, Report.status == 'finalized')
+            .order_by(Report.created_at.desc()).limit(20),
+            ('ix_reports_team_status_created',)
+        ),
+        (
+            'get_reports count',
+            select(func.count()).select_from(Report).where(Report.team_id == 1, Report.status == 'finalized'),
+            ('ix_reports_team_status_created',)
+        ),
+        (
+            'get_reports (member)',
+            select(Report).where(Report.team_id == 1, Report.user_id == member_id, Report.status == 'finalized')
+            .order_by(Report.created_at.desc()).limit(20),
+            ('ix_reports_team_user_status_created',)
+        ),
+        (
+            'get_draft_reports (owner)',
+            select(Report).where(Report.team_id == 1, Report.status == 'draft')
+            .order_by(Report.created_at.desc()).limit(20),
+            ('ix_reports_team_status_created',)
+        ),
+        (
+            'create_draft_report existing draft',
+            select(Report).where(Report.analysis_id == args.reports // 2, Report.status == 'draft').limit(1),
+            ('ix_reports_analysis_status',)
+        ),
+        (
+            'update_report field value',
+            select(ReportFieldValue).where(
+                ReportFieldValue.report_id == args.reports // 2, ReportFieldValue.field_id == field_id
+            ),
+            # SQLite names the index backing an inline UNIQUE constraint itself
+            ('uq_report_field_values_report_field', 'sqlite_autoindex_report_field_values_1')
+        ),
+        (
+            'analysis history',
+            select(CallAnalysis).where(CallAnalysis.user_id == member_id)
+            .order_by(CallAnalysis.created_at.desc()).limit(50),
+            ('ix_call_analyses_user_created',)
+        ),
+    ]
+
+
+def explain(statement, dialect):
+    """Index names the planner chose, plus the raw plan for display"""
+    sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+
+    if dialect == 'sqlite':
+        rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        plan = [row[-1] for row in rows]
+        used = {
+            word for detail in plan
+            for word in detail.replace('(', ' ').split()
+            if word.startswith(('ix_', 'uq_', 'sqlite_autoindex_'))
+        }
+    elif dialect == 'mysql':
+        rows = db.session.execute(text(f"EXPLAIN {sql}")).mappings().fetchall()
+        plan = [f"{row['table']}: key={row['key']} rows={row['rows']} extra={row['Extra']}" for row in rows]
+        used = {row['key'] for row in rows if row['key']}
+    else:
+        rows = db.session.execute(text(f"EXPLAIN {sql}")).fetchall()
+        plan = [row[0] for row in rows]
+        used = {
+            word for detail in plan
+            for word in detail.split()
+            if word.startswith(('ix_', 'uq_'))
+        }
+
+    return used, plan
+
+
+def time_query(statement, runs=5):
+    """Best-of-N wall time in milliseconds"""
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        db.session.execute(statement).fetchall()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+with app.app_context():
+    dialect = db.engine.dialect.name
+
+    print("=" * 60)
+    print("Query Plan Benchmark")
+    print("=" * 60)
+    print(f"\n🗄️  Database: {db.engine.url.render_as_string(hide_password=True)}")
+
+    existing = 0
+    if args.keep:
+        try:
+            existing = db.session.execute(select(func.count()).select_from(Report)).scalar()
+        except Exception:
+            db.session.rollback()
+
+    if args.keep and existing >= args.reports:
+        print(f"   Reusing {existing} seeded reports")
+    else:
+        print(f"\n🌱 Seeding {args.reports} reports across {args.teams} teams...")
+        started = time.perf_counter()
+        db.drop_all()
+        db.create_all()
+        seed()
+        print(f"   Seeded in {time.perf_counter() - started:.1f}s")
+
+    analyze(dialect)
+
+    print("\n🔍 Checking plans:")
+    failures = []
+    for name, statement, expected in hot_queries():
+        used, plan = explain(statement, dialect)
+        elapsed = time_query(statement)
+        ok = bool(used & set(expected))
+        print(f"\n   {'✅' if ok else '❌'} {name} ({elapsed:.2f} ms)")
+        print(f"      expected: {expected[0]}")
+        for line in plan:
+            print(f"      {line}")
+        if not ok:
+            failures.append(name)
+
+    print("\n" + "=" * 60)
+    if failures:
+        print(f"❌ {len(failures)} quer{'y' if len(failures) == 1 else 'ies'} not using the intended index:")
+        for name in failures:
+            print(f"   - {name}")
+        print("=" * 60)
+        sys.exit(1)
+
+    print("✅ All hot queries use their intended indexes")
+    print("=" * 60)
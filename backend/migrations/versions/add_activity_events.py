@@ -0,0 +1,44 @@
+"""Add append-only activity_events log
+
+Revision ID: add_activity_events
+Revises: add_daily_rollups
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_activity_events'
+down_revision = 'add_daily_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('activity_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('event_type', sa.String(length=50), nullable=False),
+    sa.Column('actor_id', sa.Integer(), nullable=True),
+    sa.Column('actor_name', sa.String(length=255), nullable=False),
+    sa.Column('subject_type', sa.String(length=50), nullable=True),
+    sa.Column('subject_id', sa.Integer(), nullable=True),
+    sa.Column('subject_title', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['actor_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('activity_events', schema=None) as batch_op:
+        batch_op.create_index('ix_activity_events_team_created', ['team_id', 'created_at'], unique=False)
+
+    # Existing reports and templates are seeded with: flask activity backfill
+
+
+def downgrade():
+    with op.batch_alter_table('activity_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_activity_events_team_created')
+
+    op.drop_table('activity_events')
@@ -0,0 +1,43 @@
+"""Add composite indexes for the hot report and analysis filters
+
+Revision ID: add_composite_indexes
+Revises: add_call_analysis_texts
+Create Date: 2026-10-18
+
+The (report_id, field_id) lookup used when updating field values is already
+served by uq_report_field_values_report_field (add_field_value_unique).
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_composite_indexes'
+down_revision = 'add_call_analysis_texts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.create_index('ix_reports_team_status_created', ['team_id', 'status', 'created_at'], unique=False)
+        batch_op.create_index('ix_reports_team_user_status_created', ['team_id', 'user_id', 'status', 'created_at'], unique=False)
+        batch_op.create_index('ix_reports_analysis_status', ['analysis_id', 'status'], unique=False)
+
+    with op.batch_alter_table('call_analyses', schema=None) as batch_op:
+        batch_op.create_index('ix_call_analyses_user_created', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('call_analyses', schema=None) as batch_op:
+        batch_op.drop_index('ix_call_analyses_user_created')
+
+    if op.get_bind().dialect.name == 'mysql':
+        # MySQL may have dropped the implicit foreign key index on analysis_id in
+        # favour of the composite one; it needs a replacement before that can go
+        op.create_index('ix_reports_analysis_id', 'reports', ['analysis_id'], unique=False)
+
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.drop_index('ix_reports_analysis_status')
+        batch_op.drop_index('ix_reports_team_user_status_created')
+        batch_op.drop_index('ix_reports_team_status_created')
@@ -0,0 +1,46 @@
+"""Add team and template daily rollup tables
+
+Revision ID: add_daily_rollups
+Revises: add_team_metrics
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_daily_rollups'
+down_revision = 'add_team_metrics'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('team_daily_stats',
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('analysis_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('report_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('audio_seconds', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.PrimaryKeyConstraint('team_id', 'day')
+    )
+
+    op.create_table('template_daily_stats',
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=False),
+    sa.Column('analysis_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('report_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.ForeignKeyConstraint(['template_id'], ['report_templates.id'], ),
+    sa.PrimaryKeyConstraint('team_id', 'day', 'template_id')
+    )
+
+    # Existing history is loaded with: flask rollups backfill
+
+
+def downgrade():
+    op.drop_table('template_daily_stats')
+    op.drop_table('team_daily_stats')
@@ -0,0 +1,49 @@
+"""Add typed report field index
+
+Revision ID: add_report_field_index
+Revises: add_report_field_snapshot
+Create Date: 2026-10-18
+
+Existing reports are indexed by `flask reports reindex-fields`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_report_field_index'
+down_revision = 'add_report_field_snapshot'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('report_field_index',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('report_id', sa.Integer(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=False),
+    sa.Column('field_id', sa.Integer(), nullable=False),
+    sa.Column('field_name', sa.String(length=255), nullable=False),
+    sa.Column('value_text', sa.String(length=255), nullable=True),
+    sa.Column('value_number', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['report_id'], ['reports.id'], ),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.ForeignKeyConstraint(['template_id'], ['report_templates.id'], ),
+    sa.ForeignKeyConstraint(['field_id'], ['template_fields.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('report_field_index', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_report_field_index_report_id'), ['report_id'], unique=False)
+        batch_op.create_index('ix_report_field_index_text', ['team_id', 'template_id', 'field_name', 'value_text', 'report_id'], unique=False)
+        batch_op.create_index('ix_report_field_index_number', ['team_id', 'template_id', 'field_name', 'value_number', 'report_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('report_field_index', schema=None) as batch_op:
+        batch_op.drop_index('ix_report_field_index_number')
+        batch_op.drop_index('ix_report_field_index_text')
+        batch_op.drop_index(batch_op.f('ix_report_field_index_report_id'))
+
+    op.drop_table('report_field_index')
@@ -0,0 +1,29 @@
+"""Add denormalized field value snapshot to reports
+
+Revision ID: add_report_field_snapshot
+Revises: add_template_revisions
+Create Date: 2026-10-18
+
+Existing reports are filled in by `flask reports rebuild-snapshots`; until
+then list views build their field values from the normalized rows.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_report_field_snapshot'
+down_revision = 'add_template_revisions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('field_snapshot', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.drop_column('field_snapshot')
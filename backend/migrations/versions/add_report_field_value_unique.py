@@ -0,0 +1,42 @@
+"""Add unique (report_id, field_id) constraint to report_field_values
+
+Revision ID: add_field_value_unique
+Revises: add_activity_events
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_field_value_unique'
+down_revision = 'add_activity_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Drop duplicate template field values, keeping the most recent row
+    if op.get_bind().dialect.name == 'mysql':
+        op.execute(
+            "DELETE older FROM report_field_values older "
+            "JOIN report_field_values newer "
+            "ON newer.report_id = older.report_id "
+            "AND newer.field_id = older.field_id "
+            "AND newer.id > older.id"
+        )
+    else:
+        op.execute(
+            "DELETE FROM report_field_values "
+            "WHERE field_id IS NOT NULL AND id NOT IN ("
+            "SELECT MAX(id) FROM report_field_values "
+            "WHERE field_id IS NOT NULL GROUP BY report_id, field_id)"
+        )
+
+    with op.batch_alter_table('report_field_values', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_report_field_values_report_field', ['report_id', 'field_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('report_field_values', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_report_field_values_report_field', type_='unique')
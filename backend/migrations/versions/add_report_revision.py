@@ -0,0 +1,29 @@
+"""Add revision counter to reports
+
+Revision ID: add_report_revision
+Revises: add_email_outbox
+Create Date: 2026-10-19
+
+Every UPDATE of a report bumps its revision; PDF ETags and cache entries
+are keyed on it instead of updated_at, which MySQL stores to the second.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_report_revision'
+down_revision = 'add_email_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('reports', schema=None) as batch_op:
+        batch_op.drop_column('revision')
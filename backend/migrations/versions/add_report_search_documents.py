@@ -0,0 +1,61 @@
+"""Add report_search_documents full-text index
+
+Revision ID: add_report_search
+Revises: f6522d6fba4c
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_report_search'
+down_revision = 'f6522d6fba4c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('report_search_documents',
+    sa.Column('report_id', sa.Integer(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('body', sa.Text(), nullable=True),
+    sa.Column('report_created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['report_id'], ['reports.id'], ),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('report_id')
+    )
+    with op.batch_alter_table('report_search_documents', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_report_search_documents_team_id'), ['team_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_report_search_documents_user_id'), ['user_id'], unique=False)
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.execute(
+            'ALTER TABLE report_search_documents '
+            'ADD FULLTEXT INDEX ft_report_search_documents (title, body)'
+        )
+    elif dialect == 'sqlite':
+        op.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS report_search_fts '
+            'USING fts5(title, body)'
+        )
+
+    # Existing reports are indexed with: flask search reindex
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS report_search_fts')
+
+    with op.batch_alter_table('report_search_documents', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_report_search_documents_user_id'))
+        batch_op.drop_index(batch_op.f('ix_report_search_documents_team_id'))
+
+    op.drop_table('report_search_documents')
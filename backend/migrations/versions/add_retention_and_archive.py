@@ -0,0 +1,89 @@
+"""Add retention policies and archive tables
+
+Revision ID: add_retention_and_archive
+Revises: add_template_field_daily_stats
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_retention_and_archive'
+down_revision = 'add_template_field_daily_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    payload_type = sa.LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql')
+
+    op.create_table('retention_policies',
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('audio_cold_after_days', sa.Integer(), nullable=True),
+    sa.Column('audio_delete_after_days', sa.Integer(), nullable=True),
+    sa.Column('image_delete_after_days', sa.Integer(), nullable=True),
+    sa.Column('archive_after_days', sa.Integer(), nullable=True),
+    sa.Column('updated_by', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.ForeignKeyConstraint(['updated_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('team_id')
+    )
+
+    op.create_table('archived_call_analyses',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=False),
+    sa.Column('audio_file_path', sa.String(length=500), nullable=True),
+    sa.Column('image_file_path', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('payload', payload_type, nullable=False),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['template_id'], ['report_templates.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_call_analyses', schema=None) as batch_op:
+        batch_op.create_index('ix_archived_call_analyses_team_created', ['team_id', 'created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_archived_call_analyses_user_id'), ['user_id'], unique=False)
+
+    op.create_table('archived_reports',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('analysis_id', sa.Integer(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.Column('payload', payload_type, nullable=False),
+    sa.ForeignKeyConstraint(['analysis_id'], ['archived_call_analyses.id'], ),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['template_id'], ['report_templates.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_reports', schema=None) as batch_op:
+        batch_op.create_index('ix_archived_reports_team_created', ['team_id', 'created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_archived_reports_analysis_id'), ['analysis_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('archived_reports', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_reports_analysis_id'))
+        batch_op.drop_index('ix_archived_reports_team_created')
+
+    op.drop_table('archived_reports')
+
+    with op.batch_alter_table('archived_call_analyses', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_archived_call_analyses_user_id'))
+        batch_op.drop_index('ix_archived_call_analyses_team_created')
+
+    op.drop_table('archived_call_analyses')
+    op.drop_table('retention_policies')
@@ -0,0 +1,39 @@
+"""Add team_metrics counters table
+
+Revision ID: add_team_metrics
+Revises: add_report_search
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_team_metrics'
+down_revision = 'add_report_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('team_metrics',
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('audio_seconds', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.Column('analysis_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('template_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('member_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('draft_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('report_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('reconciled_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.PrimaryKeyConstraint('team_id')
+    )
+
+    # Rows are created lazily on first dashboard load, or up front with:
+    # flask metrics reconcile
+
+
+def downgrade():
+    op.drop_table('team_metrics')
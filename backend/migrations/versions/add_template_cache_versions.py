@@ -0,0 +1,35 @@
+"""Add template listing versions to teams and users
+
+Revision ID: add_template_cache_versions
+Revises: add_user_identity_version
+Create Date: 2026-10-19
+
+Bumped whenever a team's templates or a user's own templates change, so
+every worker can tell a cached template listing is out of date.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_template_cache_versions'
+down_revision = 'add_user_identity_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('teams', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('template_version', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('template_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('template_version')
+
+    with op.batch_alter_table('teams', schema=None) as batch_op:
+        batch_op.drop_column('template_version')
@@ -0,0 +1,36 @@
+"""Add per-field daily template stats
+
+Revision ID: add_template_field_daily_stats
+Revises: add_report_field_index
+Create Date: 2026-10-18
+
+Rows are computed on demand, so nothing is backfilled.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_template_field_daily_stats'
+down_revision = 'add_report_field_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('template_field_daily_stats',
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('template_revision_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('report_count', sa.Integer(), nullable=False),
+    sa.Column('stats', sa.JSON(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.ForeignKeyConstraint(['template_revision_id'], ['template_revisions.id'], ),
+    sa.PrimaryKeyConstraint('team_id', 'template_revision_id', 'day')
+    )
+
+
+def downgrade():
+    op.drop_table('template_field_daily_stats')
@@ -0,0 +1,114 @@
+"""Add immutable template revisions
+
+Revision ID: add_template_revisions
+Revises: add_composite_indexes
+Create Date: 2026-10-18
+
+Every existing template gets revision 1 holding its current fields, and
+existing analyses and reports are pointed at it.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_template_revisions'
+down_revision = 'add_composite_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('template_revisions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('template_id', sa.Integer(), nullable=False),
+    sa.Column('revision_number', sa.Integer(), nullable=False),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['template_id'], ['report_templates.id'], ),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('template_id', 'revision_number', name='uq_template_revisions_template_number')
+    )
+    with op.batch_alter_table('template_revisions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_template_revisions_template_id'), ['template_id'], unique=False)
+
+    with op.batch_alter_table('template_fields', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_template_fields_revision_id'), ['revision_id'], unique=False)
+        batch_op.create_foreign_key('fk_template_fields_revision', 'template_revisions', ['revision_id'], ['id'])
+
+    with op.batch_alter_table('report_templates', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('current_revision_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_report_templates_current_revision', 'template_revisions', ['current_revision_id'], ['id'])
+
+    for table in ('call_analyses', 'reports'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('template_revision_id', sa.Integer(), nullable=True))
+            batch_op.create_index(batch_op.f(f'ix_{table}_template_revision_id'), ['template_revision_id'], unique=False)
+            batch_op.create_foreign_key(f'fk_{table}_template_revision', 'template_revisions', ['template_revision_id'], ['id'])
+
+    # Revision 1 of every template holds the fields it has today
+    op.execute(
+        "INSERT INTO template_revisions (template_id, revision_number, created_by, created_at) "
+        "SELECT id, 1, created_by, created_at FROM report_templates"
+    )
+    first_revision = (
+        "(SELECT template_revisions.id FROM template_revisions "
+        "WHERE template_revisions.template_id = {table}.{column} AND template_revisions.revision_number = 1)"
+    )
+    op.execute(
+        "UPDATE template_fields SET revision_id = "
+        + first_revision.format(table='template_fields', column='template_id')
+    )
+    op.execute(
+        "UPDATE report_templates SET current_revision_id = "
+        + first_revision.format(table='report_templates', column='id')
+    )
+    for table in ('call_analyses', 'reports'):
+        op.execute(
+            f"UPDATE {table} SET template_revision_id = "
+            + first_revision.format(table=table, column='template_id')
+        )
+
+    with op.batch_alter_table('template_fields', schema=None) as batch_op:
+        batch_op.alter_column('revision_id', existing_type=sa.Integer(), nullable=False)
+
+
+def downgrade():
+    # Without revisions a template owns all of its field rows, so fields of
+    # superseded revisions (and the report values pointing at them) go
+    op.execute(
+        "DELETE FROM report_field_values WHERE field_id IN ("
+        "SELECT template_fields.id FROM template_fields "
+        "JOIN report_templates ON report_templates.id = template_fields.template_id "
+        "WHERE template_fields.revision_id <> report_templates.current_revision_id)"
+    )
+    # Subquery is materialized so MySQL accepts deleting from the table it reads
+    op.execute(
+        "DELETE FROM template_fields WHERE id IN (SELECT id FROM ("
+        "SELECT template_fields.id FROM template_fields "
+        "JOIN report_templates ON report_templates.id = template_fields.template_id "
+        "WHERE template_fields.revision_id <> report_templates.current_revision_id) AS superseded)"
+    )
+
+    for table in ('reports', 'call_analyses'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(f'fk_{table}_template_revision', type_='foreignkey')
+            batch_op.drop_index(batch_op.f(f'ix_{table}_template_revision_id'))
+            batch_op.drop_column('template_revision_id')
+
+    with op.batch_alter_table('report_templates', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_report_templates_current_revision', type_='foreignkey')
+        batch_op.drop_column('current_revision_id')
+
+    with op.batch_alter_table('template_fields', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_template_fields_revision', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_template_fields_revision_id'))
+        batch_op.drop_column('revision_id')
+
+    with op.batch_alter_table('template_revisions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_template_revisions_template_id'))
+
+    op.drop_table('template_revisions')
@@ -0,0 +1,29 @@
+"""Add identity version to users
+
+Revision ID: add_user_identity_version
+Revises: add_report_revision
+Create Date: 2026-10-19
+
+Bumped whenever a user, their team memberships or the teams they own
+change, so every worker can tell a cached identity is out of date.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_user_identity_version'
+down_revision = 'add_report_revision'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('identity_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('identity_version')
@@ -0,0 +1,128 @@
+"""Move analysis input text and transcription to compressed side table
+
+Revision ID: add_call_analysis_texts
+Revises: add_field_value_unique
+Create Date: 2026-10-18
+
+"""
+import zlib
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_call_analysis_texts'
+down_revision = 'add_field_value_unique'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+
+# Same format as app.models.types.CompressedText, inlined so this revision
+# keeps working if the application type changes later
+def _compress(value):
+    if value is None:
+        return None
+    raw = value.encode('utf-8')
+    if len(raw) >= 256:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return b'z' + packed
+    return b'r' + raw
+
+
+def _decompress(value):
+    if value is None:
+        return None
+    value = bytes(value)
+    if value[:1] == b'z':
+        return zlib.decompress(value[1:]).decode('utf-8')
+    if value[:1] == b'r':
+        return value[1:].decode('utf-8')
+    return value.decode('utf-8')
+
+
+def _blob():
+    return sa.LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql')
+
+
+def upgrade():
+    op.create_table('call_analysis_texts',
+    sa.Column('analysis_id', sa.Integer(), nullable=False),
+    sa.Column('input_text', _blob(), nullable=True),
+    sa.Column('transcription', _blob(), nullable=True),
+    sa.ForeignKeyConstraint(['analysis_id'], ['call_analyses.id'], ),
+    sa.PrimaryKeyConstraint('analysis_id')
+    )
+
+    with op.batch_alter_table('call_analyses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('transcription_length', sa.Integer(), nullable=False, server_default='0'))
+
+    # Copy existing text across in batches, compressing on the way
+    bind = op.get_bind()
+    texts = sa.table('call_analysis_texts',
+        sa.column('analysis_id', sa.Integer),
+        sa.column('input_text', sa.LargeBinary),
+        sa.column('transcription', sa.LargeBinary)
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            "SELECT id, input_text, transcription FROM call_analyses "
+            "WHERE id > :last_id AND (input_text IS NOT NULL OR transcription IS NOT NULL) "
+            "ORDER BY id LIMIT :limit"
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+
+        bind.execute(texts.insert(), [
+            {
+                'analysis_id': row.id,
+                'input_text': _compress(row.input_text),
+                'transcription': _compress(row.transcription)
+            }
+            for row in rows
+        ])
+        bind.execute(sa.text(
+            "UPDATE call_analyses SET transcription_length = :length WHERE id = :id"
+        ), [{'id': row.id, 'length': len(row.transcription or '')} for row in rows])
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('call_analyses', schema=None) as batch_op:
+        batch_op.drop_column('transcription')
+        batch_op.drop_column('input_text')
+
+
+def downgrade():
+    with op.batch_alter_table('call_analyses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('input_text', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('transcription', sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            "SELECT analysis_id, input_text, transcription FROM call_analysis_texts "
+            "WHERE analysis_id > :last_id ORDER BY analysis_id LIMIT :limit"
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+
+        bind.execute(sa.text(
+            "UPDATE call_analyses SET input_text = :input_text, transcription = :transcription WHERE id = :id"
+        ), [
+            {
+                'id': row.analysis_id,
+                'input_text': _decompress(row.input_text),
+                'transcription': _decompress(row.transcription)
+            }
+            for row in rows
+        ])
+        last_id = rows[-1].analysis_id
+
+    with op.batch_alter_table('call_analyses', schema=None) as batch_op:
+        batch_op.drop_column('transcription_length')
+
+    op.drop_table('call_analysis_texts')
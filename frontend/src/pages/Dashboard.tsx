@@ -302,7 +302,7 @@ export const Dashboard: React.FC = () => {
                 <Box sx={{ display: 'flex', flexDirection: 'column', gap: 2 }}>
                   {activities.map((activity, index) => (
                     <Grow
-                      key={`${activity.type}-${activity.id}`}
+                      key={activity.event_id ?? `${activity.type}-${activity.id}`}
                       in={true}
                       timeout={300 + index * 100}
                     >
@@ -337,6 +337,10 @@ export const Dashboard: React.FC = () => {
                             >
                               {activity.type === 'report_created' ? (
                                 <FileText className="w-4 h-4 sm:w-5 sm:h-5 text-primary-600" />
+                              ) : activity.type === 'draft_finalized' ? (
+                                <CheckCircle2 className="w-4 h-4 sm:w-5 sm:h-5 text-primary-600" />
+                              ) : activity.type === 'member_joined' ? (
+                                <Users className="w-4 h-4 sm:w-5 sm:h-5 text-primary-600" />
                               ) : (
                                 <BarChart3 className="w-4 h-4 sm:w-5 sm:h-5 text-primary-600" />
                               )}
@@ -348,6 +352,16 @@ export const Dashboard: React.FC = () => {
                                     <span style={{ color: '#1F4F2D' }}>{activity.user_name}</span> created
                                     report: {activity.report_title}
                                   </>
+                                ) : activity.type === 'draft_finalized' ? (
+                                  <>
+                                    <span style={{ color: '#1F4F2D' }}>{activity.user_name}</span> finalized
+                                    report: {activity.report_title}
+                                  </>
+                                ) : activity.type === 'member_joined' ? (
+                                  <>
+                                    <span style={{ color: '#1F4F2D' }}>{activity.user_name}</span> joined
+                                    the team
+                                  </>
                                 ) : (
                                   <>
                                     <span style={{ color: '#1F4F2D' }}>{activity.user_name}</span> created
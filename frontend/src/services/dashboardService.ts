@@ -11,10 +11,12 @@ export interface DashboardMetrics {
 
 export interface Activity {
   id: number;
-  type: 'report_created' | 'template_created';
+  event_id?: number;
+  type: 'report_created' | 'template_created' | 'draft_finalized' | 'member_joined';
   user_name: string;
   report_title?: string;
   template_name?: string;
+  team_name?: string;
   created_at: string;
 }
 
@@ -8,8 +8,27 @@ import {
   GeneratePDFResponse,
 } from '../types/report';
 import * as XLSX from 'xlsx';
+import type { AxiosResponse } from 'axios';
+
+// How long to keep retrying while the server is still rendering a PDF
+const PDF_MAX_WAIT_MS = 60000;
 
 class ReportsService {
+  // PDF endpoints answer 202 with Retry-After while the PDF is being rendered
+  private async whilePdfPending<T>(request: () => Promise<AxiosResponse<T>>): Promise<AxiosResponse<T>> {
+    const deadline = Date.now() + PDF_MAX_WAIT_MS;
+    let response = await request();
+    while (response.status === 202 && Date.now() < deadline) {
+      const retryAfter = Number(response.headers['retry-after']) || 2;
+      await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+      response = await request();
+    }
+    if (response.status === 202) {
+      throw new Error('The PDF is still being generated. Please try again in a moment.');
+    }
+    return response;
+  }
+
   async getReports(
     page = 1,
     limit = 20,
@@ -46,17 +65,19 @@ class ReportsService {
   }
 
   async generatePDF(reportId: number): Promise<GeneratePDFResponse> {
-    const response = await apiClient.post<{ success: boolean; data: GeneratePDFResponse }>(
-      `/reports/${reportId}/generate-pdf`
+    const response = await this.whilePdfPending(() =>
+      apiClient.post<{ success: boolean; data: GeneratePDFResponse }>(`/reports/${reportId}/generate-pdf`)
     );
     return response.data.data;
   }
 
   async downloadPDF(reportId: number): Promise<void> {
     try {
-      const response = await apiClient.get(`/reports/${reportId}/download-pdf`, {
-        responseType: 'blob',
-      });
+      const response = await this.whilePdfPending(() =>
+        apiClient.get(`/reports/${reportId}/download-pdf`, {
+          responseType: 'blob',
+        })
+      );
 
       // Check if response is actually a PDF
       const contentType = response.headers['content-type'];
@@ -98,12 +119,12 @@ class ReportsService {
   }
 
   async shareViaEmail(reportId: number, data: ShareEmailRequest): Promise<void> {
-    await apiClient.post(`/reports/${reportId}/share-email`, data);
+    await this.whilePdfPending(() => apiClient.post(`/reports/${reportId}/share-email`, data));
   }
 
   async getWhatsAppShareLink(reportId: number): Promise<ShareWhatsAppResponse> {
-    const response = await apiClient.post<{ success: boolean; data: ShareWhatsAppResponse }>(
-      `/reports/${reportId}/share-whatsapp`
+    const response = await this.whilePdfPending(() =>
+      apiClient.post<{ success: boolean; data: ShareWhatsAppResponse }>(`/reports/${reportId}/share-whatsapp`)
     );
     return response.data.data;
   }
@@ -3,6 +3,7 @@ export type FieldType = 'text' | 'number' | 'long_text' | 'dropdown' | 'multi_se
 export interface TemplateField {
   id?: number;
   template_id?: number;
+  revision_id?: number;
   field_name: string;
   field_label: string;
   field_type: FieldType;
@@ -22,6 +23,7 @@ export interface Template {
   created_at: string;
   updated_at: string;
   is_active: boolean;
+  revision_id?: number;
   field_count: number;
   fields?: TemplateField[];
   can_edit?: boolean;